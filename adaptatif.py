@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import math
+import random
+from bisect import bisect_left
+from typing import Iterable
+
+
+# Difficulte a priori (echelle logit) tant qu'un item n'a pas assez de reponses.
+NIVEAU_DIFFICULTE = {"A1": -2.0, "A2": -1.0, "B1": 0.0, "B2": 1.0, "C1": 2.0, "C2": 2.5}
+TOUS = "Tous"
+# Erreur standard visee sur theta: ~16 items bien cibles suffisent.
+SE_CIBLE = 0.45
+
+_GRILLE = [i / 10 for i in range(-50, 51)]
+
+
+def probabilite(theta: float, difficulte: float) -> float:
+    """Modele de Rasch: probabilite de bonne reponse."""
+    return 1.0 / (1.0 + math.exp(difficulte - theta))
+
+
+def information(theta: float, difficulte: float) -> float:
+    p = probabilite(theta, difficulte)
+    return p * (1.0 - p)
+
+
+def difficulte_item(niveau: str, tentatives: int = 0, correctes: int = 0, poids_prior: int = 20) -> float:
+    """Difficulte empirique (-logit du taux de reussite), ramenee vers le niveau attribue si peu de donnees."""
+    prior = NIVEAU_DIFFICULTE.get(niveau, 0.0)
+    if tentatives <= 0:
+        return prior
+    p = (correctes + 0.5) / (tentatives + 1.0)
+    empirique = -math.log(p / (1.0 - p))
+    poids = tentatives / (tentatives + poids_prior)
+    return poids * empirique + (1.0 - poids) * prior
+
+
+def estimer_theta(reponses: Iterable[tuple[float, bool]], prior_moyenne: float = 0.0) -> tuple[float, float]:
+    """Estimation EAP (prior N(prior_moyenne, 1)) du niveau; renvoie (theta, erreur standard)."""
+    log_vraisemblance = [-0.5 * (t - prior_moyenne) ** 2 for t in _GRILLE]
+    for difficulte, correcte in reponses:
+        for i, theta in enumerate(_GRILLE):
+            p = probabilite(theta, difficulte)
+            log_vraisemblance[i] += math.log(p if correcte else 1.0 - p)
+    maximum = max(log_vraisemblance)
+    poids = [math.exp(lv - maximum) for lv in log_vraisemblance]
+    total = sum(poids)
+    moyenne = sum(w * t for w, t in zip(poids, _GRILLE)) / total
+    variance = sum(w * (t - moyenne) ** 2 for w, t in zip(poids, _GRILLE)) / total
+    return moyenne, math.sqrt(variance)
+
+
+def niveau_depuis_theta(theta: float) -> str:
+    return min(NIVEAU_DIFFICULTE, key=lambda niveau: abs(NIVEAU_DIFFICULTE[niveau] - theta))
+
+
+class IndexItems:
+    """Items tries par difficulte, par theme.
+
+    Sous Rasch, l'information d'un item est maximale quand sa difficulte vaut
+    theta: l'item suivant est donc trouve par bisection autour de theta
+    (O(log n)), au lieu de calculer l'information de toute la banque.
+    """
+
+    def __init__(self, items: Iterable[tuple[int, str, float]]) -> None:
+        par_theme: dict[str, list[tuple[float, int]]] = {TOUS: []}
+        self._difficulte: dict[int, float] = {}
+        for item_id, theme, difficulte in items:
+            self._difficulte[item_id] = difficulte
+            par_theme.setdefault(theme, []).append((difficulte, item_id))
+            par_theme[TOUS].append((difficulte, item_id))
+        self._difficultes: dict[str, list[float]] = {}
+        self._ids: dict[str, list[int]] = {}
+        for theme, entrees in par_theme.items():
+            entrees.sort()
+            self._difficultes[theme] = [d for d, _ in entrees]
+            self._ids[theme] = [i for _, i in entrees]
+
+    def __len__(self) -> int:
+        return len(self._difficulte)
+
+    def themes(self) -> list[str]:
+        return sorted(t for t in self._ids if t != TOUS)
+
+    def difficulte(self, item_id: int) -> float | None:
+        return self._difficulte.get(item_id)
+
+    def candidats(self, theme: str, theta: float, exclus: set[int], nombre: int = 1) -> list[int]:
+        """Les `nombre` items non exclus dont la difficulte est la plus proche de theta."""
+        difficultes = self._difficultes.get(theme, [])
+        ids = self._ids.get(theme, [])
+        gauche = bisect_left(difficultes, theta) - 1
+        droite = gauche + 1
+        choisis: list[int] = []
+        while len(choisis) < nombre and (gauche >= 0 or droite < len(ids)):
+            prendre_gauche = droite >= len(ids) or (
+                gauche >= 0 and theta - difficultes[gauche] <= difficultes[droite] - theta
+            )
+            if prendre_gauche:
+                item_id, gauche = ids[gauche], gauche - 1
+            else:
+                item_id, droite = ids[droite], droite + 1
+            if item_id not in exclus:
+                choisis.append(item_id)
+        return choisis
+
+    def prochain(
+        self,
+        theme: str,
+        theta: float,
+        exclus: set[int],
+        rng: random.Random | None = None,
+        parmi: int = 3,
+    ) -> int | None:
+        # Tirage parmi les plus informatifs: evite de servir toujours les memes items.
+        candidats = self.candidats(theme, theta, exclus, parmi)
+        if not candidats:
+            return None
+        return (rng or random).choice(candidats)
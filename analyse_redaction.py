@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+
+FONCTIONS_CONNECTEURS = {
+    "addition": "Addition",
+    "opposition": "Opposition",
+    "cause": "Cause",
+    "consequence": "Consequence",
+    "illustration": "Illustration",
+    "but": "But",
+}
+
+# Connecteurs absents de la fiche et des QCM "Connecteurs"; le reste vient de la base.
+CONNECTEURS_DE_BASE = {
+    "par ailleurs": "Addition",
+    "toutefois": "Opposition",
+    "neanmoins": "Opposition",
+    "mais": "Opposition",
+    "parce que": "Cause",
+    "c'est pourquoi": "Consequence",
+    "afin de": "But",
+    "pour que": "But",
+    "d'abord": "Organisation",
+    "ensuite": "Organisation",
+    "enfin": "Organisation",
+    "en conclusion": "Organisation",
+}
+
+ACCENTS_PROBABLES = {
+    "tres": "très", "apres": "après", "deja": "déjà", "etre": "être", "ete": "été",
+    "meme": "même", "memes": "mêmes", "probleme": "problème", "problemes": "problèmes",
+    "eleve": "élève", "eleves": "élèves", "ecole": "école", "ecoles": "écoles",
+    "etude": "étude", "etudes": "études", "etudiant": "étudiant", "etudiants": "étudiants",
+    "etudiante": "étudiante", "etudiantes": "étudiantes", "societe": "société",
+    "qualite": "qualité", "securite": "sécurité", "sante": "santé", "realite": "réalité",
+    "possibilite": "possibilité", "difficulte": "difficulté", "difficultes": "difficultés",
+    "activite": "activité", "activites": "activités", "universite": "université",
+    "liberte": "liberté", "responsabilite": "responsabilité", "verite": "vérité",
+    "interessant": "intéressant", "interessante": "intéressante", "interet": "intérêt",
+    "premiere": "première", "derniere": "dernière", "reussir": "réussir", "reussite": "réussite",
+    "developper": "développer", "developpement": "développement", "economique": "économique",
+    "evenement": "événement", "experience": "expérience", "necessaire": "nécessaire",
+    "general": "général", "generalement": "généralement", "recemment": "récemment",
+    "idee": "idée", "idees": "idées", "annee": "année", "annees": "années", "journee": "journée",
+    "cafe": "café", "frere": "frère", "mere": "mère", "pere": "père", "fenetre": "fenêtre",
+    "foret": "forêt", "bientot": "bientôt", "plutot": "plutôt", "aout": "août",
+    "francais": "français", "francaise": "française", "ca": "ça", "voila": "voilà",
+    "deuxieme": "deuxième", "troisieme": "troisième", "systeme": "système",
+    "methode": "méthode", "telephone": "téléphone", "ecrire": "écrire", "ecrit": "écrit",
+    "reponse": "réponse", "reponses": "réponses", "region": "région", "media": "média",
+    "medias": "médias", "numerique": "numérique", "reseau": "réseau", "reseaux": "réseaux",
+    "prefere": "préfère", "preferer": "préférer", "esperer": "espérer", "regle": "règle",
+}
+
+MARQUEURS_FAMILIERS = {
+    "ouais", "truc", "trucs", "bosser", "boulot", "sympa", "genre", "mec", "bouquin",
+    "fric", "kiffer", "kiffe", "grave", "vachement", "pote", "potes", "ca", "ça", "nul",
+    "t'es", "y'a", "ya", "bah", "bref",
+}
+MARQUEURS_SOUTENUS = {
+    "veuillez", "cordialement", "madame", "monsieur", "toutefois", "neanmoins",
+    "en outre", "par ailleurs", "je vous prie", "salutations",
+}
+PRONOMS_TU = {"tu", "te", "toi", "ton", "ta", "tes", "t'es", "t'as"}
+PRONOMS_VOUS = {"vous", "votre", "vos"}
+
+MOTS_OUTILS = {
+    "le", "la", "les", "un", "une", "des", "de", "du", "et", "ou", "a", "au", "aux", "en",
+    "que", "qui", "quoi", "dans", "pour", "par", "sur", "avec", "sans", "sous", "ce", "cet",
+    "cette", "ces", "se", "sa", "son", "ses", "leur", "leurs", "il", "elle", "ils", "elles",
+    "je", "tu", "nous", "vous", "on", "ne", "pas", "plus", "est", "sont", "mais", "donc",
+    "car", "si", "y", "me", "mon", "ma", "mes", "lui", "nos", "notre", "votre", "vos",
+    "tres", "très", "aussi", "comme", "tout", "tous", "toute", "toutes", "etre", "être",
+    "avoir", "fait", "faire", "peut", "c'est", "qu'il", "j'ai", "d'un", "d'une", "l'on",
+}
+
+_PHRASES = re.compile(r"[^.!?…]+[.!?…]*")
+_MOTS = re.compile(r"[a-zàâäçéèêëîïôöùûüÿœæ]+(?:['’][a-zàâäçéèêëîïôöùûüÿœæ]+)?", re.IGNORECASE)
+# Article ou pronom elide colle au mot ("l'ecole", "d'etudiants", "qu'il"): retire avant les recherches.
+_ELISION = re.compile(r"^(?:qu|[ldjmnstc])'")
+
+
+@dataclass(frozen=True)
+class AnalysePhrase:
+    mots: tuple[str, ...]
+    connecteurs: tuple[tuple[str, str], ...]
+    accents: tuple[tuple[str, str], ...]
+    familiers: tuple[str, ...]
+    soutenus: tuple[str, ...]
+
+
+def _fonction_depuis_explication(explication: str) -> str | None:
+    texte = explication.lower()
+    for cle, fonction in FONCTIONS_CONNECTEURS.items():
+        if cle in texte:
+            return fonction
+    return None
+
+
+def extraire_connecteurs(
+    lecons: Iterable[dict[str, Any]], exercices: Iterable[dict[str, Any]]
+) -> dict[str, str]:
+    """Construit {connecteur: fonction} depuis les fiches et les QCM du theme Connecteurs."""
+    connecteurs = dict(CONNECTEURS_DE_BASE)
+    for lecon in lecons:
+        for ligne in str(lecon.get("contenu_markdown", "")).splitlines():
+            match = re.match(r"^\s*-\s*([A-Za-z ]+):\s*(.+)$", ligne)
+            if not match:
+                continue
+            fonction = FONCTIONS_CONNECTEURS.get(match.group(1).strip().lower())
+            if not fonction:
+                continue
+            for mot in match.group(2).split(","):
+                mot = mot.strip().lower()
+                if mot and len(mot.split()) <= 3:
+                    connecteurs.setdefault(mot, fonction)
+    for exercice in exercices:
+        options = exercice.get("options") or []
+        index = exercice.get("answer_index")
+        if not isinstance(index, int) or not 0 <= index < len(options):
+            continue
+        fonction = _fonction_depuis_explication(str(exercice.get("explication", "")))
+        reponse = str(options[index]).strip().lower()
+        # "pour" est une bonne reponse de QCM mais surtout une preposition: on l'ignore.
+        if fonction and reponse not in MOTS_OUTILS:
+            connecteurs.setdefault(reponse, fonction)
+    return connecteurs
+
+
+class AnalyseurRedaction:
+    """Pre-analyse locale d'une redaction.
+
+    Chaque phrase est analysee une seule fois puis gardee en cache: a chaque
+    modification du texte, seules les phrases nouvelles ou modifiees sont
+    recalculees, le reste n'est qu'une agregation.
+    """
+
+    def __init__(self, connecteurs: dict[str, str], taille_cache: int = 4096) -> None:
+        self.connecteurs = connecteurs
+        expressions = sorted(connecteurs, key=len, reverse=True)
+        self._regex_connecteurs = re.compile(
+            r"(?<![\w'])(" + "|".join(re.escape(c) for c in expressions) + r")(?![\w'])",
+            re.IGNORECASE,
+        )
+        multi_soutenus = sorted((m for m in MARQUEURS_SOUTENUS if " " in m), key=len, reverse=True)
+        self._regex_soutenus = re.compile(
+            r"(?<!\w)(" + "|".join(re.escape(m) for m in multi_soutenus) + r")(?!\w)", re.IGNORECASE
+        )
+        self._cache: OrderedDict[str, AnalysePhrase] = OrderedDict()
+        self._taille_cache = taille_cache
+        self._verrou = threading.Lock()
+
+    def _analyser_phrase(self, phrase: str) -> AnalysePhrase:
+        with self._verrou:
+            en_cache = self._cache.get(phrase)
+            if en_cache is not None:
+                self._cache.move_to_end(phrase)
+                return en_cache
+
+        mots = tuple(m.lower().replace("’", "'") for m in _MOTS.findall(phrase))
+        connecteurs = tuple(
+            (c.lower(), self.connecteurs[c.lower()]) for c in self._regex_connecteurs.findall(phrase)
+        )
+        bases = (_ELISION.sub("", m, count=1) for m in mots)
+        accents = tuple((m, ACCENTS_PROBABLES[m]) for m in bases if m in ACCENTS_PROBABLES)
+        familiers = tuple(m for m in mots if m in MARQUEURS_FAMILIERS)
+        soutenus = tuple(m for m in mots if m in MARQUEURS_SOUTENUS) + tuple(
+            m.lower() for m in self._regex_soutenus.findall(phrase)
+        )
+        analyse = AnalysePhrase(mots, connecteurs, accents, familiers, soutenus)
+
+        with self._verrou:
+            self._cache[phrase] = analyse
+            if len(self._cache) > self._taille_cache:
+                self._cache.popitem(last=False)
+        return analyse
+
+    def analyser(self, texte: str) -> dict[str, Any]:
+        phrases = [p.strip() for p in _PHRASES.findall(texte) if p.strip()]
+        analyses = [self._analyser_phrase(p) for p in phrases]
+
+        mots = [m for a in analyses for m in a.mots]
+        frequences = Counter(m for m in mots if m not in MOTS_OUTILS and len(m) > 3)
+        seuil_repetition = 3 if len(mots) < 250 else 4
+        repetitions = [(m, n) for m, n in frequences.most_common() if n >= seuil_repetition]
+
+        connecteurs = Counter(c for a in analyses for c in a.connecteurs)
+        fonctions = Counter()
+        for (_, fonction), n in connecteurs.items():
+            fonctions[fonction] += n
+        fonctions_manquantes = [
+            f for f in ("Addition", "Opposition", "Cause", "Consequence", "Illustration") if f not in fonctions
+        ]
+
+        accents: dict[str, str] = {}
+        for a in analyses:
+            accents.update(a.accents)
+
+        ensemble_mots = set(mots)
+        return {
+            "nb_phrases": len(phrases),
+            "nb_mots": len(mots),
+            "mots_par_phrase": round(len(mots) / len(phrases), 1) if phrases else 0.0,
+            "diversite_lexicale": round(len(ensemble_mots) / len(mots), 2) if mots else 0.0,
+            "repetitions": repetitions[:8],
+            "connecteurs": [(c, f, n) for (c, f), n in connecteurs.most_common()],
+            "fonctions_connecteurs": dict(fonctions),
+            "fonctions_manquantes": fonctions_manquantes if phrases else [],
+            "accents_probables": sorted(accents.items()),
+            "marqueurs_familiers": sorted({m for a in analyses for m in a.familiers}),
+            "marqueurs_soutenus": sorted({m for a in analyses for m in a.soutenus}),
+            "melange_tu_vous": bool(ensemble_mots & PRONOMS_TU) and bool(ensemble_mots & PRONOMS_VOUS),
+        }
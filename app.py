@@ -1,19 +1,30 @@
 from __future__ import annotations
 
-import json
 import os
 import random
+import time
+import uuid
 from typing import Any
 
 import streamlit as st
-from openai import OpenAI
+from openai import RateLimitError
 
 import db
+from adaptatif import SE_CIBLE, IndexItems, difficulte_item, estimer_theta, niveau_depuis_theta
+from analyse_redaction import AnalyseurRedaction, extraire_connecteurs
+from correction import corriger_redaction_detaillee
+from limiteur import AttenteTropLongue, BudgetEpuise, estimer_tokens, limiteur_partage
+from revision import NOTES, EtatCarte, format_date, maintenant_utc, planifier
+from routage import routeur_partage
+from sessions import CacheSessions, cache_depuis_env
 
 
 st.set_page_config(page_title="Coach TCF Francais", page_icon="🇫🇷", layout="wide")
 
 
+TAILLE_LOT_REVISION = 20
+NOUVELLES_PAR_LOT = 10
+
 ORDRE_TEMPS = [
     "present",
     "imparfait",
@@ -25,60 +36,6 @@ ORDRE_TEMPS = [
 ]
 
 
-def extraire_json_depuis_texte(texte: str) -> dict[str, Any] | None:
-    if not texte:
-        return None
-
-    propre = texte.strip()
-    if propre.startswith("```"):
-        propre = propre.strip("`")
-        if "\n" in propre:
-            propre = propre.split("\n", 1)[1]
-
-    debut = propre.find("{")
-    fin = propre.rfind("}")
-    if debut == -1 or fin == -1 or fin <= debut:
-        return None
-
-    try:
-        return json.loads(propre[debut : fin + 1])
-    except json.JSONDecodeError:
-        return None
-
-
-def corriger_redaction_avec_openai(
-    api_key: str, modele: str, tache: str, consigne: str, texte: str
-) -> tuple[dict[str, Any] | None, str]:
-    client = OpenAI(api_key=api_key)
-    reponse = client.responses.create(
-        model=modele,
-        input=[
-            {
-                "role": "system",
-                "content": (
-                    "Tu es un correcteur expert du TCF. "
-                    "Evalue selon: coherence, grammaire, lexique, orthographe, registre. "
-                    "Retourne strictement un JSON valide avec ces cles: "
-                    "note_globale_sur_20, criteres, points_forts, erreurs_prioritaires, "
-                    "version_corrigee, conseil_methode."
-                ),
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Tache TCF: {tache}\n"
-                    f"Consigne: {consigne}\n"
-                    "Texte du candidat:\n"
-                    f"{texte}"
-                ),
-            },
-        ],
-    )
-
-    brut = (reponse.output_text or "").strip()
-    return extraire_json_depuis_texte(brut), brut
-
-
 def get_default_api_key() -> str:
     try:
         if "OPENAI_API_KEY" in st.secrets:
@@ -97,6 +54,182 @@ def get_default_model() -> str:
     return os.getenv("OPENAI_MODEL", "gpt-5-mini")
 
 
+@st.cache_resource
+def get_sessions() -> CacheSessions:
+    return cache_depuis_env()
+
+
+def utilisateur_connecte() -> dict[str, Any] | None:
+    jeton = st.session_state.get("jeton_session")
+    if jeton is None:
+        return None
+    utilisateur = get_sessions().utilisateur(jeton)
+    if utilisateur is None:
+        # Session expiree (ou serveur redemarre): retour a l'etat deconnecte.
+        del st.session_state["jeton_session"]
+    return utilisateur
+
+
+def afficher_connexion() -> None:
+    utilisateur = utilisateur_connecte()
+    if utilisateur is not None:
+        st.caption(f"Connecte: {utilisateur['username']}")
+        if st.button("Se deconnecter"):
+            get_sessions().fermer(st.session_state.pop("jeton_session"))
+            st.rerun()
+        return
+
+    with st.expander("Connexion"):
+        mode = st.radio("Compte", ["Se connecter", "Creer un compte"], horizontal=True, label_visibility="collapsed")
+        with st.form("form-connexion"):
+            nom = st.text_input("Nom d'utilisateur")
+            mot_de_passe = st.text_input("Mot de passe", type="password")
+            valider = st.form_submit_button(mode)
+        if not valider:
+            return
+        try:
+            if mode == "Creer un compte":
+                ok, message = db.create_user(nom, mot_de_passe)
+                if not ok:
+                    st.error(message)
+                    return
+            utilisateur = db.authenticate_user(nom, mot_de_passe)
+        except TimeoutError as err:
+            st.warning(str(err))
+            return
+        if utilisateur is None:
+            st.error("Nom d'utilisateur ou mot de passe incorrect.")
+            return
+        st.session_state["jeton_session"] = get_sessions().ouvrir(utilisateur)
+        st.rerun()
+
+
+def journaliser_resultat(
+    module: str,
+    event_type: str,
+    score: float | int | None,
+    total: float | int | None,
+    meta: dict[str, Any] | None = None,
+) -> None:
+    utilisateur = utilisateur_connecte()
+    if utilisateur is None:
+        return
+    db.log_user_activity(int(utilisateur["id"]), module, event_type, score, total, meta)
+
+
+def journaliser_reponses(
+    item_type: str,
+    reponses: list[tuple[int, int | None, bool]],
+    debut: float | None,
+) -> str | None:
+    """Journalise chaque reponse de la serie; le temps par item est le temps de la serie / n."""
+    utilisateur = utilisateur_connecte()
+    if utilisateur is None or not reponses:
+        return None
+    serie_id = uuid.uuid4().hex
+    temps_ms = int((time.time() - debut) * 1000 / len(reponses)) if debut else None
+    db.log_answer_events(int(utilisateur["id"]), serie_id, item_type, reponses, temps_ms)
+    return serie_id
+
+
+def identifiant_session() -> str:
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return str(st.session_state["session_id"])
+
+
+def cle_limiteur() -> str:
+    # Budget journalier et file equitable par compte: recharger la page ne remet pas le compteur a zero.
+    utilisateur = utilisateur_connecte()
+    if utilisateur is not None:
+        return f"utilisateur:{utilisateur['id']}"
+    return f"session:{identifiant_session()}"
+
+
+def corriger_redaction(
+    api_key: str,
+    modele: str,
+    sujet: dict[str, Any],
+    texte: str,
+    cle_serveur: bool,
+    routage_auto: bool,
+) -> tuple[dict[str, Any] | None, str, str]:
+    tache, consigne = sujet["tache_tcf"], sujet["consigne"]
+    cle = cle_limiteur()
+    tokens_estimes = estimer_tokens(consigne, texte)
+    reservation = None
+    if cle_serveur:
+        file_attente = st.empty()
+
+        def afficher_position(position: int, attente_s: float) -> None:
+            file_attente.info(f"File d'attente: position {position}, environ {max(1, round(attente_s))} s.")
+
+        reservation = limiteur_partage().reserver(cle, tokens_estimes, sur_attente=afficher_position)
+        file_attente.empty()
+
+    def executer(modele_appel: str, secours: bool) -> tuple[dict[str, Any] | None, str, dict[str, int]]:
+        if not cle_serveur:
+            return corriger_redaction_detaillee(api_key, modele_appel, tache, consigne, texte)
+        # Une requete de secours ne fait jamais la queue: sans capacite immediate, elle n'est pas lancee.
+        resa = limiteur_partage().reserver(cle, tokens_estimes, attente_max_s=0) if secours else reservation
+        with resa:
+            resultat = corriger_redaction_detaillee(api_key, modele_appel, tache, consigne, texte)
+            resa.confirmer(resultat[2]["total_tokens"] or int(resa.tokens_estimes))
+        return resultat
+
+    if not routage_auto:
+        evaluation, brut, _ = executer(modele, False)
+        return evaluation, brut, modele
+    (evaluation, brut, _), modele_utilise = routeur_partage(get_default_model()).corriger(
+        executer, sujet["niveau"], tache, compter_mots(texte)
+    )
+    return evaluation, brut, modele_utilise
+
+
+@st.cache_resource(max_entries=2)
+def get_analyseur_redaction(version_contenu: str) -> AnalyseurRedaction:
+    connecteurs = extraire_connecteurs(
+        db.get_lessons_by_title("connecteur"),
+        db.get_qcm("Connecteurs", "Tous"),
+    )
+    return AnalyseurRedaction(connecteurs)
+
+
+def afficher_pre_analyse(texte: str) -> None:
+    if not texte.strip():
+        return
+    analyse = get_analyseur_redaction(version_contenu()).analyser(texte)
+
+    ligne = st.container(horizontal=True, horizontal_alignment="left", gap="small")
+    with ligne:
+        st.metric("Phrases", analyse["nb_phrases"])
+        st.metric("Mots / phrase", analyse["mots_par_phrase"])
+        st.metric("Diversite lexicale", f"{round(analyse['diversite_lexicale'] * 100)}%")
+        st.metric("Connecteurs", sum(n for _, _, n in analyse["connecteurs"]))
+
+    with st.expander("Pre-analyse locale (gratuite, avant correction)", expanded=False):
+        if analyse["connecteurs"]:
+            st.markdown(
+                "**Connecteurs utilises:** "
+                + ", ".join(f"{c} ({f}, x{n})" for c, f, n in analyse["connecteurs"])
+            )
+        if analyse["fonctions_manquantes"]:
+            st.markdown("**Fonctions absentes:** " + ", ".join(analyse["fonctions_manquantes"]))
+        if analyse["repetitions"]:
+            st.markdown("**Mots repetes:** " + ", ".join(f"{m} (x{n})" for m, n in analyse["repetitions"]))
+        if analyse["accents_probables"]:
+            st.markdown(
+                "**Accents probablement oublies:** "
+                + ", ".join(f"{m} -> {correct}" for m, correct in analyse["accents_probables"])
+            )
+        if analyse["marqueurs_familiers"]:
+            st.markdown("**Registre familier:** " + ", ".join(analyse["marqueurs_familiers"]))
+        if analyse["marqueurs_soutenus"]:
+            st.markdown("**Registre soutenu:** " + ", ".join(analyse["marqueurs_soutenus"]))
+        if analyse["melange_tu_vous"]:
+            st.warning("Melange de tutoiement et de vouvoiement.")
+
+
 def compter_mots(texte: str) -> int:
     return len([mot for mot in texte.strip().split() if mot])
 
@@ -141,10 +274,52 @@ def evaluer_barreme_ce(score: int, total: int) -> dict[str, Any]:
     return {"pourcentage": pourcentage, "niveau": niveau, "score_tcf_simule": score_tcf}
 
 
+@st.cache_resource
+def preparer_tables_utilisateurs() -> None:
+    db.ensure_auth_tables()
+
+
+@st.fragment(run_every=2)
+def attendre_base() -> None:
+    statut = db.read_bootstrap_status() or {}
+    etat = statut.get("state")
+    # Pendant une restauration complete, le fichier present va etre remplace: on attend la fin.
+    if etat != "restoring" and (db.database_exists() or etat != "running"):
+        st.rerun(scope="app")
+    ecoule = max(0.0, time.time() - float(statut.get("since") or time.time()))
+    st.caption(f"Preparation en cours depuis {ecoule:.0f} s...")
+
+
+def afficher_prechauffage() -> None:
+    st.title("Coach TCF Francais")
+    st.info("Demarrage en cours: la base de contenu se prepare. La page s'ouvrira automatiquement.")
+    attendre_base()
+
+
+def version_contenu() -> str:
+    # Cle des caches de contenu: une publication les invalide sans redemarrage.
+    return st.session_state.get("version-contenu") or "app.db"
+
+
 def verifier_base() -> bool:
+    statut = db.read_bootstrap_status() or {}
+    if statut.get("state") == "restoring":
+        afficher_prechauffage()
+        return False
     if db.database_exists():
+        preparer_tables_utilisateurs()
+        # Tout le rerun lit la meme version de contenu, meme si une publication a lieu entre-temps.
+        st.session_state["version-contenu"] = db.pin_content_version()
         return True
 
+    if statut.get("state") == "running":
+        afficher_prechauffage()
+        return False
+    if statut.get("state") == "failed":
+        st.error(f"Initialisation de la base en echec: {statut.get('message', '')}")
+        st.info("Consulte les logs de demarrage, corrige puis redeploie.")
+        return False
+
     st.error("Base SQLite absente.")
     st.code("python3 scripts/init_db.py")
     st.info("Initialise la base puis relance l'application.")
@@ -205,10 +380,87 @@ def afficher_lessons_par_categorie(category_slug: str, titre: str) -> None:
                 st.caption("Tags: " + ", ".join(tags))
 
 
+def charger_lot_revision(user_id: int, niveau: str, theme: str) -> list[dict[str, Any]]:
+    cartes = db.get_due_vocab(user_id, format_date(maintenant_utc()), niveau, theme, TAILLE_LOT_REVISION)
+    if len(cartes) < TAILLE_LOT_REVISION:
+        nouvelles = min(NOUVELLES_PAR_LOT, TAILLE_LOT_REVISION - len(cartes))
+        cartes += db.get_new_vocab(user_id, niveau, theme, nouvelles)
+    return cartes
+
+
+def reveler_carte() -> None:
+    st.session_state["srs-revele"] = True
+
+
+def noter_carte(user_id: int, note: str) -> None:
+    carte = st.session_state["srs-file"].pop(0)
+    etat = EtatCarte(
+        repetitions=int(carte.get("repetitions") or 0),
+        intervalle_jours=float(carte.get("interval_days") or 0.0),
+        facilite=float(carte.get("ease") or 2.5),
+        oublis=int(carte.get("lapses") or 0),
+    )
+    moment = maintenant_utc()
+    nouvel_etat, echeance = planifier(etat, NOTES[note], moment)
+    db.save_vocab_review(
+        user_id,
+        int(carte["id"]),
+        format_date(echeance),
+        nouvel_etat.intervalle_jours,
+        nouvel_etat.facilite,
+        nouvel_etat.repetitions,
+        nouvel_etat.oublis,
+        format_date(moment),
+    )
+    st.session_state["srs-revele"] = False
+    st.session_state["srs-revues"] = st.session_state.get("srs-revues", 0) + 1
+
+
+def afficher_revision_vocabulaire(niveau: str, theme: str) -> None:
+    utilisateur = utilisateur_connecte()
+    if utilisateur is None:
+        st.info("Connecte-toi pour suivre tes revisions de vocabulaire.")
+        return
+    user_id = int(utilisateur["id"])
+
+    # Lot precharge en session: noter une carte affiche la suivante sans relire la base.
+    signature = (user_id, niveau, theme)
+    if st.session_state.get("srs-signature") != signature or not st.session_state.get("srs-file"):
+        st.session_state["srs-file"] = charger_lot_revision(user_id, niveau, theme)
+        st.session_state["srs-signature"] = signature
+        st.session_state["srs-revele"] = False
+    file = st.session_state["srs-file"]
+
+    suivi = st.container(horizontal=True, horizontal_alignment="left", gap="small")
+    with suivi:
+        st.metric("Cartes dans le lot", len(file))
+        st.metric("Revues (session)", st.session_state.get("srs-revues", 0))
+    if not file:
+        st.success("Aucune carte a revoir pour le moment.")
+        return
+
+    carte = file[0]
+    with st.container(border=True):
+        st.markdown(f"### {carte['mot']}")
+        statut = "a revoir" if carte.get("due_at") else "nouvelle"
+        st.caption(f"Niveau: {carte['niveau']} · Theme: {carte['theme']} · Carte {statut}")
+        if not st.session_state.get("srs-revele"):
+            st.button("Voir la reponse", type="primary", on_click=reveler_carte)
+            return
+        st.markdown(f"**Definition:** {carte['definition_fr']}")
+        st.markdown(f"**Traduction EN:** {carte['traduction_en']}")
+        st.markdown(f"**Exemple:** {carte['exemple_fr']}")
+        notes = st.container(horizontal=True, horizontal_alignment="left", gap="small")
+        with notes:
+            for note in NOTES:
+                st.button(note, key=f"srs-note-{note}", on_click=noter_carte, args=(user_id, note))
+
+
 def afficher_vocabulaire() -> None:
     st.title("Vocabulaire")
     niveaux = ["Tous"] + db.list_levels_for_table("vocabulary")
     themes = ["Tous"] + db.list_themes_vocab()
+    mode = st.radio("Mode", ["Recherche", "Revision"], horizontal=True, key="vocab-mode")
 
     filtres = st.container(
         border=True,
@@ -218,10 +470,14 @@ def afficher_vocabulaire() -> None:
         gap="small",
     )
     with filtres:
-        recherche = st.text_input("Recherche mot ou definition", key="vocab-search")
+        recherche = st.text_input("Recherche mot ou definition", key="vocab-search") if mode == "Recherche" else ""
         niveau = st.selectbox("Niveau", niveaux, key="vocab-level")
         theme = st.selectbox("Theme", themes, key="vocab-theme")
 
+    if mode == "Revision":
+        afficher_revision_vocabulaire(niveau, theme)
+        return
+
     resultats = db.search_vocabulary(recherche, niveau, theme)
     st.write(f"{len(resultats)} entree(s) trouvee(s).")
 
@@ -283,13 +539,31 @@ def afficher_qcm() -> None:
         vertical_alignment="bottom",
         gap="small",
     )
+    # Valeur du toggle deja connue au rerun: en adaptatif, le niveau vient de theta, pas du filtre.
+    mode_adaptatif = bool(st.session_state.get("qcm-mode-adaptatif", False))
     with filtres:
         theme = st.selectbox("Theme", themes, index=0)
-        niveau = st.selectbox("Niveau", niveaux, index=0)
+        niveau = st.selectbox(
+            "Niveau",
+            niveaux,
+            index=0,
+            disabled=mode_adaptatif,
+            help="En mode adaptatif, le niveau suit tes reponses." if mode_adaptatif else None,
+        )
         taille = st.slider("Nombre de questions", min_value=3, max_value=20, value=5, step=1)
         melanger = st.toggle("Melanger", value=True)
+        adaptatif = st.toggle(
+            "Adaptatif",
+            value=False,
+            key="qcm-mode-adaptatif",
+            help="Questions choisies selon tes reponses.",
+        )
         generer = st.button("Nouvelle serie", type="primary")
 
+    if adaptatif:
+        afficher_qcm_adaptatif(theme, taille, generer)
+        return
+
     signature = (theme, niveau, taille, melanger)
     if generer or st.session_state.get("signature-qcm-db") != signature:
         questions = db.get_qcm(theme, niveau)
@@ -297,6 +571,7 @@ def afficher_qcm() -> None:
             random.shuffle(questions)
         st.session_state["serie-qcm-db"] = questions[: min(taille, len(questions))]
         st.session_state["signature-qcm-db"] = signature
+        st.session_state["debut-qcm-db"] = time.time()
 
     serie = st.session_state.get("serie-qcm-db", [])
     if not serie:
@@ -318,12 +593,22 @@ def afficher_qcm() -> None:
 
     if corriger:
         bonnes = 0
+        reponses: list[tuple[int, int | None, bool]] = []
         for q in serie:
             rep = st.session_state.get(f"reponse-{q['id']}")
+            reponses.append((int(q["id"]), rep, rep == q["answer_index"]))
             if rep == q["answer_index"]:
                 bonnes += 1
         score = round((bonnes / len(serie)) * 100)
         st.metric("Score", f"{score}% ({bonnes}/{len(serie)})")
+        serie_id = journaliser_reponses("qcm", reponses, st.session_state.get("debut-qcm-db"))
+        journaliser_resultat(
+            "qcm",
+            "serie_corrigee",
+            bonnes,
+            len(serie),
+            {"theme": theme, "niveau": niveau, "questions": [q["id"] for q in serie], "serie_id": serie_id},
+        )
 
         st.subheader("Corrige")
         for q in serie:
@@ -335,6 +620,115 @@ def afficher_qcm() -> None:
             st.markdown(f"- Explication: {q['explication']}")
 
 
+@st.cache_resource(ttl=600, max_entries=2)
+def get_banque_qcm(version_contenu: str) -> tuple[IndexItems, dict[int, dict[str, Any]]]:
+    questions = {int(q["id"]): q for q in db.get_qcm("Tous", "Tous")}
+    calibration = db.get_item_calibration("qcm")
+    index = IndexItems(
+        (item_id, q["theme"], difficulte_item(q["niveau"], *calibration.get(item_id, (0, 0))))
+        for item_id, q in questions.items()
+    )
+    return index, questions
+
+
+def afficher_qcm_adaptatif(theme: str, taille: int, nouvelle: bool) -> None:
+    index, questions = get_banque_qcm(version_contenu())
+    etat = st.session_state.get("qcm-adaptatif")
+    if nouvelle or etat is None or etat["theme"] != theme or etat["taille"] != taille:
+        # Point de depart: niveau estime sur l'historique recent, sinon B1.
+        utilisateur = utilisateur_connecte()
+        historique = db.get_user_answer_history(int(utilisateur["id"]), "qcm", 50) if utilisateur else []
+        theta_depart, _ = estimer_theta(
+            (index.difficulte(item_id), correcte)
+            for item_id, correcte in historique
+            if index.difficulte(item_id) is not None
+        )
+        etat = {
+            "theme": theme,
+            "taille": taille,
+            "theta_depart": theta_depart,
+            "reponses": [],
+            "courant": index.prochain(theme, theta_depart, set()),
+            "debut": time.time(),
+            "termine": False,
+        }
+        st.session_state["qcm-adaptatif"] = etat
+
+    reponses: list[tuple[int, int | None, bool]] = etat["reponses"]
+
+    def estimation() -> tuple[float, float]:
+        return estimer_theta(
+            ((index.difficulte(item_id) or 0.0, correcte) for item_id, _, correcte in reponses),
+            prior_moyenne=etat["theta_depart"],
+        )
+
+    theta, se = estimation()
+
+    suivi = st.container(horizontal=True, horizontal_alignment="left", gap="small")
+    with suivi:
+        st.metric("Questions", f"{len(reponses)}/{taille}")
+        st.metric("Niveau estime", niveau_depuis_theta(theta))
+        st.metric("Precision", f"± {se:.2f}")
+
+    if not etat["termine"] and etat["courant"] is None:
+        etat["termine"] = True
+    if not etat["termine"]:
+        q = questions[etat["courant"]]
+        numero = len(reponses) + 1
+        with st.form(f"form-qcm-adaptatif-{numero}"):
+            st.markdown(f"**{numero}. {q['question']}**")
+            st.radio(
+                "Choix",
+                options=list(range(len(q["options"]))),
+                format_func=lambda idx, opts=q["options"]: opts[idx],
+                key=f"adaptatif-rep-{numero}",
+                index=None,
+                label_visibility="collapsed",
+            )
+            valider = st.form_submit_button("Valider")
+        if valider:
+            rep = st.session_state.get(f"adaptatif-rep-{numero}")
+            reponses.append((int(q["id"]), rep, rep == q["answer_index"]))
+            theta, se = estimation()
+            if se > SE_CIBLE and len(reponses) < taille:
+                etat["courant"] = index.prochain(theme, theta, {item_id for item_id, _, _ in reponses})
+            else:
+                etat["courant"] = None
+            if etat["courant"] is None:
+                etat["termine"] = True
+                bonnes = sum(1 for _, _, correcte in reponses if correcte)
+                serie_id = journaliser_reponses("qcm", reponses, etat["debut"])
+                journaliser_resultat(
+                    "qcm",
+                    "serie_corrigee",
+                    bonnes,
+                    len(reponses),
+                    {
+                        "theme": theme,
+                        "mode": "adaptatif",
+                        "theta": round(theta, 2),
+                        "erreur_standard": round(se, 2),
+                        "niveau_estime": niveau_depuis_theta(theta),
+                        "questions": [item_id for item_id, _, _ in reponses],
+                        "serie_id": serie_id,
+                    },
+                )
+            st.rerun()
+        return
+
+    bonnes = sum(1 for _, _, correcte in reponses if correcte)
+    st.success(
+        f"Test termine en {len(reponses)} questions: niveau estime {niveau_depuis_theta(theta)} "
+        f"({bonnes}/{len(reponses)} bonnes reponses)."
+    )
+    st.subheader("Corrige")
+    for item_id, rep, ok in reponses:
+        q = questions[item_id]
+        st.markdown(f"**{'✅' if ok else '❌'} {q['question']}**")
+        st.markdown(f"- Bonne reponse: {q['options'][q['answer_index']]}")
+        st.markdown(f"- Explication: {q['explication']}")
+
+
 def afficher_expression_ecrite() -> None:
     st.title("Expression ecrite")
     st.caption("Correction et notation avec API OpenAI.")
@@ -370,7 +764,8 @@ def afficher_expression_ecrite() -> None:
             st.success("Cle API serveur detectee (masquee).")
         else:
             st.warning("Aucune cle API serveur configuree.")
-        modele = st.text_input("Modele", key="openai_model")
+        routage_auto = st.toggle("Modele automatique", value=True, help="Choisi selon le niveau, la tache et la longueur.")
+        modele = st.text_input("Modele", key="openai_model", disabled=routage_auto)
 
     st.markdown(f"**Consigne:** {sujet['consigne']}")
     st.caption(f"Longueur cible: {sujet['min_mots']} a {sujet['max_mots']} mots.")
@@ -388,6 +783,8 @@ def afficher_expression_ecrite() -> None:
         st.metric("Cible", f"{sujet['min_mots']}-{sujet['max_mots']}")
         st.metric("Statut", statut_longueur)
 
+    afficher_pre_analyse(texte)
+
     if st.button("Corriger et noter", type="primary"):
         api_key_effective = api_key.strip() if utiliser_cle_personnelle else api_key_serveur
         if not api_key_effective:
@@ -399,13 +796,20 @@ def afficher_expression_ecrite() -> None:
 
         with st.spinner("Correction en cours..."):
             try:
-                evaluation, brut = corriger_redaction_avec_openai(
+                evaluation, brut, modele_utilise = corriger_redaction(
                     api_key=api_key_effective,
                     modele=modele.strip(),
-                    tache=sujet["tache_tcf"],
-                    consigne=sujet["consigne"],
+                    sujet=sujet,
                     texte=texte.strip(),
+                    cle_serveur=not utiliser_cle_personnelle,
+                    routage_auto=routage_auto,
                 )
+            except (BudgetEpuise, AttenteTropLongue) as err:
+                st.warning(str(err))
+                return
+            except RateLimitError:
+                st.warning("Le service de correction est sature. Reessaie dans une minute.")
+                return
             except Exception as err:
                 st.error(f"Erreur API: {err}")
                 return
@@ -416,6 +820,15 @@ def afficher_expression_ecrite() -> None:
             return
 
         st.metric("Note globale", f"{evaluation.get('note_globale_sur_20', 'N/A')}/20")
+        st.caption(f"Corrige par: {modele_utilise}")
+        note = evaluation.get("note_globale_sur_20")
+        journaliser_resultat(
+            "expression_ecrite",
+            "redaction_corrigee",
+            note if isinstance(note, (int, float)) else None,
+            20,
+            {"prompt_id": int(sujet["id"]), "nb_mots": nb_mots, "modele": modele_utilise},
+        )
         criteres = evaluation.get("criteres", {})
         if isinstance(criteres, dict):
             ligne = st.container(horizontal=True, horizontal_alignment="left", gap="small")
@@ -452,6 +865,61 @@ def afficher_expression_ecrite() -> None:
         st.info(evaluation.get("conseil_methode", "Non fourni."))
 
 
+def afficher_progression() -> None:
+    st.title("Progression")
+    utilisateur = utilisateur_connecte()
+    if utilisateur is None:
+        st.info("Connecte-toi pour suivre ta progression.")
+        return
+
+    stats = db.get_user_stats(int(utilisateur["id"]))
+    if stats:
+        resume = st.container(border=True, horizontal=True, horizontal_alignment="distribute", gap="large")
+        with resume:
+            for module, valeurs in stats.items():
+                moyenne = valeurs["moyenne_pct"]
+                st.metric(
+                    module.replace("_", " ").capitalize(),
+                    f"{moyenne}%" if moyenne is not None else "N/A",
+                    help=f"{valeurs['tentatives']} tentative(s)",
+                )
+
+    st.subheader("Classement")
+    colonnes = st.container(horizontal=True, gap="large")
+    with colonnes:
+        for module, titre in (("comprehension_ecrite", "Comprehension ecrite"), ("qcm", "QCM")):
+            with st.container(border=True):
+                st.markdown(f"**{titre}**")
+                position = db.get_user_percentile(int(utilisateur["id"]), module)
+                if position is None:
+                    st.caption("Pas encore de score.")
+                else:
+                    st.metric(
+                        "Ta position",
+                        f"Top {max(1, round(100 - position['percentile']))}%",
+                        help=f"Rang {position['rang']} sur {position['participants']} apprenant(s)",
+                    )
+                classement = db.get_leaderboard(module, limit=10)
+                if classement:
+                    st.dataframe(classement, hide_index=True, width="stretch")
+
+    jours = st.select_slider("Periode", options=[7, 30, 90], value=90, format_func=lambda j: f"{j} jours")
+    serie = db.get_user_progress(int(utilisateur["id"]), days=jours)
+    if not serie:
+        st.info("Aucune activite sur cette periode.")
+        return
+
+    st.subheader("Score moyen par jour (%)")
+    st.line_chart(
+        [ligne for ligne in serie if ligne["moyenne_pct"] is not None],
+        x="jour",
+        y="moyenne_pct",
+        color="module",
+    )
+    st.subheader("Tentatives par jour")
+    st.bar_chart(serie, x="jour", y="tentatives", color="module")
+
+
 def afficher_comprehension_ecrite() -> None:
     st.title("Comprehension ecrite (simulation TCF)")
     st.caption("Format QCM progressif proche du TCF: questions explicites, inferentielles et lexicales.")
@@ -497,6 +965,7 @@ def afficher_comprehension_ecrite() -> None:
         st.write(passage["texte"])
 
     st.subheader("Questions")
+    st.session_state.setdefault(f"ce-debut-{passage['id']}", time.time())
     form_key = f"form-ce-{passage['id']}"
     with st.form(form_key):
         for q in questions:
@@ -515,8 +984,10 @@ def afficher_comprehension_ecrite() -> None:
     if corriger:
         bonnes = 0
         non_repondues = 0
+        reponses: list[tuple[int, int | None, bool]] = []
         for q in questions:
             rep = st.session_state.get(f"ce-rep-{passage['id']}-{q['id']}")
+            reponses.append((int(q["id"]), rep, rep == q["answer_index"]))
             if rep is None:
                 non_repondues += 1
                 continue
@@ -536,6 +1007,20 @@ def afficher_comprehension_ecrite() -> None:
 
         if non_repondues:
             st.warning(f"{non_repondues} question(s) sans reponse, comptees comme fausses.")
+        debut = st.session_state.pop(f"ce-debut-{passage['id']}", None)
+        serie_id = journaliser_reponses("lecture", reponses, debut)
+        journaliser_resultat(
+            "comprehension_ecrite",
+            "epreuve_corrigee",
+            bonnes,
+            total,
+            {
+                "passage_id": int(passage["id"]),
+                "niveau_estime": barreme["niveau"],
+                "score_tcf_simule": barreme["score_tcf_simule"],
+                "serie_id": serie_id,
+            },
+        )
 
         st.subheader("Correction detaillee")
         for q in questions:
@@ -568,9 +1053,11 @@ def main() -> None:
                 "Comprehension ecrite",
                 "QCM",
                 "Expression ecrite",
+                "Progression",
             ],
             index=0,
         )
+        afficher_connexion()
         st.caption("Interface en francais pour immersion TCF.")
 
     if page == "Accueil":
@@ -589,6 +1076,8 @@ def main() -> None:
         afficher_comprehension_ecrite()
     elif page == "QCM":
         afficher_qcm()
+    elif page == "Progression":
+        afficher_progression()
     else:
         afficher_expression_ecrite()
 
@@ -1,7 +1,8 @@
 PRAGMA foreign_keys = ON;
 
-DROP TABLE IF EXISTS user_activity;
-DROP TABLE IF EXISTS users;
+-- Tables de contenu uniquement: recreees a chaque import du pack.
+-- Les tables utilisateurs (comptes, activite, statistiques) sont gerees par migrations/.
+
 DROP TABLE IF EXISTS reading_questions;
 DROP TABLE IF EXISTS reading_passages;
 DROP TABLE IF EXISTS writing_prompts;
@@ -18,25 +19,6 @@ CREATE TABLE categories (
     description TEXT NOT NULL
 );
 
-CREATE TABLE users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL UNIQUE,
-    password_hash TEXT NOT NULL,
-    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE TABLE user_activity (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    module TEXT NOT NULL,
-    event_type TEXT NOT NULL,
-    score REAL,
-    total REAL,
-    meta_json TEXT NOT NULL DEFAULT '{}',
-    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
-
 CREATE TABLE lessons (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     category_slug TEXT NOT NULL,
@@ -125,5 +107,3 @@ CREATE INDEX idx_exercises_type ON exercises(type);
 CREATE INDEX idx_exercises_level ON exercises(niveau);
 CREATE INDEX idx_reading_passages_level ON reading_passages(niveau);
 CREATE INDEX idx_reading_questions_passage ON reading_questions(passage_id);
-CREATE INDEX idx_user_activity_user ON user_activity(user_id);
-CREATE INDEX idx_user_activity_module ON user_activity(module);
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from openai import OpenAI
+
+
+CONSIGNE_CORRECTEUR = (
+    "Tu es un correcteur expert du TCF. "
+    "Evalue selon: coherence, grammaire, lexique, orthographe, registre. "
+    "Retourne strictement un JSON valide avec ces cles: "
+    "note_globale_sur_20, criteres, points_forts, erreurs_prioritaires, "
+    "version_corrigee, conseil_methode."
+)
+
+
+def extraire_json_depuis_texte(texte: str) -> dict[str, Any] | None:
+    if not texte:
+        return None
+
+    propre = texte.strip()
+    if propre.startswith("```"):
+        propre = propre.strip("`")
+        if "\n" in propre:
+            propre = propre.split("\n", 1)[1]
+
+    debut = propre.find("{")
+    fin = propre.rfind("}")
+    if debut == -1 or fin == -1 or fin <= debut:
+        return None
+
+    try:
+        return json.loads(propre[debut : fin + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def construire_messages(tache: str, consigne: str, texte: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": CONSIGNE_CORRECTEUR},
+        {
+            "role": "user",
+            "content": (
+                f"Tache TCF: {tache}\n"
+                f"Consigne: {consigne}\n"
+                "Texte du candidat:\n"
+                f"{texte}"
+            ),
+        },
+    ]
+
+
+def lire_usage(reponse: Any) -> dict[str, int]:
+    usage = getattr(reponse, "usage", None)
+    return {
+        "input_tokens": int(getattr(usage, "input_tokens", 0) or 0),
+        "output_tokens": int(getattr(usage, "output_tokens", 0) or 0),
+        "total_tokens": int(getattr(usage, "total_tokens", 0) or 0),
+    }
+
+
+def corriger_redaction_detaillee(
+    api_key: str, modele: str, tache: str, consigne: str, texte: str
+) -> tuple[dict[str, Any] | None, str, dict[str, int]]:
+    # OPENAI_BASE_URL (lu par le SDK) permet de viser le serveur local de test.
+    client = OpenAI(api_key=api_key)
+    reponse = client.responses.create(
+        model=modele,
+        input=construire_messages(tache, consigne, texte),
+    )
+
+    brut = (reponse.output_text or "").strip()
+    return extraire_json_depuis_texte(brut), brut, lire_usage(reponse)
+
+
+def corriger_redaction_avec_openai(
+    api_key: str, modele: str, tache: str, consigne: str, texte: str
+) -> tuple[dict[str, Any] | None, str]:
+    evaluation, brut, _ = corriger_redaction_detaillee(api_key, modele, tache, consigne, texte)
+    return evaluation, brut
@@ -1,62 +1,279 @@
 from __future__ import annotations
 
+import atexit
 import hashlib
 import hmac
 import json
+import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Generic, TypeVar
 
 
+logger = logging.getLogger(__name__)
+
 ROOT_DIR = Path(__file__).resolve().parent
 DB_PATH = Path(os.getenv("APP_DB_PATH", str(ROOT_DIR / "data" / "app.db")))
 
 
-def _connect() -> sqlite3.Connection:
+# Contenu publie a chaud (scripts/publish_content.py): fichiers versionnes + pointeur CURRENT.
+CONTENT_DIR = Path(os.getenv("CONTENT_DB_DIR", str(DB_PATH.parent / "content")))
+CONTENT_POINTER = CONTENT_DIR / "CURRENT"
+_pointer_lock = threading.Lock()
+_pointer_cache: tuple[int, str | None] = (-1, None)
+_pinned = threading.local()
+
+
+def current_content_version() -> str | None:
+    """Fichier de contenu actif (relu seulement quand le pointeur change), None = contenu dans app.db."""
+    global _pointer_cache
+    try:
+        mtime_ns = CONTENT_POINTER.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _pointer_lock:
+        if _pointer_cache[0] != mtime_ns:
+            name = CONTENT_POINTER.read_text(encoding="utf-8").strip() or None
+            _pointer_cache = (mtime_ns, name)
+        return _pointer_cache[1]
+
+
+def pin_content_version() -> str | None:
+    """Fige la version de contenu pour le thread courant (un rerun Streamlit).
+
+    Une publication pendant le rerun ne change rien pour lui: la nouvelle
+    version est prise au rerun suivant.
+    """
+    _pinned.version = current_content_version()
+    return _pinned.version
+
+
+def _content_path() -> Path | None:
+    version = _pinned.version if hasattr(_pinned, "version") else current_content_version()
+    return CONTENT_DIR / version if version else None
+
+
+def _connect_app() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+def _connect() -> sqlite3.Connection:
+    content = _content_path()
+    if content is None:
+        return _connect_app()
+    # Contenu en main (lecture seule, fichier jamais modifie), donnees utilisateurs attachees:
+    # les noms de tables non qualifies trouvent le contenu dans main, le reste dans app.
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(f"{content.absolute().as_uri()}?mode=ro&immutable=1", uri=True)
+    conn.execute("ATTACH DATABASE ? AS app", (f"{DB_PATH.absolute().as_uri()}?mode=rwc",))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
 def database_exists() -> bool:
     return DB_PATH.exists()
 
 
-def ensure_auth_tables() -> None:
-    with _connect() as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password_hash TEXT NOT NULL,
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS user_activity (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                module TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                score REAL,
-                total REAL,
-                meta_json TEXT NOT NULL DEFAULT '{}',
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-            """
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_user_activity_user ON user_activity(user_id)"
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_user_activity_module ON user_activity(module)"
+def _db_inode() -> int | None:
+    try:
+        return DB_PATH.stat().st_ino
+    except FileNotFoundError:
+        return None
+
+
+# Etat du bootstrap lance en arriere-plan par run.py: running | restoring | ready | failed.
+# restoring: restauration complete en cours, le fichier en place va etre remplace.
+BOOTSTRAP_STATUS_PATH = Path(
+    os.getenv("BOOTSTRAP_STATUS_PATH", str(DB_PATH.with_name(DB_PATH.name + ".bootstrap.json")))
+)
+
+
+def read_bootstrap_status() -> dict[str, Any] | None:
+    try:
+        return json.loads(BOOTSTRAP_STATUS_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def write_bootstrap_status(state: str, message: str = "") -> None:
+    previous = read_bootstrap_status() or {}
+    since = previous.get("since") if previous.get("state") == state else None
+    status = {"state": state, "message": message, "since": since or time.time(), "updated_at": time.time()}
+    BOOTSTRAP_STATUS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = BOOTSTRAP_STATUS_PATH.with_name(BOOTSTRAP_STATUS_PATH.name + ".tmp")
+    tmp_path.write_text(json.dumps(status), encoding="utf-8")
+    os.replace(tmp_path, BOOTSTRAP_STATUS_PATH)
+
+
+MIGRATIONS_DIR = Path(os.getenv("DB_MIGRATIONS_DIR", str(ROOT_DIR / "migrations")))
+# (version, nom, sql, sha256 du fichier)
+Migration = tuple[int, str, str, str]
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def list_migrations(directory: Path | None = None) -> list[Migration]:
+    """Fichiers NNNN_nom.sql du dossier migrations/, tries par version."""
+    migrations: list[Migration] = []
+    for path in sorted((directory or MIGRATIONS_DIR).glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        if not version.isdigit() or not name:
+            raise MigrationError(f"Nom de migration invalide: {path.name} (attendu NNNN_nom.sql)")
+        sql = path.read_text(encoding="utf-8")
+        migrations.append((int(version), name, sql, hashlib.sha256(sql.encode("utf-8")).hexdigest()))
+    versions = [migration[0] for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError("Deux migrations partagent le meme numero de version.")
+    return migrations
+
+
+def _split_statements(script: str) -> list[str]:
+    statements: list[str] = []
+    pending = ""
+    for line in script.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statements.append(pending)
+            pending = ""
+    if pending.strip() and sqlite3.complete_statement(pending + ";"):
+        statements.append(pending)
+    return statements
+
+
+def apply_migrations(conn: sqlite3.Connection, directory: Path | None = None) -> list[int]:
+    """Applique les migrations manquantes, chacune dans sa propre transaction.
+
+    Une migration deja appliquee dont le fichier a change leve MigrationError:
+    on ajoute une nouvelle migration plutot que de reecrire l'historique.
+    Renvoie les versions appliquees par cet appel.
+    """
+    migrations = list_migrations(directory)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            duration_ms REAL
         )
+        """
+    )
+    conn.commit()
+    applied = dict(conn.execute("SELECT version, checksum FROM schema_version").fetchall())
+    for version, name, _, checksum in migrations:
+        if version in applied and applied[version] != checksum:
+            raise MigrationError(f"Migration {version:04d}_{name} modifiee apres application (checksum different).")
+    pending = [migration for migration in migrations if migration[0] not in applied]
+    if not pending:
+        return []
+
+    done: list[int] = []
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    # Reconstructions de tables: cles etrangeres desactivees hors transaction, verifiees avant COMMIT.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, name, sql, checksum in pending:
+            start = time.perf_counter()
+            # IMMEDIATE: un seul processus migre a la fois, les autres attendent puis sautent.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                    conn.execute("ROLLBACK")
+                    continue
+                for statement in _split_statements(sql):
+                    conn.execute(statement)
+                if conn.execute("PRAGMA foreign_key_check").fetchone():
+                    raise MigrationError(f"Migration {version:04d}_{name}: cles etrangeres invalides.")
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, checksum, duration_ms) VALUES (?, ?, ?, ?)",
+                    (version, name, checksum, round((time.perf_counter() - start) * 1000, 2)),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            done.append(version)
+    finally:
+        conn.isolation_level = isolation_level
+    return done
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0] or 0)
+
+
+def get_content_meta(conn: sqlite3.Connection) -> dict[str, Any] | None:
+    """Ligne unique de la table meta, ou None si la base n'a jamais ete marquee."""
+    try:
+        row = conn.execute(
+            "SELECT content_version, content_sha256, source, schema_version, import_complete, updated_at "
+            "FROM meta WHERE id = 1"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None:
+        return None
+    keys = ("content_version", "content_sha256", "source", "schema_version", "import_complete", "updated_at")
+    return dict(zip(keys, tuple(row)))
+
+
+def set_content_meta(
+    conn: sqlite3.Connection,
+    content_sha256: str | None,
+    source: str,
+    content_version: str | None = None,
+    complete: bool = True,
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO meta (id, content_version, content_sha256, source, schema_version, import_complete, updated_at)
+        VALUES (1, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(id) DO UPDATE SET
+            content_version = excluded.content_version,
+            content_sha256 = excluded.content_sha256,
+            source = excluded.source,
+            schema_version = excluded.schema_version,
+            import_complete = excluded.import_complete,
+            updated_at = excluded.updated_at
+        """,
+        (content_version, content_sha256, source, get_schema_version(conn), int(complete)),
+    )
+
+
+def ensure_auth_tables() -> None:
+    with _connect_app() as conn:
+        apply_migrations(conn)
+        has_raw = conn.execute("SELECT 1 FROM user_activity LIMIT 1").fetchone() is not None
+        has_monthly = conn.execute("SELECT 1 FROM user_activity_monthly LIMIT 1").fetchone() is not None
+        # Tout compacte: user_daily_stats ne peut pas etre reconstruit, seul user_module_stats compte.
+        rollups_empty = (
+            conn.execute("SELECT 1 FROM user_module_stats LIMIT 1").fetchone() is None
+            and (has_raw or has_monthly)
+        ) or (has_raw and conn.execute("SELECT 1 FROM user_daily_stats LIMIT 1").fetchone() is None)
+        if rollups_empty:
+            rebuild_user_rollups(conn)
+        elif (
+            conn.execute("SELECT 1 FROM score_histogram LIMIT 1").fetchone() is None
+            and conn.execute("SELECT 1 FROM user_module_stats WHERE pct_count > 0 LIMIT 1").fetchone()
+        ):
+            rebuild_score_histogram(conn)
         conn.commit()
 
 
@@ -132,6 +349,13 @@ def search_lessons(category_slug: str, search: str, level: str) -> list[dict[str
     return rows
 
 
+def get_lessons_by_title(keyword: str) -> list[dict[str, Any]]:
+    return fetch_all(
+        "SELECT id, category_slug, titre, contenu_markdown FROM lessons WHERE lower(titre) LIKE ? ORDER BY id",
+        (f"%{keyword.lower()}%",),
+    )
+
+
 def search_vocabulary(search: str, level: str, theme: str, limit: int = 100) -> list[dict[str, Any]]:
     query = """
         SELECT mot, definition_fr, traduction_en, exemple_fr, niveau, theme
@@ -155,6 +379,78 @@ def search_vocabulary(search: str, level: str, theme: str, limit: int = 100) ->
     return fetch_all(query, tuple(params))
 
 
+VOCAB_CARD_COLUMNS = "v.id, v.mot, v.definition_fr, v.traduction_en, v.exemple_fr, v.niveau, v.theme"
+
+
+def get_due_vocab(user_id: int, now: str, level: str, theme: str, limit: int = 20) -> list[dict[str, Any]]:
+    query = f"""
+        SELECT {VOCAB_CARD_COLUMNS},
+            r.due_at, r.interval_days, r.ease, r.repetitions, r.lapses
+        FROM vocab_reviews r
+        JOIN vocabulary v ON v.id = r.vocab_id
+        WHERE r.user_id = ? AND r.due_at <= ?
+    """
+    params: list[Any] = [user_id, now]
+    if level != "Tous":
+        query += " AND v.niveau = ?"
+        params.append(level)
+    if theme != "Tous":
+        query += " AND v.theme = ?"
+        params.append(theme)
+    query += " ORDER BY r.due_at LIMIT ?"
+    params.append(limit)
+    return fetch_all(query, tuple(params))
+
+
+def get_new_vocab(user_id: int, level: str, theme: str, limit: int = 10) -> list[dict[str, Any]]:
+    query = f"""
+        SELECT {VOCAB_CARD_COLUMNS}
+        FROM vocabulary v
+        WHERE NOT EXISTS (SELECT 1 FROM vocab_reviews r WHERE r.user_id = ? AND r.vocab_id = v.id)
+    """
+    params: list[Any] = [user_id]
+    if level != "Tous":
+        query += " AND v.niveau = ?"
+        params.append(level)
+    if theme != "Tous":
+        query += " AND v.theme = ?"
+        params.append(theme)
+    query += " ORDER BY v.id LIMIT ?"
+    params.append(limit)
+    return fetch_all(query, tuple(params))
+
+
+def save_vocab_review(
+    user_id: int,
+    vocab_id: int,
+    due_at: str,
+    interval_days: float,
+    ease: float,
+    repetitions: int,
+    lapses: int,
+    reviewed_at: str,
+) -> None:
+    with _connect_app() as conn:
+        conn.execute(
+            """
+            INSERT INTO vocab_reviews (
+                user_id, vocab_id, due_at, interval_days, ease, repetitions, lapses, reviews, last_reviewed_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (user_id, vocab_id) DO UPDATE SET
+                due_at = excluded.due_at,
+                interval_days = excluded.interval_days,
+                ease = excluded.ease,
+                repetitions = excluded.repetitions,
+                lapses = excluded.lapses,
+                reviews = reviews + 1,
+                last_reviewed_at = excluded.last_reviewed_at
+            """,
+            (user_id, vocab_id, due_at, interval_days, ease, repetitions, lapses, reviewed_at),
+        )
+        conn.commit()
+
+
 def get_conjugations(verb: str, tense: str) -> list[dict[str, Any]]:
     return fetch_all(
         """
@@ -212,18 +508,64 @@ def get_writing_prompts(level: str) -> list[dict[str, Any]]:
     )
 
 
+# KDF memoire-dure; N/r/p reglables, les anciens hashs sont re-haches a la connexion.
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "16384"))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# Les KDF passent par un pool borne: sous une rafale de connexions, la memoire
+# (128 * N * r octets par calcul) et le CPU restent plafonnes, les autres attendent.
+KDF_WORKERS = max(1, int(os.getenv("PASSWORD_KDF_WORKERS", "2")))
+KDF_TIMEOUT_S = float(os.getenv("PASSWORD_KDF_TIMEOUT_S", "10"))
+_kdf_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + (1 << 20), dklen=32
+    )
+
+
 def _make_password_hash(password: str, salt: str | None = None) -> str:
     use_salt = salt or os.urandom(16).hex()
-    digest = hashlib.sha256(f"{use_salt}:{password}".encode("utf-8")).hexdigest()
-    return f"{use_salt}${digest}"
+    digest = _scrypt(password, bytes.fromhex(use_salt), SCRYPT_N, SCRYPT_R, SCRYPT_P).hex()
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${use_salt}${digest}"
 
 
 def _verify_password(password: str, stored_hash: str) -> bool:
-    if "$" not in stored_hash:
-        return False
-    salt, expected = stored_hash.split("$", 1)
-    candidate = _make_password_hash(password, salt).split("$", 1)[1]
-    return hmac.compare_digest(candidate, expected)
+    parts = stored_hash.split("$")
+    if len(parts) == 6 and parts[0] == "scrypt":
+        _, n, r, p, salt, expected = parts
+        candidate = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p)).hex()
+        return hmac.compare_digest(candidate, expected)
+    if len(parts) == 2:
+        # Ancien format: sha256(salt:password).
+        salt, expected = parts
+        candidate = hashlib.sha256(f"{salt}:{password}".encode("utf-8")).hexdigest()
+        return hmac.compare_digest(candidate, expected)
+    return False
+
+
+def _needs_rehash(stored_hash: str) -> bool:
+    return not stored_hash.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+def _run_kdf(fn: Callable[..., Any], *args: Any) -> Any:
+    future = _kdf_pool.submit(fn, *args)
+    try:
+        return future.result(timeout=KDF_TIMEOUT_S)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError("Trop de connexions simultanees, reessaie dans un instant.") from None
+
+
+def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    new_hash = _make_password_hash(password)
+    with _connect_app() as conn:
+        conn.execute(
+            "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+            (new_hash, user_id, old_hash),
+        )
+        conn.commit()
 
 
 def create_user(username: str, password: str) -> tuple[bool, str]:
@@ -233,9 +575,9 @@ def create_user(username: str, password: str) -> tuple[bool, str]:
     if len(password) < 4:
         return False, "Le mot de passe doit contenir au moins 4 caracteres."
 
-    password_hash = _make_password_hash(password)
+    password_hash = _run_kdf(_make_password_hash, password)
     try:
-        with _connect() as conn:
+        with _connect_app() as conn:
             conn.execute(
                 "INSERT INTO users (username, password_hash) VALUES (?, ?)",
                 (username_clean, password_hash),
@@ -247,15 +589,208 @@ def create_user(username: str, password: str) -> tuple[bool, str]:
 
 
 def authenticate_user(username: str, password: str) -> dict[str, Any] | None:
+    """Verifie les identifiants (KDF hors du thread appelant); leve TimeoutError si le pool est sature."""
     username_clean = username.strip().lower()
     row = fetch_one("SELECT id, username, password_hash FROM users WHERE username = ?", (username_clean,))
     if not row:
+        # Meme cout qu'un compte existant: le temps de reponse ne revele pas les noms.
+        _run_kdf(_make_password_hash, password)
         return None
-    if not _verify_password(password, row["password_hash"]):
+    if not _run_kdf(_verify_password, password, row["password_hash"]):
         return None
+    if _needs_rehash(row["password_hash"]):
+        # Re-hachage paresseux, sans allonger cette connexion.
+        _kdf_pool.submit(_rehash_password, int(row["id"]), password, row["password_hash"])
     return {"id": row["id"], "username": row["username"]}
 
 
+ActivityRow = tuple[int, str, str, float | int | None, float | int | None, str]
+
+
+def _activity_row(
+    user_id: int,
+    module: str,
+    event_type: str,
+    score: float | int | None,
+    total: float | int | None,
+    meta: dict[str, Any] | None,
+) -> ActivityRow:
+    return (user_id, module, event_type, score, total, json.dumps(meta or {}, ensure_ascii=False))
+
+
+def _pct(score: float | int | None, total: float | int | None) -> float | None:
+    if score is None or not total or total <= 0:
+        return None
+    return float(score) * 100.0 / float(total)
+
+
+def _score_bucket(pct: float) -> int:
+    return min(100, max(0, int(pct)))
+
+
+def _insert_activity_rows(conn: sqlite3.Connection, rows: list[ActivityRow]) -> None:
+    conn.executemany(
+        """
+        INSERT INTO user_activity (user_id, module, event_type, score, total, meta_json)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+
+    rollup: dict[tuple[int, str], list[float]] = {}
+    best: dict[tuple[int, str], float] = {}
+    for user_id, module, _, score, total, _ in rows:
+        entry = rollup.setdefault((user_id, module), [0, 0.0, 0.0, 0])
+        pct = _pct(score, total)
+        entry[0] += 1
+        entry[1] += float(score or 0)
+        if pct is not None:
+            entry[2] += pct
+            entry[3] += 1
+            best[(user_id, module)] = max(pct, best.get((user_id, module), pct))
+    # Histogramme des moyennes par module: l'utilisateur quitte son ancien bucket pour le nouveau.
+    histogram: dict[tuple[str, int], int] = {}
+    for (user_id, module), values in rollup.items():
+        if not values[3]:
+            continue
+        old = conn.execute(
+            "SELECT pct_sum, pct_count FROM user_module_stats WHERE user_id = ? AND module = ?",
+            (user_id, module),
+        ).fetchone()
+        old_sum, old_count = (float(old[0]), int(old[1])) if old else (0.0, 0)
+        if old_count:
+            key = (module, _score_bucket(old_sum / old_count))
+            histogram[key] = histogram.get(key, 0) - 1
+        key = (module, _score_bucket((old_sum + values[2]) / (old_count + values[3])))
+        histogram[key] = histogram.get(key, 0) + 1
+    conn.executemany(
+        """
+        INSERT INTO score_histogram (module, bucket, users) VALUES (?, ?, ?)
+        ON CONFLICT (module, bucket) DO UPDATE SET users = users + excluded.users
+        """,
+        [(module, bucket, delta) for (module, bucket), delta in histogram.items() if delta],
+    )
+
+    conn.executemany(
+        """
+        INSERT INTO user_module_stats (user_id, module, attempts, score_sum, pct_sum, pct_count, last_activity_at)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id, module) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            score_sum = score_sum + excluded.score_sum,
+            pct_sum = pct_sum + excluded.pct_sum,
+            pct_count = pct_count + excluded.pct_count,
+            last_activity_at = excluded.last_activity_at
+        """,
+        [(user_id, module, *values) for (user_id, module), values in rollup.items()],
+    )
+
+    # Meme horloge que le DEFAULT CURRENT_TIMESTAMP de user_activity (UTC).
+    conn.executemany(
+        """
+        INSERT INTO user_daily_stats (user_id, day, module, attempts, pct_sum, pct_count, best_pct)
+        VALUES (?, date('now'), ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, day, module) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            pct_sum = pct_sum + excluded.pct_sum,
+            pct_count = pct_count + excluded.pct_count,
+            best_pct = CASE
+                WHEN best_pct IS NULL OR excluded.best_pct > best_pct THEN excluded.best_pct
+                ELSE best_pct
+            END
+        """,
+        [
+            (user_id, module, values[0], values[2], values[3], best.get((user_id, module)))
+            for (user_id, module), values in rollup.items()
+        ],
+    )
+
+
+def rebuild_user_rollups(conn: sqlite3.Connection) -> int:
+    """Recalcule les agregats depuis user_activity et les resumes mensuels du compactage.
+
+    Les jours d'un mois compacte ne sont plus reconstructibles: leurs lignes de user_daily_stats
+    sont conservees telles quelles, les autres sont recalculees depuis les evenements bruts.
+    """
+    conn.execute(
+        """
+        DELETE FROM user_daily_stats
+        WHERE NOT EXISTS (
+            SELECT 1 FROM user_activity_monthly m
+            WHERE m.user_id = user_daily_stats.user_id
+              AND m.month = substr(user_daily_stats.day, 1, 7)
+              AND m.module = user_daily_stats.module
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO user_daily_stats (user_id, day, module, attempts, pct_sum, pct_count, best_pct)
+        SELECT
+            user_id,
+            date(created_at),
+            module,
+            COUNT(*),
+            COALESCE(SUM(CASE WHEN total > 0 AND score IS NOT NULL THEN score * 100.0 / total END), 0),
+            COUNT(CASE WHEN total > 0 AND score IS NOT NULL THEN 1 END),
+            MAX(CASE WHEN total > 0 AND score IS NOT NULL THEN score * 100.0 / total END)
+        FROM user_activity a
+        WHERE NOT EXISTS (
+            SELECT 1 FROM user_activity_monthly m
+            WHERE m.user_id = a.user_id AND m.month = strftime('%Y-%m', a.created_at) AND m.module = a.module
+        )
+        GROUP BY user_id, date(created_at), module
+        """
+    )
+    conn.execute("DELETE FROM user_module_stats")
+    conn.execute(
+        """
+        INSERT INTO user_module_stats (user_id, module, attempts, score_sum, pct_sum, pct_count, last_activity_at)
+        SELECT user_id, module, SUM(attempts), SUM(score_sum), SUM(pct_sum), SUM(pct_count), MAX(last_activity_at)
+        FROM (
+            SELECT
+                user_id,
+                module,
+                COUNT(*) AS attempts,
+                COALESCE(SUM(score), 0) AS score_sum,
+                COALESCE(SUM(CASE WHEN total > 0 AND score IS NOT NULL THEN score * 100.0 / total END), 0) AS pct_sum,
+                COUNT(CASE WHEN total > 0 AND score IS NOT NULL THEN 1 END) AS pct_count,
+                MAX(created_at) AS last_activity_at
+            FROM user_activity
+            GROUP BY user_id, module
+            UNION ALL
+            -- Tentatives compactees: comptees via leurs sommes mensuelles.
+            SELECT
+                user_id,
+                module,
+                SUM(events),
+                SUM(score_sum),
+                SUM(pct_sum),
+                SUM(pct_count),
+                datetime(MAX(month) || '-01', '+1 month', '-1 second')
+            FROM user_activity_monthly
+            GROUP BY user_id, module
+        )
+        GROUP BY user_id, module
+        """
+    )
+    rebuild_score_histogram(conn)
+    return int(conn.execute("SELECT COUNT(*) FROM user_module_stats").fetchone()[0])
+
+
+def rebuild_score_histogram(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM score_histogram")
+    conn.execute(
+        """
+        INSERT INTO score_histogram (module, bucket, users)
+        SELECT module, MIN(100, MAX(0, CAST(pct_sum / pct_count AS INTEGER))) AS bucket, COUNT(*)
+        FROM user_module_stats
+        WHERE pct_count > 0
+        GROUP BY module, bucket
+        """
+    )
+
+
 def record_user_activity(
     user_id: int,
     module: str,
@@ -264,16 +799,432 @@ def record_user_activity(
     total: float | int | None = None,
     meta: dict[str, Any] | None = None,
 ) -> None:
-    meta_json = json.dumps(meta or {}, ensure_ascii=False)
-    with _connect() as conn:
-        conn.execute(
+    with _connect_app() as conn:
+        _insert_activity_rows(conn, [_activity_row(user_id, module, event_type, score, total, meta)])
+        conn.commit()
+
+
+RowT = TypeVar("RowT")
+
+
+class ActivityWriter(Generic[RowT]):
+    """Ecrit en arriere-plan, par lots, dans une seule transaction (user_activity, answer_events).
+
+    Les evenements passent par une file bornee; un thread les vide des que
+    `batch_size` lignes sont en attente ou apres `flush_interval_s`. File pleine:
+    l'appelant ecrit lui-meme (backpressure) plutot que de perdre l'evenement.
+    """
+
+    def __init__(
+        self,
+        write_rows: Callable[[sqlite3.Connection, list[RowT]], None],
+        name: str = "activity-writer",
+        max_queue: int = 10_000,
+        batch_size: int = 200,
+        flush_interval_s: float = 1.0,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._write_rows = write_rows
+        self._queue: queue.Queue[RowT | None] = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, row: RowT, timeout_s: float = 0.05) -> None:
+        if self._closed:
+            self._write_sync([row])
+            return
+        try:
+            self._queue.put(row, timeout=timeout_s)
+        except queue.Full:
+            self._write_sync([row])
+            return
+        if not self._thread.is_alive():
+            # Thread arrete entre le test de _closed et le put: personne d'autre ne videra la file.
+            self._drain()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self, timeout_s: float = 10.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout_s)
+        except queue.Full:
+            pass  # thread bloque ou mort: ne pas bloquer la sortie du processus (atexit)
+        self._thread.join(timeout=timeout_s)
+
+    def _write_sync(self, rows: list[RowT]) -> None:
+        with _connect_app() as conn:
+            self._write_rows(conn, rows)
+            conn.commit()
+
+    def _drain(self) -> None:
+        """Ecrit directement ce qui reste dans la file: flush() ne doit jamais attendre un thread mort."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if item is not None:
+                    self._write_sync([item])
+            except sqlite3.Error:
+                logger.exception("Evenement d'activite perdu")
+            finally:
+                self._queue.task_done()
+
+    def _open(self) -> tuple[sqlite3.Connection, int | None]:
+        conn = _connect_app()
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn, _db_inode()
+
+    def _run(self) -> None:
+        conn: sqlite3.Connection | None = None
+        try:
+            ensure_auth_tables()
+            conn, inode = self._open()
+            stop = False
+            while not stop:
+                first = self._queue.get()
+                if first is None:
+                    self._queue.task_done()
+                    break
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval_s
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        self._queue.task_done()
+                        break
+                    batch.append(item)
+                try:
+                    if _db_inode() != inode:
+                        # Base remplacee par un rename (restauration du bootstrap): l'ancienne connexion
+                        # ecrirait dans l'inode supprime.
+                        conn.close()
+                        conn, inode = self._open()
+                    with conn:
+                        self._write_rows(conn, batch)
+                except sqlite3.Error as err:
+                    logger.warning("Echec d'ecriture de %d evenement(s), nouvel essai: %s", len(batch), err)
+                    # Lot rejoue sur une connexion neuve (meme chemin que la backpressure), puis la
+                    # connexion du thread est rouverte pour les lots suivants.
+                    try:
+                        self._write_sync(batch)
+                    except sqlite3.Error:
+                        logger.exception("Evenements d'activite perdus: %d", len(batch))
+                    conn.close()
+                    conn, inode = self._open()
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        except Exception:
+            logger.exception("Ecriture d'activite en arriere-plan arretee: ecriture synchrone desormais")
+        finally:
+            # submit() ecrit desormais lui-meme; ce qui attend encore dans la file est ecrit ici.
+            self._closed = True
+            if conn is not None:
+                conn.close()
+            self._drain()
+
+
+_activity_writer: ActivityWriter[ActivityRow] | None = None
+_answer_writer: ActivityWriter[AnswerSeries] | None = None
+_activity_writer_lock = threading.Lock()
+
+
+def get_activity_writer() -> ActivityWriter[ActivityRow]:
+    global _activity_writer
+    with _activity_writer_lock:
+        if _activity_writer is None:
+            _activity_writer = ActivityWriter(_insert_activity_rows)
+            atexit.register(_activity_writer.close)
+        return _activity_writer
+
+
+def log_user_activity(
+    user_id: int,
+    module: str,
+    event_type: str,
+    score: float | int | None = None,
+    total: float | int | None = None,
+    meta: dict[str, Any] | None = None,
+) -> None:
+    """Version non bloquante de record_user_activity (ecriture differee par lots)."""
+    get_activity_writer().submit(_activity_row(user_id, module, event_type, score, total, meta))
+
+
+AnswerRow = tuple[int, int | None, bool]
+# Une serie corrigee: (user_id, series_id, item_type, reponses, response_ms).
+AnswerSeries = tuple[int, str, str, list[AnswerRow], int | None]
+
+
+def _insert_answer_series(conn: sqlite3.Connection, series: list[AnswerSeries]) -> None:
+    conn.executemany(
+        """
+        INSERT INTO answer_events (user_id, series_id, item_type, item_id, chosen_index, is_correct, response_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (user_id, series_id, item_type, item_id, chosen, 1 if correct else 0, response_ms)
+            for user_id, series_id, item_type, answers, response_ms in series
+            for item_id, chosen, correct in answers
+        ],
+    )
+    # Discrimination calculee serie par serie: chaque serie garde son propre score de reference.
+    for _, _, item_type, answers, _ in series:
+        _update_item_stats(conn, item_type, answers)
+
+
+def record_answer_events(
+    user_id: int,
+    series_id: str,
+    item_type: str,
+    answers: list[AnswerRow],
+    response_ms: int | None = None,
+) -> int:
+    """Enregistre les reponses d'une serie corrigee (item_id, choix, correct) en un seul INSERT groupe."""
+    if not answers:
+        return 0
+    with _connect_app() as conn:
+        _insert_answer_series(conn, [(user_id, series_id, item_type, answers, response_ms)])
+        conn.commit()
+    return len(answers)
+
+
+def get_answer_writer() -> ActivityWriter[AnswerSeries]:
+    global _answer_writer
+    with _activity_writer_lock:
+        if _answer_writer is None:
+            _answer_writer = ActivityWriter(_insert_answer_series, name="answer-writer")
+            atexit.register(_answer_writer.close)
+        return _answer_writer
+
+
+def log_answer_events(
+    user_id: int,
+    series_id: str,
+    item_type: str,
+    answers: list[AnswerRow],
+    response_ms: int | None = None,
+) -> int:
+    """Version non bloquante de record_answer_events: reponses et item_stats ecrits par lots."""
+    if not answers:
+        return 0
+    get_answer_writer().submit((user_id, series_id, item_type, list(answers), response_ms))
+    return len(answers)
+
+
+def _update_item_stats(conn: sqlite3.Connection, item_type: str, answers: list[AnswerRow]) -> None:
+    # Discrimination: correlation item / score du reste de la serie (hors item), via sommes cumulees.
+    n = len(answers)
+    total_correct = sum(1 for _, _, correct in answers if correct)
+    rows = []
+    for item_id, chosen, correct in answers:
+        x = 1.0 if correct else 0.0
+        if n > 1:
+            y = (total_correct - x) / (n - 1)
+            disc = (1, x, y, y * y, x * y)
+        else:
+            disc = (0, 0.0, 0.0, 0.0, 0.0)
+        rows.append((item_type, item_id, 1, int(x), 1 if chosen is None else 0, *disc))
+    conn.executemany(
+        """
+        INSERT INTO item_stats (
+            item_type, item_id, attempts, correct, skipped,
+            disc_n, disc_sum_x, disc_sum_y, disc_sum_y2, disc_sum_xy, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (item_type, item_id) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            correct = correct + excluded.correct,
+            skipped = skipped + excluded.skipped,
+            disc_n = disc_n + excluded.disc_n,
+            disc_sum_x = disc_sum_x + excluded.disc_sum_x,
+            disc_sum_y = disc_sum_y + excluded.disc_sum_y,
+            disc_sum_y2 = disc_sum_y2 + excluded.disc_sum_y2,
+            disc_sum_xy = disc_sum_xy + excluded.disc_sum_xy,
+            updated_at = excluded.updated_at
+        """,
+        rows,
+    )
+    conn.executemany(
+        """
+        INSERT INTO item_option_stats (item_type, item_id, option_index, picks)
+        VALUES (?, ?, ?, 1)
+        ON CONFLICT (item_type, item_id, option_index) DO UPDATE SET picks = picks + 1
+        """,
+        [(item_type, item_id, chosen) for item_id, chosen, _ in answers if chosen is not None],
+    )
+
+
+ItemStatsRow = tuple[str, int, int, int, int, int, float, float, float, float]
+
+
+def replace_item_stats(
+    conn: sqlite3.Connection,
+    stats: list[ItemStatsRow],
+    option_picks: list[tuple[str, int, int, int]],
+) -> None:
+    """Remplace toutes les stats d'items (recalcul complet, voir scripts/recompute_item_stats.py)."""
+    conn.execute("DELETE FROM item_stats")
+    conn.execute("DELETE FROM item_option_stats")
+    conn.executemany(
+        """
+        INSERT INTO item_stats (
+            item_type, item_id, attempts, correct, skipped,
+            disc_n, disc_sum_x, disc_sum_y, disc_sum_y2, disc_sum_xy, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """,
+        stats,
+    )
+    conn.executemany(
+        "INSERT INTO item_option_stats (item_type, item_id, option_index, picks) VALUES (?, ?, ?, ?)",
+        option_picks,
+    )
+
+
+ITEM_SOURCES = {
+    "qcm": ("exercises", "niveau"),
+    "lecture": ("reading_questions", "difficulte"),
+}
+
+
+def _discrimination(n: int, sx: float, sy: float, syy: float, sxy: float) -> float | None:
+    # Point-biseriale = Pearson entre x binaire (sum x^2 = sum x) et score du reste.
+    var_x = n * sx - sx * sx
+    var_y = n * syy - sy * sy
+    if n < 2 or var_x <= 0 or var_y <= 0:
+        return None
+    return (n * sxy - sx * sy) / ((var_x * var_y) ** 0.5)
+
+
+def get_item_stats(item_type: str, min_attempts: int = 1) -> list[dict[str, Any]]:
+    table, level_column = ITEM_SOURCES[item_type]
+    rows = fetch_all(
+        f"""
+        SELECT
+            s.item_id, s.attempts, s.correct, s.skipped,
+            s.disc_n, s.disc_sum_x, s.disc_sum_y, s.disc_sum_y2, s.disc_sum_xy,
+            t.{level_column} AS niveau_attribue, t.answer_index, t.options_json
+        FROM item_stats s
+        JOIN {table} t ON t.id = s.item_id
+        WHERE s.item_type = ? AND s.attempts >= ?
+        ORDER BY s.item_id
+        """,
+        (item_type, min_attempts),
+    )
+    picks: dict[int, dict[int, int]] = {}
+    for row in fetch_all(
+        """
+        SELECT o.item_id, o.option_index, o.picks
+        FROM item_option_stats o
+        JOIN item_stats s ON s.item_type = o.item_type AND s.item_id = o.item_id
+        WHERE o.item_type = ? AND s.attempts >= ?
+        """,
+        (item_type, min_attempts),
+    ):
+        picks.setdefault(int(row["item_id"]), {})[int(row["option_index"])] = int(row["picks"])
+
+    out = []
+    for row in rows:
+        item_id = int(row["item_id"])
+        attempts = int(row["attempts"])
+        nb_options = len(json.loads(row["options_json"]))
+        item_picks = picks.get(item_id, {})
+        out.append(
+            {
+                "item_id": item_id,
+                "niveau_attribue": row["niveau_attribue"],
+                "tentatives": attempts,
+                "p_value": int(row["correct"]) / attempts if attempts else None,
+                "taux_sans_reponse": int(row["skipped"]) / attempts if attempts else None,
+                "discrimination": _discrimination(
+                    int(row["disc_n"]),
+                    float(row["disc_sum_x"]),
+                    float(row["disc_sum_y"]),
+                    float(row["disc_sum_y2"]),
+                    float(row["disc_sum_xy"]),
+                ),
+                "answer_index": int(row["answer_index"]),
+                "taux_options": [item_picks.get(i, 0) / attempts if attempts else 0.0 for i in range(nb_options)],
+            }
+        )
+    return out
+
+
+def get_flagged_items(
+    item_type: str,
+    min_attempts: int = 30,
+    p_min: float = 0.2,
+    p_max: float = 0.95,
+    discrimination_min: float = 0.15,
+    distracteur_min: float = 0.02,
+) -> list[dict[str, Any]]:
+    """Items a revoir: trop faciles/difficiles, peu discriminants, distracteurs inutiles ou trop attractifs."""
+    flagged = []
+    for item in get_item_stats(item_type, min_attempts):
+        raisons = []
+        p_value = item["p_value"]
+        if p_value is not None and p_value < p_min:
+            raisons.append("trop_difficile")
+        if p_value is not None and p_value > p_max:
+            raisons.append("trop_facile")
+        discrimination = item["discrimination"]
+        if discrimination is not None and discrimination < 0:
+            raisons.append("discrimination_negative")
+        elif discrimination is not None and discrimination < discrimination_min:
+            raisons.append("discrimination_faible")
+        taux_options = item["taux_options"]
+        taux_bonne = taux_options[item["answer_index"]] if item["answer_index"] < len(taux_options) else 0.0
+        for index, taux in enumerate(taux_options):
+            if index == item["answer_index"]:
+                continue
+            if taux > taux_bonne:
+                raisons.append(f"distracteur_attractif:{index}")
+            elif taux < distracteur_min:
+                raisons.append(f"distracteur_inutile:{index}")
+        if raisons:
+            flagged.append({**item, "raisons": raisons})
+    return flagged
+
+
+def get_item_calibration(item_type: str) -> dict[int, tuple[int, int]]:
+    """{item_id: (tentatives, bonnes reponses)} pour calibrer la difficulte des items."""
+    with _connect_app() as conn:
+        rows = conn.execute(
+            "SELECT item_id, attempts, correct FROM item_stats WHERE item_type = ?",
+            (item_type,),
+        ).fetchall()
+    return {int(row[0]): (int(row[1]), int(row[2])) for row in rows}
+
+
+def get_user_answer_history(user_id: int, item_type: str, limit: int = 200) -> list[tuple[int, bool]]:
+    """Dernieres reponses (item_id, correcte) d'un utilisateur, plus recentes d'abord."""
+    with _connect_app() as conn:
+        rows = conn.execute(
             """
-            INSERT INTO user_activity (user_id, module, event_type, score, total, meta_json)
-            VALUES (?, ?, ?, ?, ?, ?)
+            SELECT item_id, is_correct
+            FROM answer_events
+            WHERE user_id = ? AND item_type = ?
+            ORDER BY id DESC
+            LIMIT ?
             """,
-            (user_id, module, event_type, score, total, meta_json),
-        )
-        conn.commit()
+            (user_id, item_type, limit),
+        ).fetchall()
+    return [(int(row[0]), bool(row[1])) for row in rows]
 
 
 def get_user_stats(user_id: int) -> dict[str, Any]:
@@ -281,11 +1232,10 @@ def get_user_stats(user_id: int) -> dict[str, Any]:
         """
         SELECT
             module,
-            COUNT(*) AS tentatives,
-            AVG(CASE WHEN total > 0 AND score IS NOT NULL THEN (score * 100.0 / total) END) AS moyenne_pct
-        FROM user_activity
+            attempts AS tentatives,
+            CASE WHEN pct_count > 0 THEN pct_sum / pct_count END AS moyenne_pct
+        FROM user_module_stats
         WHERE user_id = ?
-        GROUP BY module
         """,
         (user_id,),
     )
@@ -298,6 +1248,84 @@ def get_user_stats(user_id: int) -> dict[str, Any]:
     return out
 
 
+def get_user_percentile(user_id: int, module: str) -> dict[str, Any] | None:
+    """Position de l'utilisateur (moyenne du module) via l'histogramme: au plus 101 lignes lues."""
+    row = fetch_one(
+        "SELECT avg_pct, attempts FROM user_module_stats WHERE user_id = ? AND module = ?",
+        (user_id, module),
+    )
+    if not row or row["avg_pct"] is None:
+        return None
+    bucket = _score_bucket(float(row["avg_pct"]))
+    counts = fetch_one(
+        """
+        SELECT
+            COALESCE(SUM(CASE WHEN bucket < ? THEN users END), 0) AS below,
+            COALESCE(SUM(CASE WHEN bucket = ? THEN users END), 0) AS same,
+            COALESCE(SUM(users), 0) AS total
+        FROM score_histogram
+        WHERE module = ?
+        """,
+        (bucket, bucket, module),
+    )
+    total = int(counts["total"]) if counts else 0
+    if total <= 0:
+        return None
+    below, same = int(counts["below"]), int(counts["same"])
+    return {
+        "moyenne_pct": round(float(row["avg_pct"]), 1),
+        "tentatives": int(row["attempts"]),
+        "percentile": round(100.0 * (below + 0.5 * same) / total, 1),
+        "rang": total - below - same + 1,
+        "participants": total,
+    }
+
+
+def get_leaderboard(module: str, limit: int = 10, min_attempts: int = 3) -> list[dict[str, Any]]:
+    rows = fetch_all(
+        """
+        SELECT u.username, s.avg_pct, s.attempts
+        FROM user_module_stats s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.module = ? AND s.avg_pct IS NOT NULL AND s.attempts >= ?
+        ORDER BY s.avg_pct DESC
+        LIMIT ?
+        """,
+        (module, min_attempts, limit),
+    )
+    return [
+        {
+            "rang": rang,
+            "utilisateur": row["username"],
+            "moyenne_pct": round(float(row["avg_pct"]), 1),
+            "tentatives": int(row["attempts"]),
+        }
+        for rang, row in enumerate(rows, start=1)
+    ]
+
+
+def get_user_progress(user_id: int, days: int = 90) -> list[dict[str, Any]]:
+    rows = fetch_all(
+        """
+        SELECT day, module, attempts, pct_sum, pct_count, best_pct
+        FROM user_daily_stats
+        WHERE user_id = ? AND day >= date('now', ?)
+        ORDER BY day, module
+        """,
+        (user_id, f"-{max(1, days) - 1} days"),
+    )
+    return [
+        {
+            "jour": row["day"],
+            "module": row["module"],
+            "tentatives": int(row["attempts"]),
+            "moyenne_pct": round(row["pct_sum"] / row["pct_count"], 1) if row["pct_count"] else None,
+            "meilleur_pct": round(row["best_pct"], 1) if row["best_pct"] is not None else None,
+        }
+        for row in rows
+    ]
+
+
 def get_user_recent_activity(user_id: int, limit: int = 8) -> list[dict[str, Any]]:
     rows = fetch_all(
         """
@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable
+
+import db
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetEpuise(Exception):
+    pass
+
+
+class AttenteTropLongue(Exception):
+    pass
+
+
+def _env_float(nom: str, defaut: float) -> float:
+    try:
+        return float(os.getenv(nom, str(defaut)))
+    except ValueError:
+        return defaut
+
+
+@dataclass
+class SeauJetons:
+    capacite: float
+    debit_par_s: float
+    niveau: float = -1.0
+    maj: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        if self.niveau < 0:
+            self.niveau = self.capacite
+
+    def remplir(self, maintenant: float) -> None:
+        ecoule = max(0.0, maintenant - self.maj)
+        self.niveau = min(self.capacite, self.niveau + ecoule * self.debit_par_s)
+        self.maj = maintenant
+
+    def delai_pour(self, quantite: float) -> float:
+        manque = min(quantite, self.capacite) - self.niveau
+        if manque <= 0:
+            return 0.0
+        return manque / self.debit_par_s if self.debit_par_s > 0 else float("inf")
+
+
+class EtatMemoire:
+    """Seaux et consommation journaliere propres au processus."""
+
+    def __init__(self, requetes_par_min: float, tokens_par_min: float) -> None:
+        self.requetes = SeauJetons(requetes_par_min, requetes_par_min / 60.0)
+        self.tokens = SeauJetons(tokens_par_min, tokens_par_min / 60.0)
+        self._usage: dict[tuple[str, str], int] = {}
+
+    def essayer_consommer(self, tokens: float) -> float:
+        maintenant = time.monotonic()
+        self.requetes.remplir(maintenant)
+        self.tokens.remplir(maintenant)
+        delai = max(self.requetes.delai_pour(1), self.tokens.delai_pour(tokens))
+        if delai > 0:
+            return delai
+        self.requetes.niveau -= 1
+        self.tokens.niveau -= min(tokens, self.tokens.capacite)
+        return 0.0
+
+    def ajuster_tokens(self, delta: float) -> None:
+        self.tokens.remplir(time.monotonic())
+        self.tokens.niveau = min(self.tokens.capacite, self.tokens.niveau - delta)
+
+    def usage_jour(self, utilisateur: str) -> int:
+        return self._usage.get((date.today().isoformat(), utilisateur), 0)
+
+    def enregistrer_usage(self, utilisateur: str, tokens: int) -> None:
+        jour = date.today().isoformat()
+        for cle in ((jour, utilisateur), (jour, "*")):
+            self._usage[cle] = self._usage.get(cle, 0) + tokens
+
+
+class EtatSqlite:
+    """Meme contrat que EtatMemoire, partage entre processus via un fichier SQLite."""
+
+    def __init__(self, db_path: Path, requetes_par_min: float, tokens_par_min: float) -> None:
+        self.db_path = db_path
+        self.capacites = {"requetes": requetes_par_min, "tokens": tokens_par_min}
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            if db_path.resolve() == db.DB_PATH.resolve():
+                # Dans app.db, les tables viennent des migrations (0005) comme le reste du schema.
+                db.apply_migrations(conn)
+            else:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS api_rate_buckets (
+                        nom TEXT PRIMARY KEY,
+                        niveau REAL NOT NULL,
+                        maj REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS api_usage_daily (
+                        jour TEXT NOT NULL,
+                        utilisateur TEXT NOT NULL,
+                        requetes INTEGER NOT NULL DEFAULT 0,
+                        tokens INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (jour, utilisateur)
+                    )
+                    """
+                )
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    def _lire_seaux(self, conn: sqlite3.Connection, maintenant: float) -> dict[str, SeauJetons]:
+        rows = dict(
+            (nom, (niveau, maj))
+            for nom, niveau, maj in conn.execute("SELECT nom, niveau, maj FROM api_rate_buckets")
+        )
+        seaux: dict[str, SeauJetons] = {}
+        for nom, capacite in self.capacites.items():
+            niveau, maj = rows.get(nom, (capacite, maintenant))
+            seau = SeauJetons(capacite, capacite / 60.0, niveau=niveau, maj=maj)
+            seau.remplir(maintenant)
+            seaux[nom] = seau
+        return seaux
+
+    def _ecrire_seaux(self, conn: sqlite3.Connection, seaux: dict[str, SeauJetons]) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO api_rate_buckets (nom, niveau, maj) VALUES (?, ?, ?)",
+            [(nom, seau.niveau, seau.maj) for nom, seau in seaux.items()],
+        )
+
+    def essayer_consommer(self, tokens: float) -> float:
+        # Horloge murale: les processus ne partagent pas time.monotonic().
+        maintenant = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            seaux = self._lire_seaux(conn, maintenant)
+            delai = max(seaux["requetes"].delai_pour(1), seaux["tokens"].delai_pour(tokens))
+            if delai == 0:
+                seaux["requetes"].niveau -= 1
+                seaux["tokens"].niveau -= min(tokens, seaux["tokens"].capacite)
+            self._ecrire_seaux(conn, seaux)
+            conn.execute("COMMIT")
+            return delai
+        except sqlite3.OperationalError:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return 0.2
+        finally:
+            conn.close()
+
+    def ajuster_tokens(self, delta: float) -> None:
+        # Appele apres un appel deja paye: une base occupee ne doit pas faire perdre la correction.
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            seaux = self._lire_seaux(conn, time.time())
+            seau = seaux["tokens"]
+            seau.niveau = min(seau.capacite, seau.niveau - delta)
+            self._ecrire_seaux(conn, seaux)
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError as err:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning("Ajustement du seau de tokens ignore (%+.0f): %s", delta, err)
+        finally:
+            conn.close()
+
+    def usage_jour(self, utilisateur: str) -> int:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT tokens FROM api_usage_daily WHERE jour = ? AND utilisateur = ?",
+                (date.today().isoformat(), utilisateur),
+            ).fetchone()
+        finally:
+            conn.close()
+        return int(row[0]) if row else 0
+
+    def enregistrer_usage(self, utilisateur: str, tokens: int) -> None:
+        jour = date.today().isoformat()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                """
+                INSERT INTO api_usage_daily (jour, utilisateur, requetes, tokens) VALUES (?, ?, 1, ?)
+                ON CONFLICT (jour, utilisateur)
+                DO UPDATE SET requetes = requetes + 1, tokens = tokens + excluded.tokens
+                """,
+                [(jour, utilisateur, tokens), (jour, "*", tokens)],
+            )
+        except sqlite3.OperationalError as err:
+            logger.warning("Usage journalier non enregistre (%s, %d tokens): %s", utilisateur, tokens, err)
+        finally:
+            conn.close()
+
+
+@dataclass(eq=False)
+class _Ticket:
+    utilisateur: str
+    tokens: float
+
+
+class Reservation:
+    def __init__(self, limiteur: "LimiteurApi", utilisateur: str, tokens_estimes: float) -> None:
+        self._limiteur = limiteur
+        self.utilisateur = utilisateur
+        self.tokens_estimes = tokens_estimes
+        self._confirmee = False
+
+    def confirmer(self, tokens_reels: int) -> None:
+        if self._confirmee:
+            return
+        self._confirmee = True
+        self._limiteur._regulariser(self.utilisateur, tokens_reels - self.tokens_estimes, int(tokens_reels))
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._confirmee:
+            return
+        if exc_type is None:
+            self.confirmer(int(self.tokens_estimes))
+        else:
+            # Appel echoue: la requete reste comptee, les tokens estimes sont rendus.
+            self._confirmee = True
+            self._limiteur._regulariser(self.utilisateur, -self.tokens_estimes, None)
+
+
+class LimiteurApi:
+    """Seau a jetons (requetes + tokens) partage par toutes les sessions de la cle serveur.
+
+    Les attentes sont servies en tourniquet par utilisateur, pour qu'une rafale
+    d'un seul utilisateur ne bloque pas les autres.
+    """
+
+    def __init__(
+        self,
+        requetes_par_min: float = 60,
+        tokens_par_min: float = 200_000,
+        budget_jour_tokens: int = 0,
+        budget_jour_utilisateur: int = 0,
+        db_path: Path | None = None,
+    ) -> None:
+        self.budget_jour_tokens = budget_jour_tokens
+        self.intervalle_s = 60.0 / requetes_par_min if requetes_par_min > 0 else 1.0
+        self.budget_jour_utilisateur = budget_jour_utilisateur
+        self.etat: EtatMemoire | EtatSqlite = (
+            EtatSqlite(db_path, requetes_par_min, tokens_par_min)
+            if db_path
+            else EtatMemoire(requetes_par_min, tokens_par_min)
+        )
+        self._cond = threading.Condition()
+        self._files: dict[str, deque[_Ticket]] = {}
+        self._tour: deque[str] = deque()
+
+    def verifier_budget(self, utilisateur: str, tokens_estimes: float) -> None:
+        if self.budget_jour_utilisateur and (
+            self.etat.usage_jour(utilisateur) + tokens_estimes > self.budget_jour_utilisateur
+        ):
+            raise BudgetEpuise("Quota journalier de corrections atteint pour ta session. Reessaie demain.")
+        if self.budget_jour_tokens and self.etat.usage_jour("*") + tokens_estimes > self.budget_jour_tokens:
+            raise BudgetEpuise("Budget journalier du serveur atteint. Utilise ta cle API personnelle ou reessaie demain.")
+
+    def _regulariser(self, utilisateur: str, delta_tokens: float, tokens_consommes: int | None) -> None:
+        """Corrige le seau (reel - estime) et compte l'usage sous le meme verrou que reserver()."""
+        with self._cond:
+            self.etat.ajuster_tokens(delta_tokens)
+            if tokens_consommes is not None:
+                self.etat.enregistrer_usage(utilisateur, tokens_consommes)
+            # Des tokens rendus peuvent debloquer la tete de file.
+            self._cond.notify_all()
+
+    def _position(self, ticket: _Ticket) -> int:
+        file = self._files[ticket.utilisateur]
+        rang = file.index(ticket)
+        avant = rang + 1
+        for utilisateur in self._tour:
+            if utilisateur == ticket.utilisateur:
+                continue
+            devant = self._tour.index(utilisateur) < self._tour.index(ticket.utilisateur)
+            avant += min(len(self._files[utilisateur]), rang + (1 if devant else 0))
+        return avant
+
+    def _retirer(self, ticket: _Ticket) -> None:
+        file = self._files[ticket.utilisateur]
+        file.remove(ticket)
+        if self._tour and self._tour[0] == ticket.utilisateur:
+            self._tour.popleft()
+            if file:
+                self._tour.append(ticket.utilisateur)
+        elif not file:
+            self._tour.remove(ticket.utilisateur)
+        if not file:
+            del self._files[ticket.utilisateur]
+
+    def reserver(
+        self,
+        utilisateur: str,
+        tokens_estimes: float,
+        sur_attente: Callable[[int, float], None] | None = None,
+        attente_max_s: float = 120.0,
+    ) -> Reservation:
+        self.verifier_budget(utilisateur, tokens_estimes)
+        ticket = _Ticket(utilisateur, tokens_estimes)
+        limite = time.monotonic() + attente_max_s
+        with self._cond:
+            if utilisateur not in self._files:
+                self._files[utilisateur] = deque()
+                self._tour.append(utilisateur)
+            self._files[utilisateur].append(ticket)
+
+        try:
+            while True:
+                with self._cond:
+                    en_tete = self._tour[0] == utilisateur and self._files[utilisateur][0] is ticket
+                    delai = self.etat.essayer_consommer(ticket.tokens) if en_tete else self.intervalle_s
+                    if en_tete and delai == 0:
+                        self._retirer(ticket)
+                        self._cond.notify_all()
+                        return Reservation(self, utilisateur, tokens_estimes)
+                    position = self._position(ticket)
+                if time.monotonic() + min(delai, 0.5) > limite:
+                    raise AttenteTropLongue("File d'attente trop longue, reessaie dans quelques instants.")
+                if sur_attente is not None:
+                    sur_attente(position, delai if en_tete else self.intervalle_s * position)
+                with self._cond:
+                    # Sans SQLite, un autre thread reveille la file; sinon on sonde regulierement.
+                    self._cond.wait(timeout=min(max(delai, 0.05), 0.5))
+        except BaseException:
+            with self._cond:
+                if ticket in self._files.get(utilisateur, ()):
+                    self._retirer(ticket)
+                self._cond.notify_all()
+            raise
+
+
+_limiteur: LimiteurApi | None = None
+_verrou_limiteur = threading.Lock()
+
+
+def limiteur_partage() -> LimiteurApi:
+    global _limiteur
+    with _verrou_limiteur:
+        if _limiteur is None:
+            db_path = os.getenv("OPENAI_RATE_LIMIT_DB", "").strip()
+            _limiteur = LimiteurApi(
+                requetes_par_min=_env_float("OPENAI_RATE_LIMIT_RPM", 60),
+                tokens_par_min=_env_float("OPENAI_RATE_LIMIT_TPM", 200_000),
+                budget_jour_tokens=int(_env_float("OPENAI_DAILY_TOKEN_BUDGET", 0)),
+                budget_jour_utilisateur=int(_env_float("OPENAI_USER_DAILY_TOKEN_BUDGET", 0)),
+                db_path=Path(db_path) if db_path else None,
+            )
+        return _limiteur
+
+
+def estimer_tokens(*textes: str, sortie: int = 1500) -> int:
+    return sum(len(texte) for texte in textes) // 4 + sortie
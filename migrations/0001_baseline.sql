@@ -0,0 +1,214 @@
+-- Schema de reference: etat de la base avant l'introduction des migrations.
+-- Idempotent (IF NOT EXISTS): adopte les bases existantes sans toucher aux donnees.
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    slug TEXT NOT NULL UNIQUE,
+    nom TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_activity (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    score REAL,
+    total REAL,
+    meta_json TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_module_stats (
+    user_id INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    pct_sum REAL NOT NULL DEFAULT 0,
+    pct_count INTEGER NOT NULL DEFAULT 0,
+    last_activity_at TEXT,
+    PRIMARY KEY (user_id, module)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS score_histogram (
+    module TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    users INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (module, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_daily_stats (
+    user_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    module TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    pct_sum REAL NOT NULL DEFAULT 0,
+    pct_count INTEGER NOT NULL DEFAULT 0,
+    best_pct REAL,
+    PRIMARY KEY (user_id, day, module)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_activity_monthly (
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    module TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    events INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    total_sum REAL NOT NULL DEFAULT 0,
+    pct_sum REAL NOT NULL DEFAULT 0,
+    pct_count INTEGER NOT NULL DEFAULT 0,
+    best_pct REAL,
+    PRIMARY KEY (user_id, month, module, event_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS answer_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    series_id TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    chosen_index INTEGER,
+    is_correct INTEGER NOT NULL,
+    response_ms INTEGER,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS item_stats (
+    item_type TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    disc_n INTEGER NOT NULL DEFAULT 0,
+    disc_sum_x REAL NOT NULL DEFAULT 0,
+    disc_sum_y REAL NOT NULL DEFAULT 0,
+    disc_sum_y2 REAL NOT NULL DEFAULT 0,
+    disc_sum_xy REAL NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (item_type, item_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS item_option_stats (
+    item_type TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    option_index INTEGER NOT NULL,
+    picks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (item_type, item_id, option_index)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS vocab_reviews (
+    user_id INTEGER NOT NULL,
+    vocab_id INTEGER NOT NULL,
+    due_at TEXT NOT NULL,
+    interval_days REAL NOT NULL DEFAULT 0,
+    ease REAL NOT NULL DEFAULT 2.5,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    last_reviewed_at TEXT,
+    PRIMARY KEY (user_id, vocab_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_slug TEXT NOT NULL,
+    titre TEXT NOT NULL,
+    niveau TEXT NOT NULL,
+    resume TEXT NOT NULL,
+    contenu_markdown TEXT NOT NULL,
+    tags_json TEXT NOT NULL DEFAULT '[]',
+    FOREIGN KEY (category_slug) REFERENCES categories(slug) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS vocabulary (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mot TEXT NOT NULL,
+    definition_fr TEXT NOT NULL,
+    traduction_en TEXT NOT NULL,
+    exemple_fr TEXT NOT NULL,
+    niveau TEXT NOT NULL,
+    theme TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS verb_conjugations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    infinitif TEXT NOT NULL,
+    temps TEXT NOT NULL,
+    personne TEXT NOT NULL,
+    forme TEXT NOT NULL,
+    exemple_fr TEXT NOT NULL,
+    niveau TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS exercises (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    niveau TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options_json TEXT NOT NULL,
+    answer_index INTEGER NOT NULL,
+    explication TEXT NOT NULL,
+    lesson_id INTEGER,
+    FOREIGN KEY (lesson_id) REFERENCES lessons(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS writing_prompts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titre TEXT NOT NULL,
+    tache_tcf TEXT NOT NULL,
+    niveau TEXT NOT NULL,
+    consigne TEXT NOT NULL,
+    min_mots INTEGER NOT NULL,
+    max_mots INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reading_passages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titre TEXT NOT NULL,
+    niveau TEXT NOT NULL,
+    type_document TEXT NOT NULL,
+    contexte TEXT NOT NULL,
+    duree_recommandee_min INTEGER NOT NULL,
+    texte TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reading_questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    passage_id INTEGER NOT NULL,
+    ordre INTEGER NOT NULL,
+    niveau TEXT NOT NULL,
+    difficulte TEXT NOT NULL,
+    competence TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options_json TEXT NOT NULL,
+    answer_index INTEGER NOT NULL,
+    explication TEXT NOT NULL,
+    FOREIGN KEY (passage_id) REFERENCES reading_passages(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_lessons_category ON lessons(category_slug);
+CREATE INDEX IF NOT EXISTS idx_lessons_level ON lessons(niveau);
+CREATE INDEX IF NOT EXISTS idx_vocab_level ON vocabulary(niveau);
+CREATE INDEX IF NOT EXISTS idx_vocab_theme ON vocabulary(theme);
+CREATE INDEX IF NOT EXISTS idx_conjugations_infinitif ON verb_conjugations(infinitif);
+CREATE INDEX IF NOT EXISTS idx_conjugations_temps ON verb_conjugations(temps);
+CREATE INDEX IF NOT EXISTS idx_exercises_type ON exercises(type);
+CREATE INDEX IF NOT EXISTS idx_exercises_level ON exercises(niveau);
+CREATE INDEX IF NOT EXISTS idx_reading_passages_level ON reading_passages(niveau);
+CREATE INDEX IF NOT EXISTS idx_reading_questions_passage ON reading_questions(passage_id);
+CREATE INDEX IF NOT EXISTS idx_user_activity_user ON user_activity(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_activity_module ON user_activity(module);
+CREATE INDEX IF NOT EXISTS idx_answer_events_item ON answer_events(item_type, item_id, chosen_index, is_correct);
+CREATE INDEX IF NOT EXISTS idx_answer_events_user ON answer_events(user_id, item_type, item_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_vocab_reviews_due ON vocab_reviews(user_id, due_at);
@@ -0,0 +1,21 @@
+-- Classement: moyenne par module en colonne generee (VIRTUAL) + index (module, avg_pct).
+-- Reconstruction de la table: la colonne existe deja sur certaines bases, pas sur d'autres.
+CREATE TABLE user_module_stats_new (
+    user_id INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    pct_sum REAL NOT NULL DEFAULT 0,
+    pct_count INTEGER NOT NULL DEFAULT 0,
+    last_activity_at TEXT,
+    avg_pct REAL GENERATED ALWAYS AS (CASE WHEN pct_count > 0 THEN pct_sum / pct_count END) VIRTUAL,
+    PRIMARY KEY (user_id, module)
+) WITHOUT ROWID;
+
+INSERT INTO user_module_stats_new (user_id, module, attempts, score_sum, pct_sum, pct_count, last_activity_at)
+SELECT user_id, module, attempts, score_sum, pct_sum, pct_count, last_activity_at FROM user_module_stats;
+
+DROP TABLE user_module_stats;
+ALTER TABLE user_module_stats_new RENAME TO user_module_stats;
+
+CREATE INDEX idx_user_module_stats_rank ON user_module_stats(module, avg_pct);
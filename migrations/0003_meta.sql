@@ -0,0 +1,11 @@
+-- Etat du contenu, lu au demarrage en une seule recherche par cle primaire.
+-- content_sha256: empreinte de l'artefact source (dump ou pack); import_complete: 0 pendant un import.
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    content_version TEXT,
+    content_sha256 TEXT,
+    source TEXT,
+    schema_version INTEGER NOT NULL DEFAULT 0,
+    import_complete INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,7 @@
+-- Empreinte SHA-256 de chaque section du pack importe: une section inchangee n'est pas reecrite.
+CREATE TABLE IF NOT EXISTS content_sections (
+    section TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
@@ -0,0 +1,35 @@
+-- Corrections par lot des redactions (scripts/grade_writing_batch.py).
+CREATE TABLE IF NOT EXISTS writing_grades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    prompt_id INTEGER NOT NULL,
+    student TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    modele TEXT NOT NULL,
+    statut TEXT NOT NULL,
+    note_sur_20 REAL,
+    evaluation_json TEXT,
+    brut TEXT,
+    erreur TEXT,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    from_cache INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (batch, prompt_id, student)
+);
+
+CREATE INDEX IF NOT EXISTS idx_writing_grades_hash ON writing_grades(content_hash, statut);
+
+-- Limiteur OpenAI partage entre processus, quand OPENAI_RATE_LIMIT_DB pointe sur app.db.
+CREATE TABLE IF NOT EXISTS api_rate_buckets (
+    nom TEXT PRIMARY KEY,
+    niveau REAL NOT NULL,
+    maj REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS api_usage_daily (
+    jour TEXT NOT NULL,
+    utilisateur TEXT NOT NULL,
+    requetes INTEGER NOT NULL DEFAULT 0,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (jour, utilisateur)
+);
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+
+
+# Boutons de la revision -> qualite SM-2 (0-5).
+NOTES = {"A revoir": 1, "Difficile": 3, "Bien": 4, "Facile": 5}
+DELAI_REAPPRENTISSAGE = timedelta(minutes=10)
+FACILITE_MIN = 1.3
+FORMAT_DATE = "%Y-%m-%d %H:%M:%S"
+
+
+@dataclass(frozen=True)
+class EtatCarte:
+    repetitions: int = 0
+    intervalle_jours: float = 0.0
+    facilite: float = 2.5
+    oublis: int = 0
+
+
+def maintenant_utc() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def format_date(moment: datetime) -> str:
+    # Meme format que CURRENT_TIMESTAMP: comparaison lexicographique possible en SQL.
+    return moment.strftime(FORMAT_DATE)
+
+
+def planifier(etat: EtatCarte, qualite: int, moment: datetime) -> tuple[EtatCarte, datetime]:
+    """Algorithme SM-2: nouvel etat de la carte et date de la prochaine revision."""
+    facilite = etat.facilite + 0.1 - (5 - qualite) * (0.08 + (5 - qualite) * 0.02)
+    facilite = max(FACILITE_MIN, facilite)
+    if qualite < 3:
+        nouvel_etat = replace(etat, repetitions=0, intervalle_jours=0.0, facilite=facilite, oublis=etat.oublis + 1)
+        return nouvel_etat, moment + DELAI_REAPPRENTISSAGE
+
+    repetitions = etat.repetitions + 1
+    if repetitions == 1:
+        intervalle = 1.0
+    elif repetitions == 2:
+        intervalle = 6.0
+    else:
+        intervalle = round(etat.intervalle_jours * facilite, 1)
+    nouvel_etat = replace(etat, repetitions=repetitions, intervalle_jours=intervalle, facilite=facilite)
+    return nouvel_etat, moment + timedelta(days=intervalle)
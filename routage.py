@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from limiteur import AttenteTropLongue, BudgetEpuise
+
+
+ResultatCorrection = tuple[dict[str, Any] | None, str, dict[str, int]]
+
+
+def _env_float(nom: str, defaut: float) -> float:
+    try:
+        return float(os.getenv(nom, str(defaut)))
+    except ValueError:
+        return defaut
+
+
+# Refus du limiteur avant l'appel (secours sans capacite): le modele n'a pas ete sollicite,
+# ce n'est pas une erreur a compter dans ses statistiques.
+REFUS_CAPACITE = (AttenteTropLongue, BudgetEpuise)
+
+NIVEAUX_DEBUTANTS = {"A1", "A2"}
+NIVEAUX_AVANCES = {"B2", "C1", "C2"}
+
+
+class StatsModele:
+    """Fenetre glissante des derniers appels d'un modele (latence + succes)."""
+
+    def __init__(self, taille: int = 50) -> None:
+        self._appels: deque[tuple[float, bool]] = deque(maxlen=taille)
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, latence_s: float, succes: bool) -> None:
+        with self._verrou:
+            self._appels.append((latence_s, succes))
+
+    def resume(self) -> dict[str, Any]:
+        with self._verrou:
+            appels = list(self._appels)
+        latences = sorted(latence for latence, succes in appels if succes)
+        erreurs = sum(1 for _, succes in appels if not succes)
+        p95 = latences[min(len(latences) - 1, int(0.95 * len(latences)))] if latences else None
+        return {
+            "appels": len(appels),
+            "taux_erreur": erreurs / len(appels) if appels else 0.0,
+            "p50_s": latences[len(latences) // 2] if latences else None,
+            "p95_s": p95,
+        }
+
+
+class RouteurModeles:
+    def __init__(
+        self,
+        modele_defaut: str,
+        modele_leger: str = "",
+        modele_fort: str = "",
+        modele_secours: str = "",
+        slo_s: float = 20.0,
+        seuil_erreur: float = 0.5,
+    ) -> None:
+        self.modele_defaut = modele_defaut
+        self.modele_leger = modele_leger or modele_defaut
+        self.modele_fort = modele_fort or modele_defaut
+        self.modele_secours = modele_secours
+        self.slo_s = slo_s
+        self.seuil_erreur = seuil_erreur
+        self._stats: dict[str, StatsModele] = {}
+        self._verrou = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="correction")
+
+    def stats(self, modele: str) -> StatsModele:
+        with self._verrou:
+            if modele not in self._stats:
+                self._stats[modele] = StatsModele()
+            return self._stats[modele]
+
+    def choisir(self, niveau: str, tache: str, nb_mots: int) -> str:
+        if niveau in NIVEAUX_DEBUTANTS and nb_mots <= 150:
+            modele = self.modele_leger
+        elif niveau in NIVEAUX_AVANCES or "3" in tache or nb_mots > 200:
+            modele = self.modele_fort
+        else:
+            modele = self.modele_defaut
+
+        # Modele en panne sur la fenetre recente: on bascule directement sur le secours.
+        resume = self.stats(modele).resume()
+        if self.modele_secours and resume["appels"] >= 5 and resume["taux_erreur"] >= self.seuil_erreur:
+            return self.modele_secours
+        return modele
+
+    def delai_couverture(self, modele: str) -> float:
+        resume = self.stats(modele).resume()
+        if resume["appels"] >= 10 and resume["p95_s"] is not None:
+            return min(self.slo_s, resume["p95_s"])
+        return self.slo_s
+
+    def _lancer(self, executer: Callable[[str, bool], ResultatCorrection], modele: str, secours: bool) -> Future:
+        def tache() -> ResultatCorrection:
+            debut = time.perf_counter()
+            try:
+                resultat = executer(modele, secours)
+            except REFUS_CAPACITE:
+                raise
+            except Exception:
+                self.stats(modele).enregistrer(time.perf_counter() - debut, False)
+                raise
+            self.stats(modele).enregistrer(time.perf_counter() - debut, resultat[0] is not None)
+            return resultat
+
+        return self._pool.submit(tache)
+
+    def corriger(
+        self,
+        executer: Callable[[str, bool], ResultatCorrection],
+        niveau: str,
+        tache: str,
+        nb_mots: int,
+    ) -> tuple[ResultatCorrection, str]:
+        """Lance le modele choisi et, s'il depasse le SLO ou echoue, une requete de secours.
+
+        `executer(modele, secours)` fait l'appel; la premiere reponse valide gagne.
+        """
+        principal = self.choisir(niveau, tache, nb_mots)
+        secours = self.modele_secours if self.modele_secours and self.modele_secours != principal else ""
+
+        en_cours = {self._lancer(executer, principal, False): principal}
+        termines, _ = wait(en_cours, timeout=self.delai_couverture(principal))
+        if secours and (not termines or not _reponse_valide(next(iter(termines)))):
+            en_cours[self._lancer(executer, secours, True)] = secours
+
+        echecs: list[tuple[Future, str]] = []
+        while en_cours:
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for future in termines:
+                modele = en_cours.pop(future)
+                if _reponse_valide(future):
+                    return future.result(), modele
+                echecs.append((future, modele))
+
+        # Aucune reponse valide: on rend celle du modele principal (ou son exception).
+        future, modele = next(((f, m) for f, m in echecs if m == principal), echecs[0])
+        return future.result(), modele
+
+
+def _reponse_valide(future: Future) -> bool:
+    return future.exception() is None and future.result()[0] is not None
+
+
+_routeur: RouteurModeles | None = None
+_verrou_routeur = threading.Lock()
+
+
+def routeur_partage(modele_defaut: str) -> RouteurModeles:
+    global _routeur
+    with _verrou_routeur:
+        if _routeur is None or _routeur.modele_defaut != modele_defaut:
+            _routeur = RouteurModeles(
+                modele_defaut=modele_defaut,
+                modele_leger=os.getenv("OPENAI_MODEL_LIGHT", ""),
+                modele_fort=os.getenv("OPENAI_MODEL_STRONG", ""),
+                modele_secours=os.getenv("OPENAI_FALLBACK_MODEL", ""),
+                slo_s=_env_float("OPENAI_HEDGE_SLO_S", 20.0),
+            )
+        return _routeur
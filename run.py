@@ -1,26 +1,78 @@
 from __future__ import annotations
 
+import importlib
 import os
-import subprocess
 import sys
+import threading
+import time
+from pathlib import Path
 
+import db
 
-def bootstrap_db() -> None:
-    script = os.path.join("scripts", "bootstrap_db.py")
-    if not os.path.exists(script):
-        return
-    subprocess.run([sys.executable, script], check=True)
+ROOT_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = ROOT_DIR / "scripts"
+# Modules lourds importes par app.py: charges pendant que le serveur demarre, la premiere page les trouve en cache.
+MODULES_APP = (
+    "openai",
+    "adaptatif",
+    "analyse_redaction",
+    "correction",
+    "limiteur",
+    "revision",
+    "routage",
+    "sessions",
+)
+
+
+def prechauffer() -> None:
+    debut = time.perf_counter()
+    for module in MODULES_APP:
+        try:
+            importlib.import_module(module)
+        except Exception as err:  # l'app remontera l'erreur elle-meme au premier rendu
+            print(f"[run] Prechauffage ignore pour {module}: {err}")
+    db.current_content_version()
+    print(f"[run] Modules de l'app charges ({(time.perf_counter() - debut) * 1000:.0f} ms)")
+
+
+def run_bootstrap() -> None:
+    try:
+        # scripts/ en fin de chemin: ses modules ne masquent jamais ceux de l'app.
+        if str(SCRIPTS_DIR) not in sys.path:
+            sys.path.append(str(SCRIPTS_DIR))
+        import bootstrap_db
+
+        # Ecrit lui-meme "ready" ou "failed" (avec l'erreur) dans le statut lu par l'app.
+        bootstrap_db.main()
+    except BaseException as err:
+        status = db.read_bootstrap_status() or {}
+        if status.get("state") != "failed":
+            db.write_bootstrap_status("failed", f"{type(err).__name__}: {err}")
+        raise
+    finally:
+        prechauffer()
+
+
+def start_bootstrap() -> threading.Thread | None:
+    if not (SCRIPTS_DIR / "bootstrap_db.py").exists():
+        return None
+    # Ecrit avant le lancement de Streamlit: la premiere requete voit deja "running", jamais une base absente.
+    db.write_bootstrap_status("running")
+    thread = threading.Thread(target=run_bootstrap, name="bootstrap-db", daemon=True)
+    thread.start()
+    return thread
 
 
 def main() -> int:
-    bootstrap_db()
+    from streamlit.web import cli as stcli
+
+    # Un seul interpreteur: bootstrap dans un thread, serveur Streamlit dans le thread principal
+    # (il y installe ses gestionnaires de signaux). Imports et caches de processus sont partages.
+    start_bootstrap()
     port = os.getenv("PORT", "8501")
-    command = [
-        sys.executable,
-        "-m",
-        "streamlit",
+    args = [
         "run",
-        "app.py",
+        str(ROOT_DIR / "app.py"),
         "--server.address",
         "0.0.0.0",
         "--server.port",
@@ -30,7 +82,11 @@ def main() -> int:
         "--browser.gatherUsageStats",
         "false",
     ]
-    return subprocess.call(command)
+    try:
+        stcli.main(args=args, prog_name="streamlit", standalone_mode=True)
+    except SystemExit as exit_:
+        return int(exit_.code or 0)
+    return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from analyse_redaction import AnalyseurRedaction, extraire_connecteurs
+
+
+def construire_texte(pack: dict, nb_mots: int, rng: random.Random) -> str:
+    phrases = [q["question"].replace("___", "donc") for q in pack.get("exercises", [])]
+    phrases += [v["exemple_fr"] for v in pack.get("vocabulary", [])]
+    mots: list[str] = []
+    while len(mots) < nb_mots:
+        mots.extend(rng.choice(phrases).split())
+    return " ".join(mots[:nb_mots]) + "."
+
+
+def mesurer(fonction, repetitions: int) -> float:
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mesure la pre-analyse locale d'une redaction.")
+    parser.add_argument("--pack", type=Path, default=ROOT_DIR / "content" / "packs" / "tcf_pack_v3.json")
+    parser.add_argument("--mots", type=int, default=300)
+    parser.add_argument("--repetitions", type=int, default=200)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with args.pack.open("r", encoding="utf-8") as f:
+        pack = json.load(f)
+    rng = random.Random(0)
+    texte = construire_texte(pack, args.mots, rng)
+    connecteurs = extraire_connecteurs(
+        [l for l in pack.get("lessons", []) if "connecteur" in l["titre"].lower()],
+        [e for e in pack.get("exercises", []) if e.get("theme") == "Connecteurs"],
+    )
+
+    froid = mesurer(lambda: AnalyseurRedaction(connecteurs).analyser(texte), args.repetitions)
+    analyseur = AnalyseurRedaction(connecteurs)
+    analyseur.analyser(texte)
+    chaud = mesurer(lambda: analyseur.analyser(texte), args.repetitions)
+    compteur = iter(range(10**9))
+    edition = mesurer(lambda: analyseur.analyser(f"{texte} Nouvelle phrase {next(compteur)}."), args.repetitions)
+
+    print(f"Texte: {args.mots} mots")
+    print(f"- analyse a froid (avec compilation): {froid:.2f} ms")
+    print(f"- relance sans modification: {chaud:.2f} ms")
+    print(f"- relance apres une edition: {edition:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
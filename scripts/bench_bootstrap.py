@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from bootstrap_db import (
+    check_snapshot,
+    remove_db,
+    resolve_paths,
+    resolve_snapshot_path,
+    restore_from_dump,
+    restore_from_pack,
+    restore_from_snapshot,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare le temps de bootstrap: snapshot binaire, dump SQL, import du pack."
+    )
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--json-out", type=Path, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    _, schema_path, pack_path, dump_path = resolve_paths()
+    snapshot_path = resolve_snapshot_path()
+
+    chemins = {}
+    if check_snapshot(snapshot_path, dump_path)[0] is not None:
+        chemins["snapshot"] = lambda db: restore_from_snapshot(db, snapshot_path)
+    else:
+        print(f"Snapshot indisponible ({snapshot_path}): lancer scripts/build_db_snapshot.py")
+    if dump_path.exists():
+        chemins["dump"] = lambda db: restore_from_dump(db, dump_path)
+    if pack_path.exists():
+        chemins["pack"] = lambda db: restore_from_pack(db, schema_path, pack_path)
+
+    rapport: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as dossier:
+        db_path = Path(dossier) / "bench.db"
+        for nom, restaurer in chemins.items():
+            durees = []
+            for _ in range(args.repetitions):
+                remove_db(db_path)
+                debut = time.perf_counter()
+                restaurer(db_path)
+                durees.append((time.perf_counter() - debut) * 1000)
+            rapport[nom] = {
+                "median_ms": round(statistics.median(durees), 1),
+                "min_ms": round(min(durees), 1),
+                "max_ms": round(max(durees), 1),
+            }
+
+    for nom, valeurs in rapport.items():
+        print(f"- {nom}: {valeurs['median_ms']} ms (min {valeurs['min_ms']}, max {valeurs['max_ms']})")
+    if args.json_out:
+        args.json_out.write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def percentile(valeurs: list[float], q: float) -> float:
+    ordonnees = sorted(valeurs)
+    return ordonnees[min(len(ordonnees) - 1, int(q * len(ordonnees)))]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Mesure la latence de connexion (scrypt) sous des connexions simultanees."
+    )
+    parser.add_argument("--connexions", type=int, default=40, help="Connexions lancees en meme temps.")
+    parser.add_argument("--utilisateurs", type=int, default=10)
+    parser.add_argument("--json-out", type=Path, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as dossier:
+        # Base jetable: le module db lit APP_DB_PATH a l'import.
+        os.environ["APP_DB_PATH"] = str(Path(dossier) / "bench.db")
+        import db
+
+        db.ensure_auth_tables()
+        for i in range(args.utilisateurs):
+            db.create_user(f"bench{i}", "motdepasse")
+
+        debut = time.perf_counter()
+        db.authenticate_user("bench0", "motdepasse")
+        kdf_ms = (time.perf_counter() - debut) * 1000
+
+        latences: list[float] = []
+        refus = 0
+        verrou = threading.Lock()
+        depart = threading.Barrier(args.connexions)
+
+        def connexion(i: int) -> None:
+            nonlocal refus
+            depart.wait()
+            debut = time.perf_counter()
+            try:
+                ok = db.authenticate_user(f"bench{i % args.utilisateurs}", "motdepasse") is not None
+            except TimeoutError:
+                ok = False
+            with verrou:
+                if ok:
+                    latences.append((time.perf_counter() - debut) * 1000)
+                else:
+                    refus += 1
+
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.connexions) as pool:
+            list(pool.map(connexion, range(args.connexions)))
+        duree_s = time.perf_counter() - debut
+
+    rapport = {
+        "scrypt": {"n": db.SCRYPT_N, "r": db.SCRYPT_R, "p": db.SCRYPT_P},
+        "kdf_workers": db.KDF_WORKERS,
+        "connexion_seule_ms": round(kdf_ms, 1),
+        "connexions_simultanees": args.connexions,
+        "reussies": len(latences),
+        "refusees_timeout": refus,
+        "p50_ms": round(statistics.median(latences), 1) if latences else None,
+        "p95_ms": round(percentile(latences, 0.95), 1) if latences else None,
+        "max_ms": round(max(latences), 1) if latences else None,
+        "connexions_par_s": round(len(latences) / duree_s, 1),
+    }
+    print(json.dumps(rapport, indent=2, ensure_ascii=False))
+    if args.json_out:
+        args.json_out.write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
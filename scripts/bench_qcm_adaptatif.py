@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from adaptatif import SE_CIBLE, TOUS, IndexItems, difficulte_item, estimer_theta, information, probabilite
+
+
+def charger_banque(pack: Path | None, taille: int, rng: random.Random) -> list[tuple[int, str, float]]:
+    if pack is not None:
+        with pack.open("r", encoding="utf-8") as f:
+            exercices = json.load(f).get("exercises", [])
+        # Difficultes du pack (niveau) + bruit: les items d'un meme niveau ne sont pas identiques.
+        return [
+            (i, str(e.get("theme", "")), difficulte_item(str(e.get("niveau", ""))) + rng.gauss(0, 0.5))
+            for i, e in enumerate(exercices)
+        ]
+    return [(i, "", rng.gauss(0, 1.3)) for i in range(taille)]
+
+
+def passer_test(
+    theta_vrai: float,
+    difficultes: dict[int, float],
+    choisir,
+    se_cible: float,
+    max_items: int,
+    rng: random.Random,
+) -> tuple[int, float]:
+    reponses: list[tuple[float, bool]] = []
+    vus: set[int] = set()
+    theta, se = estimer_theta(reponses)
+    while se > se_cible and len(reponses) < max_items:
+        item_id = choisir(theta, vus)
+        if item_id is None:
+            break
+        vus.add(item_id)
+        difficulte = difficultes[item_id]
+        reponses.append((difficulte, rng.random() < probabilite(theta_vrai, difficulte)))
+        theta, se = estimer_theta(reponses)
+    return len(reponses), theta
+
+
+def resume(longueurs: list[int], erreurs: list[float], max_items: int) -> dict[str, float]:
+    return {
+        "items_moyen": round(statistics.fmean(longueurs), 1),
+        "items_p90": sorted(longueurs)[int(0.9 * (len(longueurs) - 1))],
+        "plafond_atteint_pct": round(100 * sum(1 for n in longueurs if n >= max_items) / len(longueurs), 1),
+        "rmse_theta": round(math.sqrt(statistics.fmean(e * e for e in erreurs)), 3),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Simule des apprenants: longueur de test adaptatif vs aleatoire a precision egale."
+    )
+    parser.add_argument("--pack", type=Path, default=ROOT_DIR / "content" / "packs" / "tcf_pack_v3.json")
+    parser.add_argument("--synthetique", type=int, default=0, help="Banque synthetique de N items (ignore --pack).")
+    parser.add_argument("--apprenants", type=int, default=300)
+    parser.add_argument("--se-cible", type=float, default=SE_CIBLE, help="Erreur standard visee sur theta.")
+    parser.add_argument("--max-items", type=int, default=60)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--json-out", type=Path, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.graine)
+    banque = charger_banque(None if args.synthetique else args.pack, args.synthetique, rng)
+    difficultes = {item_id: difficulte for item_id, _, difficulte in banque}
+    ids = list(difficultes)
+
+    debut = time.perf_counter()
+    index = IndexItems(banque)
+    construction_ms = (time.perf_counter() - debut) * 1000
+
+    def adaptatif(theta: float, vus: set[int]) -> int | None:
+        return index.prochain(TOUS, theta, vus, rng)
+
+    def aleatoire(theta: float, vus: set[int]) -> int | None:
+        if len(vus) >= len(ids):
+            return None
+        while True:
+            item_id = rng.choice(ids)
+            if item_id not in vus:
+                return item_id
+
+    def balayage(theta: float, vus: set[int]) -> int | None:
+        return max((i for i in ids if i not in vus), key=lambda i: information(theta, difficultes[i]), default=None)
+
+    thetas = [rng.gauss(0, 1) for _ in range(args.apprenants)]
+    resultats: dict[str, dict[str, float]] = {}
+    for nom, choisir in (("adaptatif", adaptatif), ("aleatoire", aleatoire)):
+        longueurs, erreurs = [], []
+        for theta_vrai in thetas:
+            n, theta = passer_test(theta_vrai, difficultes, choisir, args.se_cible, args.max_items, rng)
+            longueurs.append(n)
+            erreurs.append(theta - theta_vrai)
+        resultats[nom] = resume(longueurs, erreurs, args.max_items)
+
+    vus = set(rng.sample(ids, min(20, len(ids))))
+    temps = {}
+    for nom, choisir in (("index_bisect", adaptatif), ("balayage_complet", balayage)):
+        debut = time.perf_counter()
+        for _ in range(200):
+            choisir(rng.gauss(0, 1), vus)
+        temps[nom] = round((time.perf_counter() - debut) / 200 * 1e6, 1)
+
+    gain = 100 * (1 - resultats["adaptatif"]["items_moyen"] / resultats["aleatoire"]["items_moyen"])
+    rapport = {
+        "banque_items": len(banque),
+        "apprenants": args.apprenants,
+        "se_cible": args.se_cible,
+        "max_items": args.max_items,
+        "index_construction_ms": round(construction_ms, 2),
+        "selection_us": temps,
+        "resultats": resultats,
+        "reduction_longueur_pct": round(gain, 1),
+    }
+    print(f"Banque: {len(banque)} items, {args.apprenants} apprenants, SE cible {args.se_cible}")
+    for nom, valeurs in resultats.items():
+        print(
+            f"- {nom}: {valeurs['items_moyen']} items en moyenne (p90 {valeurs['items_p90']}), "
+            f"RMSE theta {valeurs['rmse_theta']}, plafond atteint {valeurs['plafond_atteint_pct']}%"
+        )
+    print(f"Test adaptatif plus court de {rapport['reduction_longueur_pct']}% a precision egale.")
+    print(
+        f"Selection d'un item: index {temps['index_bisect']} us vs balayage {temps['balayage_complet']} us "
+        f"(index construit en {rapport['index_construction_ms']} ms)"
+    )
+    if args.json_out:
+        args.json_out.write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from bootstrap_db import CONTENT_TABLES, remove_db, resolve_paths, restore_from_dump
+from dump_artifact import iter_dump, write_artifact
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SCENARIOS = ("fresh", "existing", "reset", "snapshot")
+PHASES = ("serveur_ms", "bootstrap_ms", "pret_ms", "imports_ms", "accueil_ms", "accueil_chaud_ms", "total_ms")
+DELAI_MAX_S = 120.0
+RE_IMPORTS = re.compile(r"\[run\] Modules de l'app charges \((\d+) ms\)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mesure le demarrage a froid de run.py jusqu'a la page d'accueil rendue, phase par phase, "
+            "pour chaque chemin de bootstrap et plusieurs tailles de contenu synthetique."
+        )
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument(
+        "--tailles",
+        nargs="+",
+        type=int,
+        default=[1, 4],
+        help="Facteurs de taille du contenu (1 = dump livre, N = lignes de contenu dupliquees N fois).",
+    )
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--json-out", type=Path, default=Path("bench_startup.json"))
+    parser.add_argument("--reference", type=Path, default=None, help="Rapport precedent a comparer.")
+    return parser.parse_args()
+
+
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def construire_contenu(dossier: Path, taille: int) -> dict[str, Any]:
+    """Dump et snapshot synthetiques: le contenu livre, lignes dupliquees `taille` fois."""
+    _, _, _, dump_livre = resolve_paths()
+    base = dossier / "synthetique.db"
+    remove_db(base)
+    restore_from_dump(base, dump_livre)
+    with sqlite3.connect(base) as conn:
+        for table in CONTENT_TABLES:
+            if table == "categories":
+                continue  # slug UNIQUE, et quelques lignes seulement
+            colonnes = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] != "id")
+            dernier = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for _ in range(taille - 1):
+                conn.execute(f"INSERT INTO {table} ({colonnes}) SELECT {colonnes} FROM {table} WHERE id <= ?", (dernier,))
+        comptes = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in CONTENT_TABLES}
+    conn.close()
+
+    dump = dossier / "bootstrap_dump.sql.gz"
+    conn = sqlite3.connect(base)
+    try:
+        write_artifact(iter_dump(conn), dump)
+    finally:
+        conn.close()
+    remove_db(base)
+    snapshot = dossier / "app_snapshot.db"
+    subprocess.run(
+        [
+            sys.executable,
+            str(ROOT_DIR / "scripts" / "build_db_snapshot.py"),
+            "--source",
+            "dump",
+            "--dump",
+            str(dump),
+            "--out",
+            str(snapshot),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return {"dump": dump, "snapshot": snapshot, "lignes": comptes, "dump_octets": dump.stat().st_size}
+
+
+async def rendre_accueil(port: int) -> float:
+    """Un rerun complet de app.py via le websocket de Streamlit, comme un navigateur; renvoie la duree."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from tornado.websocket import websocket_connect
+
+    debut = time.perf_counter()
+    ws = await websocket_connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"])
+    try:
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        await ws.write_message(message.SerializeToString(), binary=True)
+        while True:
+            brut = await asyncio.wait_for(ws.read_message(), DELAI_MAX_S)
+            if brut is None:
+                raise RuntimeError("Websocket ferme avant la fin du rendu.")
+            recu = ForwardMsg()
+            recu.ParseFromString(brut)
+            if recu.WhichOneof("type") == "delta" and recu.delta.new_element.WhichOneof("type") == "exception":
+                raise RuntimeError(f"Exception pendant le rendu: {recu.delta.new_element.exception.message}")
+            if recu.WhichOneof("type") == "script_finished":
+                return (time.perf_counter() - debut) * 1000
+    finally:
+        ws.close()
+
+
+def attendre_demarrage(port: int, statut_path: Path, debut: float) -> tuple[float, float]:
+    """Temps jusqu'au serveur sain et jusqu'a la base prete, sondes ensemble (ils evoluent en parallele)."""
+    serveur_ms = pret_ms = None
+    while serveur_ms is None or pret_ms is None:
+        ecoule = (time.perf_counter() - debut) * 1000
+        if ecoule > DELAI_MAX_S * 1000:
+            raise TimeoutError("Demarrage trop long.")
+        if serveur_ms is None and serveur_sain(port):
+            serveur_ms = ecoule
+        if pret_ms is None and lire_statut(statut_path).get("state") in ("ready", "failed"):
+            pret_ms = ecoule
+        time.sleep(0.005)
+    return serveur_ms, pret_ms
+
+
+def serveur_sain(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=0.5) as reponse:
+            return reponse.status == 200
+    except OSError:
+        return False
+
+
+def lire_statut(chemin: Path) -> dict[str, Any]:
+    try:
+        return json.loads(chemin.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def preparer_volume(volume: Path, scenario: str, env: dict[str, str]) -> None:
+    for chemin in volume.glob("app.db*"):
+        chemin.unlink()
+    if scenario in ("existing", "reset"):
+        # Base deja prete, comme apres un premier deploiement: hors chronometre.
+        subprocess.run(
+            [sys.executable, str(ROOT_DIR / "scripts" / "bootstrap_db.py")],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    # Statut d'une execution precedente: ne doit pas passer pour "ready".
+    Path(env["BOOTSTRAP_STATUS_PATH"]).unlink(missing_ok=True)
+
+
+def mesurer(volume: Path, scenario: str, contenu: dict[str, Any]) -> dict[str, float | None]:
+    port = port_libre()
+    statut_path = volume / "app.db.bootstrap.json"
+    env = dict(
+        os.environ,
+        APP_DB_PATH=str(volume / "app.db"),
+        BOOTSTRAP_STATUS_PATH=str(statut_path),
+        CONTENT_DB_DIR=str(volume / "content"),
+        DB_SQL_DUMP_PATH=str(contenu["dump"]),
+        DB_SNAPSHOT_PATH=str(contenu["snapshot"] if scenario == "snapshot" else volume / "absent.db"),
+        PORT=str(port),
+        PYTHONUNBUFFERED="1",
+    )
+    env.pop("BOOTSTRAP_RESET", None)
+    preparer_volume(volume, scenario, env)
+    if scenario == "reset":
+        env["BOOTSTRAP_RESET"] = "1"
+
+    lignes: list[str] = []
+    debut = time.perf_counter()
+    processus = subprocess.Popen(
+        [sys.executable, str(ROOT_DIR / "run.py")],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        start_new_session=True,
+    )
+
+    def lire_sortie() -> None:
+        for ligne in processus.stdout or []:
+            lignes.append(ligne)
+
+    lecteur = threading.Thread(target=lire_sortie, daemon=True)
+    lecteur.start()
+    try:
+        serveur_ms, pret_ms = attendre_demarrage(port, statut_path, debut)
+        statut = lire_statut(statut_path)
+        if statut.get("state") != "ready":
+            raise RuntimeError(f"Bootstrap en echec: {statut.get('message')}")
+        accueil_ms = asyncio.run(rendre_accueil(port))
+        total_ms = (time.perf_counter() - debut) * 1000
+        accueil_chaud_ms = asyncio.run(rendre_accueil(port))
+        imports = None
+        limite = time.perf_counter() + 10
+        while imports is None and time.perf_counter() < limite:
+            imports = next((m for m in map(RE_IMPORTS.search, list(lignes)) if m), None)
+            time.sleep(0.01)
+    finally:
+        os.killpg(processus.pid, signal.SIGTERM)
+        processus.wait(timeout=30)
+        lecteur.join(timeout=5)
+
+    return {
+        "serveur_ms": round(serveur_ms, 1),
+        "bootstrap_ms": float(str(statut.get("message", "0")).split()[0]),
+        "pret_ms": round(pret_ms, 1),
+        "imports_ms": float(imports.group(1)) if imports else None,
+        "accueil_ms": round(accueil_ms, 1),
+        "accueil_chaud_ms": round(accueil_chaud_ms, 1),
+        "total_ms": round(total_ms, 1),
+    }
+
+
+def mediane(valeurs: list[float | None]) -> float | None:
+    presentes = [v for v in valeurs if v is not None]
+    return round(statistics.median(presentes), 1) if presentes else None
+
+
+def comparer(rapport: dict[str, Any], reference: dict[str, Any]) -> None:
+    anciens = {(r["taille"], r["scenario"]): r["median"] for r in reference.get("resultats", [])}
+    print(f"\nComparaison avec {reference.get('genere_le')}:")
+    for resultat in rapport["resultats"]:
+        ancien = anciens.get((resultat["taille"], resultat["scenario"]))
+        if not ancien:
+            continue
+        ecarts = []
+        for phase in ("serveur_ms", "pret_ms", "accueil_ms", "total_ms"):
+            if ancien.get(phase):
+                ecarts.append(f"{phase} {100 * (resultat['median'][phase] / ancien[phase] - 1):+.0f}%")
+        print(f"- x{resultat['taille']} {resultat['scenario']}: {', '.join(ecarts)}")
+
+
+def main() -> None:
+    import streamlit
+
+    args = parse_args()
+    rapport: dict[str, Any] = {
+        "genere_le": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": sys.version.split()[0],
+        "sqlite_version": sqlite3.sqlite_version,
+        "streamlit_version": streamlit.__version__,
+        "repetitions": args.repetitions,
+        "resultats": [],
+    }
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in args.tailles:
+            contenu = construire_contenu(Path(dossier), max(1, taille))
+            volume = Path(dossier) / "volume"
+            volume.mkdir(exist_ok=True)
+            for scenario in args.scenarios:
+                mesures = [mesurer(volume, scenario, contenu) for _ in range(args.repetitions)]
+                median = {phase: mediane([m[phase] for m in mesures]) for phase in PHASES}
+                rapport["resultats"].append(
+                    {
+                        "taille": taille,
+                        "scenario": scenario,
+                        "lignes": contenu["lignes"],
+                        "dump_octets": contenu["dump_octets"],
+                        "median": median,
+                        "mesures": mesures,
+                    }
+                )
+                print(
+                    f"- x{taille} {scenario}: serveur {median['serveur_ms']} ms, bootstrap {median['bootstrap_ms']} ms, "
+                    f"pret {median['pret_ms']} ms, imports {median['imports_ms']} ms, "
+                    f"accueil {median['accueil_ms']} ms (chaud {median['accueil_chaud_ms']}), total {median['total_ms']} ms"
+                )
+
+    args.json_out.write_text(json.dumps(rapport, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"Rapport: {args.json_out}")
+    if args.reference:
+        comparer(rapport, json.loads(args.reference.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 from __future__ import annotations
 
+import json
 import os
 import sqlite3
+import sys
+import time
 from pathlib import Path
+from typing import Any
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+import db
+from dump_artifact import ArtifactError, restore_artifact, sha256_file, verify_artifact
 from import_content_pack import import_pack
 
 
+SNAPSHOT_FORMAT = 1
+# Tables remplacees par le contenu; les tables utilisateurs ne sont jamais touchees par un rafraichissement.
+CONTENT_TABLES = (
+    "categories",
+    "lessons",
+    "vocabulary",
+    "verb_conjugations",
+    "exercises",
+    "writing_prompts",
+    "reading_passages",
+    "reading_questions",
+)
+
+
 def resolve_paths() -> tuple[Path, Path, Path, Path]:
     root = Path(__file__).resolve().parents[1]
     db_path = Path(os.getenv("APP_DB_PATH", str(root / "data" / "app.db")))
@@ -14,21 +37,30 @@ def resolve_paths() -> tuple[Path, Path, Path, Path]:
     pack_path = Path(
         os.getenv("CONTENT_PACK_PATH", str(root / "content" / "packs" / "tcf_pack_v3.json"))
     )
-    dump_path = Path(os.getenv("DB_SQL_DUMP_PATH", str(root / "bootstrap" / "bootstrap_dump.sql")))
+    dump_path = Path(os.getenv("DB_SQL_DUMP_PATH", str(root / "bootstrap" / "bootstrap_dump.sql.gz")))
     return db_path, schema_path, pack_path, dump_path
 
 
+def resolve_snapshot_path() -> Path:
+    root = Path(__file__).resolve().parents[1]
+    return Path(os.getenv("DB_SNAPSHOT_PATH", str(root / "bootstrap" / "app_snapshot.db")))
+
+
+def snapshot_meta_path(snapshot_path: Path) -> Path:
+    return snapshot_path.with_suffix(".json")
+
+
 def table_has_rows(conn: sqlite3.Connection, table: str) -> bool:
-    cur = conn.execute(f"SELECT COUNT(*) FROM {table}")
-    return int(cur.fetchone()[0]) > 0
+    return conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None
 
 
 def needs_bootstrap(db_path: Path) -> bool:
+    """Controle de secours pour les bases sans ligne meta (anterieures a son introduction)."""
     if not db_path.exists():
         return True
     try:
         with sqlite3.connect(db_path) as conn:
-            for table in ("categories", "lessons", "vocabulary", "exercises", "reading_passages"):
+            for table in CONTENT_TABLES:
                 if not table_has_rows(conn, table):
                     return True
     except sqlite3.DatabaseError:
@@ -36,29 +68,119 @@ def needs_bootstrap(db_path: Path) -> bool:
     return False
 
 
-def main() -> None:
-    db_path, schema_path, pack_path, dump_path = resolve_paths()
-    db_path.parent.mkdir(parents=True, exist_ok=True)
+def has_user_data(db_path: Path) -> bool:
+    # Lecture seule: sonder une base absente ne doit pas creer un app.db vide (qui "existerait" ensuite).
+    if not db_path.exists():
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.DatabaseError:
+        return False
+    try:
+        return table_has_rows(conn, "users")
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
 
-    force_reset = os.getenv("BOOTSTRAP_RESET", "0") == "1"
-    if not force_reset and not needs_bootstrap(db_path):
-        print(f"[bootstrap] Base deja prete, aucune action: {db_path}")
-        return
 
-    if dump_path.exists():
-        print(f"[bootstrap] Initialisation depuis dump SQL: {dump_path}")
-        if db_path.exists():
-            db_path.unlink()
-        with sqlite3.connect(db_path) as conn:
-            sql = dump_path.read_text(encoding="utf-8")
-            conn.executescript(sql)
-            conn.commit()
-        print("[bootstrap] Dump SQL importe.")
-        return
+def read_content_meta(db_path: Path) -> dict[str, Any] | None:
+    if not db_path.exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.DatabaseError:
+        return None
+    try:
+        return db.get_content_meta(conn)
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
 
-    print(f"[bootstrap] Initialisation depuis pack de contenu: {db_path}")
-    print(f"[bootstrap] Schema: {schema_path}")
-    print(f"[bootstrap] Pack: {pack_path}")
+
+def content_source(pack_path: Path, dump_path: Path) -> tuple[str, Path]:
+    """Artefact de reference du contenu: le dump s'il existe, sinon le pack."""
+    return ("dump", dump_path) if dump_path.exists() else ("pack", pack_path)
+
+
+def remove_db(db_path: Path) -> None:
+    for path in (db_path, db_path.with_name(db_path.name + "-wal"), db_path.with_name(db_path.name + "-shm")):
+        if path.exists():
+            path.unlink()
+
+
+def check_snapshot(snapshot_path: Path, dump_path: Path) -> tuple[dict[str, Any] | None, str]:
+    """Renvoie (metadonnees, "") si le snapshot est utilisable, sinon (None, raison)."""
+    meta_path = snapshot_meta_path(snapshot_path)
+    if not snapshot_path.exists() or not meta_path.exists():
+        return None, "snapshot absent"
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as err:
+        return None, f"metadonnees illisibles ({err})"
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return None, f"format {meta.get('format')} non supporte"
+    if sha256_file(snapshot_path) != meta.get("sha256"):
+        return None, "checksum invalide"
+    # Dump modifie depuis la construction: le snapshot est perime.
+    if meta.get("source") == "dump" and dump_path.exists() and sha256_file(dump_path) != meta.get("source_sha256"):
+        return None, "snapshot perime (dump modifie)"
+    return meta, ""
+
+
+def staging_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + ".restore")
+
+
+def promote(tmp_path: Path, db_path: Path) -> None:
+    """Remplace la base live par la base restauree, en un rename atomique.
+
+    Un -wal/-shm restant de l'ancienne base serait rejoue sur la nouvelle: on les retire d'abord.
+    """
+    for suffix in ("-wal", "-shm"):
+        stale = db_path.with_name(db_path.name + suffix)
+        if stale.exists():
+            stale.unlink()
+    os.replace(tmp_path, db_path)
+
+
+def restore_from_snapshot(db_path: Path, snapshot_path: Path) -> None:
+    """Copie page a page via l'API de backup SQLite dans un fichier temporaire, puis rename atomique."""
+    tmp_path = staging_path(db_path)
+    remove_db(tmp_path)
+    source = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+        if target.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise sqlite3.DatabaseError("quick_check en echec apres restauration")
+    finally:
+        target.close()
+        source.close()
+    promote(tmp_path, db_path)
+
+
+def restore_from_dump(db_path: Path, dump_path: Path) -> None:
+    """Verifie le checksum, rejoue le dump en streaming dans un fichier temporaire, puis rename.
+
+    La base live n'est touchee qu'une fois le dump entierement rejoue.
+    """
+    verify_artifact(dump_path)
+    tmp_path = staging_path(db_path)
+    remove_db(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        restore_artifact(conn, dump_path)
+    except (ArtifactError, sqlite3.DatabaseError):
+        conn.close()
+        remove_db(tmp_path)
+        raise
+    conn.close()
+    promote(tmp_path, db_path)
+
+
+def restore_from_pack(db_path: Path, schema_path: Path, pack_path: Path) -> None:
     import_pack(
         db_path=db_path,
         pack_path=pack_path,
@@ -66,8 +188,178 @@ def main() -> None:
         reset_schema=True,
         replace_data=False,
     )
+
+
+def migrate(db_path: Path) -> None:
+    debut = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        applied = db.apply_migrations(conn)
+        version = db.get_schema_version(conn)
+        conn.execute("UPDATE meta SET schema_version = ? WHERE id = 1", (version,))
+        conn.commit()
+    finally:
+        conn.close()
+    duree_ms = (time.perf_counter() - debut) * 1000
+    if applied:
+        print(f"[bootstrap] Migrations appliquees: {applied} -> schema v{version} ({duree_ms:.1f} ms)")
+    else:
+        print(f"[bootstrap] Schema a jour (v{version}, {duree_ms:.1f} ms)")
+
+
+def restore(db_path: Path, schema_path: Path, pack_path: Path, dump_path: Path, snapshot_path: Path) -> None:
+    meta, reason = check_snapshot(snapshot_path, dump_path)
+    if meta is not None:
+        print(f"[bootstrap] Restauration du snapshot: {snapshot_path} (construit le {meta.get('built_at')})")
+        try:
+            restore_from_snapshot(db_path, snapshot_path)
+            print("[bootstrap] Snapshot restaure.")
+            return
+        except sqlite3.DatabaseError as err:
+            print(f"[bootstrap] Echec du snapshot ({err}), repli sur le dump SQL.")
+    else:
+        print(f"[bootstrap] Snapshot ignore: {reason}")
+
+    if dump_path.exists():
+        print(f"[bootstrap] Initialisation depuis dump SQL: {dump_path}")
+        try:
+            restore_from_dump(db_path, dump_path)
+            print("[bootstrap] Dump SQL importe.")
+            return
+        except (ArtifactError, sqlite3.DatabaseError) as err:
+            print(f"[bootstrap] Dump rejete ({err}), repli sur le pack de contenu.")
+
+    print(f"[bootstrap] Initialisation depuis pack de contenu: {db_path}")
+    print(f"[bootstrap] Schema: {schema_path}")
+    print(f"[bootstrap] Pack: {pack_path}")
+    restore_from_pack(db_path, schema_path, pack_path)
     print("[bootstrap] Base importee depuis pack.")
 
 
+def mark_content(db_path: Path, content_sha256: str, source: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        previous = db.get_content_meta(conn) or {}
+        # Meme artefact: on garde la version declaree par le pack (metadata.version) s'il l'a ecrite.
+        version = previous.get("content_version") if previous.get("content_sha256") == content_sha256 else None
+        db.set_content_meta(conn, content_sha256, source, version)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def refresh_content(db_path: Path, staging_db: Path) -> dict[str, int]:
+    """Aligne les tables de contenu de la base live sur staging_db, sans toucher aux tables utilisateurs.
+
+    Seules les lignes supprimees ou modifiees sont ecrites: les identifiants restent stables
+    (answer_events, item_stats et vocab_reviews y font reference).
+    """
+    changes: dict[str, int] = {}
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (str(staging_db),))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in CONTENT_TABLES:
+                live = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+                staged = {row[1] for row in conn.execute(f"PRAGMA src.table_info({table})")}
+                columns = ", ".join(column for column in live if column in staged)
+                deleted = conn.execute(f"DELETE FROM main.{table} WHERE id NOT IN (SELECT id FROM src.{table})").rowcount
+                upserted = conn.execute(
+                    f"INSERT OR REPLACE INTO main.{table} ({columns}) "
+                    f"SELECT {columns} FROM src.{table} EXCEPT SELECT {columns} FROM main.{table}"
+                ).rowcount
+                changes[table] = deleted + upserted
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+    return changes
+
+
+def republish_content(db_path: Path) -> None:
+    """Un contenu publie (CURRENT) masque celui de app.db: le rafraichissement est republie par-dessus."""
+    if not db.CONTENT_POINTER.exists():
+        return
+    # Import differe: publish_content importe ce module.
+    from publish_content import publish
+
+    name = publish(db.CONTENT_DIR, db_path)
+    print(f"[bootstrap] Contenu publie rebascule sur le rafraichissement: {name}")
+
+
+def run_bootstrap() -> None:
+    db_path, schema_path, pack_path, dump_path = resolve_paths()
+    snapshot_path = resolve_snapshot_path()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    source, source_path = content_source(pack_path, dump_path)
+    content_sha256 = sha256_file(source_path)
+
+    force_reset = os.getenv("BOOTSTRAP_RESET", "0") == "1"
+    # Une seule recherche par cle primaire dans le cas courant (base deja prete).
+    state = read_content_meta(db_path)
+    # Restauration complete seulement sans comptes a preserver (ou si BOOTSTRAP_RESET=1).
+    if force_reset or (state is None and needs_bootstrap(db_path) and not has_user_data(db_path)):
+        # Base complete (contenu, migrations, meta) preparee a part: l'app ne voit jamais de fichier partiel.
+        # "restoring": l'app affiche la page d'attente au lieu de servir l'ancien fichier qui va etre remplace.
+        db.write_bootstrap_status("restoring", "restauration complete")
+        staging_db = db_path.with_name(db_path.name + ".bootstrap")
+        remove_db(staging_db)
+        try:
+            restore(staging_db, schema_path, pack_path, dump_path, snapshot_path)
+            migrate(staging_db)
+            mark_content(staging_db, content_sha256, source)
+            promote(staging_db, db_path)
+        finally:
+            remove_db(staging_db)
+        print(f"[bootstrap] Base en place: {db_path}")
+        republish_content(db_path)
+        return
+
+    # Base existante: seul le delta de schema est applique, les donnees restent.
+    migrate(db_path)
+    if state is not None and state["import_complete"] and state["content_sha256"] == content_sha256:
+        print(f"[bootstrap] Base deja prete: {db_path} (contenu {content_sha256[:12]})")
+        return
+
+    if state is None:
+        reason = "base sans meta"
+    elif not state["import_complete"]:
+        reason = "import precedent interrompu"
+    else:
+        reason = f"contenu {str(state['content_sha256'])[:12]} -> {content_sha256[:12]}"
+    print(f"[bootstrap] Rafraichissement du contenu ({reason})")
+    if source == "pack":
+        # Import direct par sections: seules les sections dont l'empreinte a change sont reecrites.
+        sections = import_pack(db_path, pack_path, schema_path, reset_schema=False, replace_data=False)
+        print(f"[bootstrap] Contenu rafraichi depuis le pack: {len(sections)} section(s) reimportee(s)")
+        republish_content(db_path)
+        return
+    staging_db = db_path.with_name(db_path.name + ".content")
+    remove_db(staging_db)
+    try:
+        restore(staging_db, schema_path, pack_path, dump_path, snapshot_path)
+        changes = refresh_content(db_path, staging_db)
+    finally:
+        remove_db(staging_db)
+    mark_content(db_path, content_sha256, source)
+    print(f"[bootstrap] Contenu rafraichi: {sum(changes.values())} ligne(s) modifiee(s) {changes}")
+    republish_content(db_path)
+
+
+def main() -> None:
+    debut = time.perf_counter()
+    db.write_bootstrap_status("running")
+    try:
+        run_bootstrap()
+    except BaseException as err:
+        db.write_bootstrap_status("failed", f"{type(err).__name__}: {err}")
+        raise
+    db.write_bootstrap_status("ready", f"{(time.perf_counter() - debut) * 1000:.0f} ms")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bootstrap_db import (
+    CONTENT_TABLES,
+    SNAPSHOT_FORMAT,
+    db,
+    remove_db,
+    resolve_paths,
+    resolve_snapshot_path,
+    restore_from_dump,
+    restore_from_pack,
+    snapshot_meta_path,
+)
+from dump_artifact import sha256_file
+
+
+def parse_args() -> argparse.Namespace:
+    _, schema_path, pack_path, dump_path = resolve_paths()
+    parser = argparse.ArgumentParser(
+        description="Construit un snapshot SQLite pret a l'emploi (+ metadonnees JSON) pour le bootstrap."
+    )
+    parser.add_argument(
+        "--source",
+        choices=("auto", "dump", "pack"),
+        default="auto",
+        help="auto: dump SQL s'il existe, sinon pack de contenu.",
+    )
+    parser.add_argument("--dump", type=Path, default=dump_path)
+    parser.add_argument("--pack", type=Path, default=pack_path)
+    parser.add_argument("--schema", type=Path, default=schema_path)
+    parser.add_argument("--out", type=Path, default=resolve_snapshot_path())
+    return parser.parse_args()
+
+
+def schema_sha256(conn: sqlite3.Connection) -> str:
+    rows = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"
+    ).fetchall()
+    return hashlib.sha256("\n".join(f"{t}|{n}|{s}" for t, n, s in rows).encode("utf-8")).hexdigest()
+
+
+def main() -> None:
+    args = parse_args()
+    source = args.source
+    if source == "auto":
+        source = "dump" if args.dump.exists() else "pack"
+    source_path = args.dump if source == "dump" else args.pack
+    if not source_path.exists():
+        raise FileNotFoundError(f"Source introuvable: {source_path}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = args.out.with_name(args.out.name + ".build")
+    remove_db(tmp_path)
+    if source == "dump":
+        restore_from_dump(tmp_path, args.dump)
+    else:
+        restore_from_pack(tmp_path, args.schema, args.pack)
+
+    with sqlite3.connect(tmp_path) as conn:
+        # Snapshot deja migre: au demarrage, le runner n'a plus rien a appliquer.
+        db.apply_migrations(conn)
+        if source == "dump":
+            db.set_content_meta(conn, sha256_file(source_path), source)
+        conn.commit()
+        # Fichier autonome: pas de WAL, pages compactees.
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("VACUUM")
+        verdict = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if verdict != "ok":
+            raise sqlite3.DatabaseError(f"integrity_check en echec: {verdict}")
+        counts = {
+            table: int(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]) for table in CONTENT_TABLES
+        }
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "sqlite_version": sqlite3.sqlite_version,
+            "schema_version": db.get_schema_version(conn),
+            "schema_sha256": schema_sha256(conn),
+            "row_counts": counts,
+        }
+    conn.close()
+
+    os.replace(tmp_path, args.out)
+    meta.update(
+        {
+            "sha256": sha256_file(args.out),
+            "size": args.out.stat().st_size,
+            "source": source,
+            "source_sha256": sha256_file(source_path),
+            "built_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+    )
+    snapshot_meta_path(args.out).write_text(json.dumps(meta, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"Snapshot construit: {args.out} ({meta['size']} octets, source {source})")
+
+
+if __name__ == "__main__":
+    main()
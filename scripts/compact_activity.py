@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def cutoff_for(conn: sqlite3.Connection, keep_days: int) -> str:
+    # Arrondi au premier jour du mois: seuls des mois entiers passent dans user_activity_monthly,
+    # jamais un mois moitie resume, moitie brut (rebuild_user_rollups les additionne).
+    return str(
+        conn.execute("SELECT datetime('now', ?, 'start of month')", (f"-{keep_days} days",)).fetchone()[0]
+    )
+
+
+def plan(conn: sqlite3.Connection, cutoff: str) -> dict[str, Any]:
+    row = conn.execute(
+        """
+        SELECT COUNT(*), COALESCE(SUM(length(meta_json)), 0), MIN(created_at)
+        FROM user_activity
+        WHERE created_at < ?
+        """,
+        (cutoff,),
+    ).fetchone()
+    summaries = conn.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM user_activity
+            WHERE created_at < ?
+            GROUP BY user_id, strftime('%Y-%m', created_at), module, event_type
+        )
+        """,
+        (cutoff,),
+    ).fetchone()[0]
+    return {
+        "cutoff": cutoff,
+        "rows": int(row[0]),
+        "meta_bytes": int(row[1]),
+        "oldest": row[2],
+        "monthly_rows": int(summaries),
+        "kept_rows": int(conn.execute("SELECT COUNT(*) FROM user_activity WHERE created_at >= ?", (cutoff,)).fetchone()[0]),
+    }
+
+
+def compact(conn: sqlite3.Connection, cutoff: str) -> int:
+    # Connexion en autocommit: sans BEGIN explicite, l'INSERT et le DELETE seraient valides
+    # separement et un echec entre les deux compterait les evenements deux fois.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            """
+            INSERT INTO user_activity_monthly (
+                user_id, month, module, event_type, events, score_sum, total_sum, pct_sum, pct_count, best_pct
+            )
+            SELECT
+                user_id,
+                strftime('%Y-%m', created_at),
+                module,
+                event_type,
+                COUNT(*),
+                COALESCE(SUM(score), 0),
+                COALESCE(SUM(total), 0),
+                COALESCE(SUM(CASE WHEN total > 0 AND score IS NOT NULL THEN score * 100.0 / total END), 0),
+                COUNT(CASE WHEN total > 0 AND score IS NOT NULL THEN 1 END),
+                MAX(CASE WHEN total > 0 AND score IS NOT NULL THEN score * 100.0 / total END)
+            FROM user_activity
+            WHERE created_at < ?
+            GROUP BY user_id, strftime('%Y-%m', created_at), module, event_type
+            ON CONFLICT (user_id, month, module, event_type) DO UPDATE SET
+                events = events + excluded.events,
+                score_sum = score_sum + excluded.score_sum,
+                total_sum = total_sum + excluded.total_sum,
+                pct_sum = pct_sum + excluded.pct_sum,
+                pct_count = pct_count + excluded.pct_count,
+                best_pct = CASE
+                    WHEN best_pct IS NULL OR excluded.best_pct > best_pct THEN excluded.best_pct
+                    ELSE best_pct
+                END
+            """,
+            (cutoff,),
+        )
+        deleted = conn.execute("DELETE FROM user_activity WHERE created_at < ?", (cutoff,)).rowcount
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return int(deleted)
+
+
+def reclaim_space(conn: sqlite3.Connection) -> str:
+    if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) != AUTO_VACUUM_INCREMENTAL:
+        # Le mode incremental ne s'active qu'avec un VACUUM complet, une seule fois.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        message = "VACUUM complet (activation de auto_vacuum=INCREMENTAL)"
+    else:
+        free_pages = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+        conn.execute("PRAGMA incremental_vacuum")
+        message = f"incremental_vacuum ({free_pages} page(s) liberee(s))"
+    # En WAL, les pages reecrites restent dans le -wal tant qu'on ne checkpoint pas.
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return message
+
+
+def file_size(db_path: Path) -> int:
+    total = db_path.stat().st_size
+    wal = db_path.with_name(db_path.name + "-wal")
+    return total + (wal.stat().st_size if wal.exists() else 0)
+
+
+def benchmark(conn: sqlite3.Connection, db_path: Path, repeats: int = 20) -> dict[str, Any]:
+    users = [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM user_activity LIMIT 20")]
+    queries = {
+        "activite_recente": (
+            "SELECT module, event_type, score, total, meta_json, created_at FROM user_activity "
+            "WHERE user_id = ? ORDER BY id DESC LIMIT 8"
+        ),
+        "historique_utilisateur": (
+            "SELECT module, COUNT(*), AVG(score) FROM user_activity WHERE user_id = ? GROUP BY module"
+        ),
+    }
+    timings: dict[str, float] = {}
+    for name, sql in queries.items():
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for user_id in users or [0]:
+                conn.execute(sql, (user_id,)).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[name] = round(statistics.median(samples), 3)
+    return {
+        "taille_octets": file_size(db_path),
+        "lignes_user_activity": int(conn.execute("SELECT COUNT(*) FROM user_activity").fetchone()[0]),
+        "requetes_ms": timings,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compacte user_activity: agrege les anciens evenements par mois puis les supprime."
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(os.getenv("APP_DB_PATH", str(ROOT_DIR / "data" / "app.db"))),
+        help="Chemin vers la base SQLite.",
+    )
+    parser.add_argument(
+        "--keep-days",
+        type=int,
+        default=int(os.getenv("ACTIVITY_RETENTION_DAYS", "180")),
+        help="Nombre de jours d'evenements bruts conserves (au moins; arrondi au debut du mois).",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Affiche ce qui serait compacte, sans rien ecrire.")
+    parser.add_argument("--benchmark", action="store_true", help="Mesure taille et requetes avant/apres.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.db.exists():
+        raise FileNotFoundError(f"Base introuvable: {args.db}")
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        has_monthly = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_activity_monthly'"
+        ).fetchone()
+        if not has_monthly:
+            raise SystemExit("Table user_activity_monthly absente: lance l'application ou db.ensure_auth_tables().")
+
+        cutoff = cutoff_for(conn, max(0, args.keep_days))
+        report = plan(conn, cutoff)
+        print(f"Evenements anterieurs a {report['cutoff']}: {report['rows']} (plus ancien: {report['oldest']})")
+        print(f"- resumes mensuels produits: {report['monthly_rows']}")
+        print(f"- meta_json supprime: {report['meta_bytes']} octets")
+        print(f"- evenements conserves: {report['kept_rows']}")
+        if args.dry_run:
+            print("Dry-run: aucune modification.")
+            return
+
+        before = benchmark(conn, args.db) if args.benchmark else None
+        deleted = compact(conn, cutoff)
+        print(f"Compactage: {deleted} evenement(s) supprime(s).")
+        print(f"Espace: {reclaim_space(conn)}")
+        if before is not None:
+            after = benchmark(conn, args.db)
+            print(f"Taille: {before['taille_octets']} -> {after['taille_octets']} octets")
+            for name, value in before["requetes_ms"].items():
+                print(f"Requete {name}: {value} ms -> {after['requetes_ms'][name]} ms")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
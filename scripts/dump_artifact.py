@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import sqlite3
+from pathlib import Path
+from typing import IO, Collection, Iterable, Iterator
+
+
+CHUNK_SIZE = 1 << 20
+# Plafond d'une instruction SQL accumulee: un dump tronque ou corrompu ne doit pas remplir la memoire.
+MAX_STATEMENT_BYTES = 16 << 20
+# INSERT multi-lignes: moins d'instructions a rejouer, taille bornee pour rester en streaming.
+INSERT_BATCH_ROWS = 500
+INSERT_BATCH_BYTES = 256 << 10
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def compression_for(path: Path) -> str:
+    if path.suffix == ".gz":
+        return "gzip"
+    if path.suffix == ".xz":
+        return "lzma"
+    return "none"
+
+
+def manifest_path(path: Path) -> Path:
+    # Meme format que `sha256sum`: verifiable a la main avec `sha256sum -c`.
+    return path.with_name(path.name + ".sha256")
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(path: Path) -> str:
+    digest = sha256_file(path)
+    manifest_path(path).write_text(f"{digest}  {path.name}\n", encoding="utf-8")
+    return digest
+
+
+def read_manifest(path: Path) -> str | None:
+    manifest = manifest_path(path)
+    if not manifest.exists():
+        return None
+    parts = manifest.read_text(encoding="utf-8").split()
+    if len(parts) != 2 or parts[1] != path.name or len(parts[0]) != 64:
+        raise ArtifactError(f"Manifeste invalide: {manifest}")
+    return parts[0]
+
+
+def verify_artifact(path: Path) -> None:
+    """Verifie le SHA-256 de l'artefact avant toute restauration.
+
+    Le manifeste est obligatoire pour les dumps compresses; un dump SQL brut
+    (fourni via DB_SQL_DUMP_PATH) est accepte sans manifeste.
+    """
+    if not path.exists():
+        raise ArtifactError(f"Artefact introuvable: {path}")
+    expected = read_manifest(path)
+    if expected is None:
+        if compression_for(path) != "none":
+            raise ArtifactError(f"Manifeste absent: {manifest_path(path)}")
+        return
+    actual = sha256_file(path)
+    if actual != expected:
+        raise ArtifactError(f"Checksum invalide pour {path.name}: {actual} != {expected}")
+
+
+def compressed_writer(raw: IO[bytes], compression: str) -> IO[bytes]:
+    if compression == "gzip":
+        # mtime=0 et pas de nom de fichier: meme contenu -> memes octets.
+        return gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0, compresslevel=9)
+    if compression == "lzma":
+        return lzma.LZMAFile(raw, "wb", preset=6)
+    return raw
+
+
+def write_artifact(lines: Iterable[str], path: Path) -> str:
+    """Ecrit les lignes SQL (compressees selon l'extension) puis le manifeste; renvoie le SHA-256."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as raw:
+        with io.TextIOWrapper(compressed_writer(raw, compression_for(path)), encoding="utf-8", newline="\n") as out:
+            for line in lines:
+                out.write(line)
+                out.write("\n")
+    os.replace(tmp_path, path)
+    return write_manifest(path)
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def iter_table_rows(
+    conn: sqlite3.Connection,
+    table: str,
+    batch_rows: int = INSERT_BATCH_ROWS,
+    batch_bytes: int = INSERT_BATCH_BYTES,
+) -> Iterator[str]:
+    """Lignes des INSERT de la table, triees par cle primaire, une ligne de valeurs par ligne de texte."""
+    name = quote_identifier(table)
+    # table_xinfo: les colonnes generees (hidden 2/3) sont recalculees, pas exportees.
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_xinfo({name})") if row[6] == 0]
+    table_info = sorted(conn.execute(f"PRAGMA table_info({name})"), key=lambda row: row[5])
+    primary_key = [row[1] for row in table_info if row[5]]
+    order_by = ", ".join(quote_identifier(column) for column in primary_key) or "rowid"
+    # quote() de SQLite: meme rendu des valeurs (reels, blobs, NULL) que .dump, donc stable.
+    values = " || ',' || ".join(f"quote({quote_identifier(column)})" for column in columns)
+    header = f"INSERT INTO {name} ({', '.join(quote_identifier(column) for column in columns)}) VALUES"
+    cursor = conn.execute(f"SELECT {values} FROM {name} ORDER BY {order_by}")
+    batch: list[str] = []
+    size = 0
+    for (row,) in cursor:
+        batch.append(f"({row})")
+        size += len(row) + 3
+        if len(batch) >= batch_rows or size >= batch_bytes:
+            yield header
+            yield from (line + "," for line in batch[:-1])
+            yield batch[-1] + ";"
+            batch.clear()
+            size = 0
+    if batch:
+        yield header
+        yield from (line + "," for line in batch[:-1])
+        yield batch[-1] + ";"
+
+
+def iter_dump(
+    conn: sqlite3.Connection,
+    exclude: Collection[str] = (),
+    batch_rows: int = INSERT_BATCH_ROWS,
+) -> Iterator[str]:
+    """Dump SQL deterministe: tables par nom, lignes par cle primaire, puis index/triggers/vues par nom.
+
+    Meme contenu -> memes lignes, quel que soit l'ordre d'insertion ou l'historique du fichier.
+    """
+    objects = conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"
+    ).fetchall()
+    tables = [
+        (name, sql)
+        for kind, name, _, sql in objects
+        if kind == "table" and not name.startswith("sqlite_") and name not in exclude
+    ]
+    kept = {name for name, _ in tables}
+    yield "BEGIN TRANSACTION;"
+    for name, sql in tables:
+        yield f"{sql};"
+        yield from iter_table_rows(conn, name, batch_rows)
+    if any(kind == "table" and name == "sqlite_sequence" for kind, name, _, _ in objects):
+        sequences = [
+            (name, seq)
+            for name, seq in conn.execute("SELECT name, seq FROM sqlite_sequence ORDER BY name")
+            if name in kept
+        ]
+        if sequences:
+            yield 'DELETE FROM "sqlite_sequence";'
+            yield 'INSERT INTO "sqlite_sequence" ("name", "seq") VALUES'
+            rendered = [f"('{name.replace(chr(39), chr(39) * 2)}', {int(seq)})" for name, seq in sequences]
+            yield from (line + "," for line in rendered[:-1])
+            yield rendered[-1] + ";"
+    for kind in ("index", "trigger", "view"):
+        for object_kind, _, table, sql in objects:
+            if object_kind == kind and (table in kept or kind == "view"):
+                yield f"{sql};"
+    yield "COMMIT;"
+
+
+def open_artifact(path: Path) -> IO[str]:
+    compression = compression_for(path)
+    if compression == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if compression == "lzma":
+        return lzma.open(path, "rt", encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def iter_statements(stream: IO[str]) -> Iterator[str]:
+    """Decoupe le flux en instructions SQL completes, ligne par ligne."""
+    pending: list[str] = []
+    size = 0
+    for line in stream:
+        pending.append(line)
+        size += len(line)
+        if size > MAX_STATEMENT_BYTES:
+            raise ArtifactError("Instruction SQL trop longue: dump corrompu ?")
+        # complete_statement relit toute l'instruction: seulement sur une fin de ligne en ';'
+        # (sinon quadratique sur les INSERT multi-lignes).
+        if line.rstrip().endswith(";"):
+            statement = "".join(pending)
+            if sqlite3.complete_statement(statement):
+                yield statement
+                pending.clear()
+                size = 0
+    if "".join(pending).strip():
+        raise ArtifactError("Dump tronque: derniere instruction incomplete.")
+
+
+def restore_artifact(conn: sqlite3.Connection, path: Path) -> int:
+    """Rejoue le dump en streaming; la memoire reste bornee par la plus longue instruction."""
+    conn.isolation_level = None
+    count = 0
+    try:
+        with open_artifact(path) as stream:
+            for statement in iter_statements(stream):
+                conn.execute(statement)
+                count += 1
+    except (EOFError, OSError, lzma.LZMAError, UnicodeDecodeError) as err:
+        raise ArtifactError(f"Decompression impossible ({path.name}): {err}") from err
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+        raise ArtifactError("Dump sans COMMIT final.")
+    return count
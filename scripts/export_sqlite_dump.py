@@ -5,10 +5,18 @@ import os
 import sqlite3
 from pathlib import Path
 
+from bootstrap_db import CONTENT_TABLES
+from dump_artifact import INSERT_BATCH_ROWS, iter_dump, manifest_path, write_artifact
+
 
 def parse_args() -> argparse.Namespace:
     root = Path(__file__).resolve().parents[1]
-    parser = argparse.ArgumentParser(description="Exporte une base SQLite en dump SQL.")
+    parser = argparse.ArgumentParser(
+        description=(
+            "Exporte une base SQLite en dump SQL deterministe (tri par cle primaire, INSERT groupes), "
+            "compresse a la volee (.gz/.xz, ou .sql brut) avec manifeste SHA-256."
+        )
+    )
     parser.add_argument(
         "--db",
         type=Path,
@@ -18,9 +26,16 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--out",
         type=Path,
-        default=root / "bootstrap" / "bootstrap_dump.sql",
-        help="Chemin du fichier SQL genere.",
+        default=root / "bootstrap" / "bootstrap_dump.sql.gz",
+        help="Chemin du dump genere; l'extension choisit la compression.",
     )
+    parser.add_argument(
+        "--content-only",
+        action="store_true",
+        help="N'exporte que les tables de contenu (ni comptes, ni activite, ni statistiques).",
+    )
+    parser.add_argument("--exclude", action="append", default=[], help="Table a ignorer (repetable).")
+    parser.add_argument("--batch-rows", type=int, default=INSERT_BATCH_ROWS, help="Lignes par INSERT.")
     return parser.parse_args()
 
 
@@ -28,13 +43,18 @@ def main() -> None:
     args = parse_args()
     if not args.db.exists():
         raise FileNotFoundError(f"Base introuvable: {args.db}")
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-
-    with sqlite3.connect(args.db) as conn:
-        dump_sql = "\n".join(conn.iterdump()) + "\n"
 
-    args.out.write_text(dump_sql, encoding="utf-8")
-    print(f"Dump exporte: {args.out}")
+    exclude = set(args.exclude)
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        if args.content_only:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            exclude |= tables - set(CONTENT_TABLES)
+        digest = write_artifact(iter_dump(conn, exclude, max(1, args.batch_rows)), args.out)
+    finally:
+        conn.close()
+
+    print(f"Dump exporte: {args.out} (sha256 {digest}, manifeste {manifest_path(args.out)})")
 
 
 if __name__ == "__main__":
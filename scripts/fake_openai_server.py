@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+PROFILS_CHARGE = ("json", "fenced", "invalide", "long", "mixte")
+
+EVALUATION_TYPE: dict[str, Any] = {
+    "note_globale_sur_20": 13,
+    "criteres": {
+        "coherence": {"note_sur_4": 3, "commentaire": "Plan clair, transitions a renforcer."},
+        "grammaire": {"note_sur_4": 2.5, "commentaire": "Accords du participe a revoir."},
+        "lexique": {"note_sur_4": 3, "commentaire": "Lexique adapte au sujet."},
+        "orthographe": {"note_sur_4": 2, "commentaire": "Accents souvent oublies."},
+        "registre": {"note_sur_4": 3, "commentaire": "Registre globalement soutenu."},
+    },
+    "points_forts": ["Idees bien organisees", "Connecteurs varies"],
+    "erreurs_prioritaires": [
+        {
+            "erreur": "ils a decide",
+            "correction": "ils ont decide",
+            "explication": "Accord du verbe avoir avec un sujet pluriel.",
+        }
+    ],
+    "version_corrigee": "Texte corrige simule par le serveur local.",
+    "conseil_methode": "Relis chaque phrase en verifiant sujet, verbe et accents.",
+}
+
+
+@dataclass
+class ProfilServeur:
+    latence_ms: float = 800.0
+    gigue_ms: float = 200.0
+    taux_erreur: float = 0.0
+    codes_erreur: tuple[int, ...] = (429, 500)
+    charge: str = "json"
+    delai_flux_ms: float = 20.0
+    taille_morceau: int = 24
+
+
+def _estimer_tokens(texte: str) -> int:
+    return max(1, len(texte) // 4)
+
+
+def _texte_entree(corps: dict[str, Any]) -> str:
+    entree = corps.get("input", "")
+    if isinstance(entree, str):
+        return entree
+    morceaux: list[str] = []
+    for message in entree if isinstance(entree, list) else []:
+        contenu = message.get("content", "") if isinstance(message, dict) else ""
+        if isinstance(contenu, str):
+            morceaux.append(contenu)
+        elif isinstance(contenu, list):
+            morceaux.extend(str(part.get("text", "")) for part in contenu if isinstance(part, dict))
+    return "\n".join(morceaux)
+
+
+def generer_sortie(charge: str, rng: random.Random) -> str:
+    if charge == "mixte":
+        charge = rng.choices(["json", "fenced", "invalide", "long"], weights=[70, 15, 10, 5])[0]
+    evaluation = dict(EVALUATION_TYPE)
+    evaluation["note_globale_sur_20"] = rng.randint(6, 18)
+    if charge == "invalide":
+        return "Je ne peux pas fournir de JSON pour ce texte, mais il est globalement correct."
+    if charge == "long":
+        evaluation["version_corrigee"] = " ".join(["Phrase corrigee et developpee."] * 400)
+    texte = json.dumps(evaluation, ensure_ascii=False, indent=2)
+    if charge == "fenced":
+        return f"```json\n{texte}\n```"
+    return texte
+
+
+def construire_reponse(
+    modele: str, sortie: str, tokens_entree: int, statut: str = "completed"
+) -> dict[str, Any]:
+    tokens_sortie = _estimer_tokens(sortie)
+    contenu = [{"type": "output_text", "text": sortie, "annotations": []}] if sortie else []
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": statut,
+        "model": modele,
+        "output": [
+            {
+                "id": f"msg_{uuid.uuid4().hex}",
+                "type": "message",
+                "status": statut,
+                "role": "assistant",
+                "content": contenu,
+            }
+        ]
+        if sortie
+        else [],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": tokens_entree,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": tokens_sortie,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": tokens_entree + tokens_sortie,
+        },
+    }
+
+
+class GestionnaireResponses(BaseHTTPRequestHandler):
+    server: "ServeurOpenAILocal"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbeux:
+            super().log_message(format, *args)
+
+    def _envoyer_json(self, code: int, corps: dict[str, Any], entetes: dict[str, str] | None = None) -> None:
+        donnees = json.dumps(corps, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(donnees)))
+        for cle, valeur in (entetes or {}).items():
+            self.send_header(cle, valeur)
+        self.end_headers()
+        self.wfile.write(donnees)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") in ("", "/health"):
+            self._envoyer_json(200, {"status": "ok", "requetes": self.server.compteur})
+            return
+        self._envoyer_json(404, {"error": {"message": "Route inconnue.", "type": "invalid_request_error"}})
+
+    def do_POST(self) -> None:
+        longueur = int(self.headers.get("Content-Length", "0") or 0)
+        brut = self.rfile.read(longueur) if longueur else b"{}"
+        if not self.path.rstrip("/").endswith("/responses"):
+            self._envoyer_json(404, {"error": {"message": "Route inconnue.", "type": "invalid_request_error"}})
+            return
+        try:
+            corps = json.loads(brut.decode("utf-8"))
+        except json.JSONDecodeError:
+            self._envoyer_json(400, {"error": {"message": "JSON invalide.", "type": "invalid_request_error"}})
+            return
+
+        profil = self.server.profil
+        rng = self.server.tirer_rng()
+        latence = max(0.0, rng.gauss(profil.latence_ms, profil.gigue_ms)) / 1000.0
+
+        if profil.taux_erreur > 0 and rng.random() < profil.taux_erreur:
+            time.sleep(latence / 4)
+            code = rng.choice(profil.codes_erreur)
+            type_erreur = "rate_limit_exceeded" if code == 429 else "server_error"
+            self._envoyer_json(
+                code,
+                {"error": {"message": f"Erreur simulee ({code}).", "type": type_erreur, "code": type_erreur}},
+                {"retry-after-ms": "50"} if code == 429 else None,
+            )
+            return
+
+        modele = str(corps.get("model", "gpt-5-mini"))
+        sortie = generer_sortie(profil.charge, rng)
+        tokens_entree = _estimer_tokens(_texte_entree(corps))
+
+        if corps.get("stream"):
+            self._repondre_en_flux(modele, sortie, tokens_entree, latence)
+            return
+
+        time.sleep(latence)
+        self._envoyer_json(200, construire_reponse(modele, sortie, tokens_entree))
+
+    def _repondre_en_flux(self, modele: str, sortie: str, tokens_entree: int, latence: float) -> None:
+        profil = self.server.profil
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sequence = 0
+
+        def evenement(type_evt: str, donnees: dict[str, Any]) -> None:
+            nonlocal sequence
+            donnees = {"type": type_evt, "sequence_number": sequence, **donnees}
+            sequence += 1
+            ligne = f"event: {type_evt}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+            self.wfile.write(ligne.encode("utf-8"))
+            self.wfile.flush()
+
+        finale = construire_reponse(modele, sortie, tokens_entree)
+        en_cours = dict(finale, status="in_progress", output=[])
+        item_id = finale["output"][0]["id"] if finale["output"] else f"msg_{uuid.uuid4().hex}"
+
+        message = {"id": item_id, "type": "message", "status": "in_progress", "role": "assistant", "content": []}
+        partie = {"type": "output_text", "text": "", "annotations": []}
+
+        evenement("response.created", {"response": en_cours})
+        time.sleep(latence)
+        evenement("response.output_item.added", {"output_index": 0, "item": message})
+        evenement(
+            "response.content_part.added",
+            {"item_id": item_id, "output_index": 0, "content_index": 0, "part": partie},
+        )
+        pas = max(1, profil.taille_morceau)
+        for debut in range(0, len(sortie), pas):
+            evenement(
+                "response.output_text.delta",
+                {
+                    "item_id": item_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": sortie[debut : debut + pas],
+                    "logprobs": [],
+                },
+            )
+            if profil.delai_flux_ms > 0:
+                time.sleep(profil.delai_flux_ms / 1000.0)
+        evenement(
+            "response.output_text.done",
+            {"item_id": item_id, "output_index": 0, "content_index": 0, "text": sortie, "logprobs": []},
+        )
+        evenement(
+            "response.content_part.done",
+            {"item_id": item_id, "output_index": 0, "content_index": 0, "part": dict(partie, text=sortie)},
+        )
+        if finale["output"]:
+            evenement("response.output_item.done", {"output_index": 0, "item": finale["output"][0]})
+        evenement("response.completed", {"response": finale})
+
+
+class ServeurOpenAILocal(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, adresse: tuple[str, int], profil: ProfilServeur, graine: int | None = None, verbeux: bool = False):
+        super().__init__(adresse, GestionnaireResponses)
+        self.profil = profil
+        self.verbeux = verbeux
+        self.compteur = 0
+        self._graine = graine
+        self._verrou = threading.Lock()
+
+    def tirer_rng(self) -> random.Random:
+        with self._verrou:
+            self.compteur += 1
+            if self._graine is None:
+                return random.Random()
+            return random.Random(self._graine * 1_000_003 + self.compteur)
+
+    @property
+    def base_url(self) -> str:
+        hote, port = self.server_address[:2]
+        return f"http://{hote}:{port}/v1"
+
+
+def demarrer_en_arriere_plan(
+    profil: ProfilServeur, hote: str = "127.0.0.1", port: int = 0, graine: int | None = None
+) -> ServeurOpenAILocal:
+    serveur = ServeurOpenAILocal((hote, port), profil, graine=graine)
+    thread = threading.Thread(target=serveur.serve_forever, name="fake-openai", daemon=True)
+    thread.start()
+    return serveur
+
+
+def ajouter_options_profil(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latence-ms", type=float, default=800.0, help="Latence moyenne simulee.")
+    parser.add_argument("--gigue-ms", type=float, default=200.0, help="Ecart-type de la latence.")
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="Proportion de reponses en erreur (0-1).")
+    parser.add_argument(
+        "--codes-erreur",
+        default="429,500",
+        help="Codes HTTP tires au hasard pour les erreurs simulees (separes par des virgules).",
+    )
+    parser.add_argument("--charge", choices=PROFILS_CHARGE, default="json", help="Forme de la sortie du modele.")
+    parser.add_argument("--delai-flux-ms", type=float, default=20.0, help="Delai entre deux morceaux en streaming.")
+    parser.add_argument("--graine", type=int, default=None, help="Graine aleatoire pour des runs reproductibles.")
+
+
+def profil_depuis_args(args: argparse.Namespace) -> ProfilServeur:
+    return ProfilServeur(
+        latence_ms=args.latence_ms,
+        gigue_ms=args.gigue_ms,
+        taux_erreur=args.taux_erreur,
+        codes_erreur=tuple(int(code) for code in str(args.codes_erreur).split(",") if code.strip()),
+        charge=args.charge,
+        delai_flux_ms=args.delai_flux_ms,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serveur local compatible avec l'API Responses d'OpenAI (tests et benchmarks)."
+    )
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--verbeux", action="store_true", help="Journalise chaque requete.")
+    ajouter_options_profil(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    serveur = ServeurOpenAILocal((args.hote, args.port), profil_depuis_args(args), args.graine, args.verbeux)
+    print(f"Serveur OpenAI local: {serveur.base_url}")
+    print(f"Utilisation: OPENAI_BASE_URL={serveur.base_url} OPENAI_API_KEY=test python3 -m streamlit run app.py")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+import db
+from correction import CONSIGNE_CORRECTEUR, corriger_redaction_detaillee
+from limiteur import estimer_tokens, limiteur_partage
+
+
+CRITERES = ["coherence", "grammaire", "lexique", "orthographe", "registre"]
+NOM_FICHIER = re.compile(r"^(\d+)[_-](.+)$")
+
+
+def load_submissions(source: Path) -> list[dict[str, Any]]:
+    if source.is_file():
+        with source.open("r", encoding="utf-8", newline="") as f:
+            return [
+                {"prompt_id": int(row["prompt_id"]), "student": row["student"].strip(), "text": row["text"]}
+                for row in csv.DictReader(f)
+                if row.get("text", "").strip()
+            ]
+
+    submissions: list[dict[str, Any]] = []
+    for path in sorted(source.rglob("*.txt")):
+        if path.parent != source and path.parent.name.isdigit():
+            prompt_id, student = int(path.parent.name), path.stem
+        else:
+            match = NOM_FICHIER.match(path.stem)
+            if not match:
+                print(f"[ignore] Nom de fichier sans id de sujet: {path}")
+                continue
+            prompt_id, student = int(match.group(1)), match.group(2)
+        text = path.read_text(encoding="utf-8").strip()
+        if text:
+            submissions.append({"prompt_id": prompt_id, "student": student, "text": text})
+    return submissions
+
+
+def content_hash(modele: str, prompt: dict[str, Any], text: str) -> str:
+    digest = hashlib.sha256()
+    for part in (CONSIGNE_CORRECTEUR, modele, prompt["tache_tcf"], prompt["consigne"], text.strip()):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def grade_one(api_key: str, modele: str, prompt: dict[str, Any], text: str, batch: str) -> dict[str, Any]:
+    try:
+        with limiteur_partage().reserver(
+            f"batch:{batch}", estimer_tokens(prompt["consigne"], text), attente_max_s=600
+        ) as reservation:
+            evaluation, brut, usage = corriger_redaction_detaillee(
+                api_key, modele, prompt["tache_tcf"], prompt["consigne"], text.strip()
+            )
+            reservation.confirmer(usage["total_tokens"] or int(reservation.tokens_estimes))
+    except Exception as err:
+        return {"statut": "erreur", "erreur": f"{type(err).__name__}: {err}"}
+    if not evaluation:
+        return {"statut": "json_invalide", "brut": brut, "tokens": usage["total_tokens"]}
+    return {
+        "statut": "ok",
+        "evaluation": evaluation,
+        "brut": brut,
+        "tokens": usage["total_tokens"],
+    }
+
+
+def save_result(
+    conn: sqlite3.Connection,
+    batch: str,
+    submission: dict[str, Any],
+    digest: str,
+    modele: str,
+    result: dict[str, Any],
+    from_cache: bool,
+) -> None:
+    evaluation = result.get("evaluation")
+    note = evaluation.get("note_globale_sur_20") if isinstance(evaluation, dict) else None
+    conn.execute(
+        """
+        INSERT INTO writing_grades (
+            batch, prompt_id, student, content_hash, modele, statut,
+            note_sur_20, evaluation_json, brut, erreur, tokens, from_cache
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (batch, prompt_id, student) DO UPDATE SET
+            content_hash = excluded.content_hash,
+            modele = excluded.modele,
+            statut = excluded.statut,
+            note_sur_20 = excluded.note_sur_20,
+            evaluation_json = excluded.evaluation_json,
+            brut = excluded.brut,
+            erreur = excluded.erreur,
+            tokens = excluded.tokens,
+            from_cache = excluded.from_cache,
+            created_at = CURRENT_TIMESTAMP
+        """,
+        (
+            batch,
+            submission["prompt_id"],
+            submission["student"],
+            digest,
+            modele,
+            result["statut"],
+            float(note) if isinstance(note, (int, float)) else None,
+            json.dumps(evaluation, ensure_ascii=False) if evaluation is not None else None,
+            result.get("brut"),
+            result.get("erreur"),
+            int(result.get("tokens", 0) or 0),
+            1 if from_cache else 0,
+        ),
+    )
+    conn.commit()
+
+
+def find_cached(conn: sqlite3.Connection, batch: str, submission: dict[str, Any], digest: str) -> dict[str, Any] | None:
+    row = conn.execute(
+        "SELECT content_hash, statut FROM writing_grades WHERE batch = ? AND prompt_id = ? AND student = ?",
+        (batch, submission["prompt_id"], submission["student"]),
+    ).fetchone()
+    if row and row[0] == digest and row[1] == "ok":
+        return {"statut": "deja_fait"}
+
+    row = conn.execute(
+        """
+        SELECT evaluation_json, brut FROM writing_grades
+        WHERE content_hash = ? AND statut = 'ok'
+        ORDER BY id DESC LIMIT 1
+        """,
+        (digest,),
+    ).fetchone()
+    if row:
+        return {"statut": "ok", "evaluation": json.loads(row[0]), "brut": row[1], "tokens": 0}
+    return None
+
+
+def write_report(conn: sqlite3.Connection, batch: str, out_path: Path) -> int:
+    rows = conn.execute(
+        """
+        SELECT prompt_id, student, modele, statut, note_sur_20, evaluation_json, erreur, from_cache
+        FROM writing_grades
+        WHERE batch = ?
+        ORDER BY prompt_id, student
+        """,
+        (batch,),
+    ).fetchall()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["prompt_id", "student", "modele", "statut", "note_sur_20", *CRITERES, "from_cache", "erreur"]
+        )
+        for prompt_id, student, modele, statut, note, evaluation_json, erreur, from_cache in rows:
+            criteres = (json.loads(evaluation_json) or {}).get("criteres", {}) if evaluation_json else {}
+            notes = []
+            for cle in CRITERES:
+                valeur = criteres.get(cle) if isinstance(criteres, dict) else None
+                if isinstance(valeur, dict):
+                    valeur = valeur.get("note_sur_4")
+                notes.append(valeur if isinstance(valeur, (int, float, str)) else "")
+            writer.writerow([prompt_id, student, modele, statut, note, *notes, from_cache, erreur or ""])
+    return len(rows)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Corrige un lot de redactions (dossier ou CSV) via OpenAI.")
+    parser.add_argument(
+        "source",
+        type=Path,
+        help=(
+            "CSV (colonnes prompt_id, student, text) ou dossier de .txt "
+            "nommes <prompt_id>_<eleve>.txt ou ranges dans <prompt_id>/<eleve>.txt."
+        ),
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(os.getenv("APP_DB_PATH", str(ROOT_DIR / "data" / "app.db"))),
+        help="Base SQLite contenant les sujets et recevant la table writing_grades.",
+    )
+    parser.add_argument("--batch", default=None, help="Nom du lot (par defaut: nom de la source).")
+    parser.add_argument("--modele", default=os.getenv("OPENAI_MODEL", "gpt-5-mini"))
+    parser.add_argument("--workers", type=int, default=4, help="Corrections en parallele.")
+    parser.add_argument("--out", type=Path, default=None, help="Rapport CSV (par defaut: <lot>_notes.csv).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        raise SystemExit("OPENAI_API_KEY manquant.")
+    batch = args.batch or args.source.stem
+    submissions = load_submissions(args.source)
+    if not submissions:
+        raise SystemExit(f"Aucune copie trouvee dans {args.source}")
+
+    conn = sqlite3.connect(args.db)
+    try:
+        # writing_grades vient des migrations (0005), comme le reste du schema de app.db.
+        db.apply_migrations(conn)
+        prompts = {
+            row[0]: {"tache_tcf": row[1], "consigne": row[2]}
+            for row in conn.execute("SELECT id, tache_tcf, consigne FROM writing_prompts")
+        }
+
+        todo: dict[str, list[dict[str, Any]]] = {}
+        cached = skipped = 0
+        for submission in submissions:
+            prompt = prompts.get(submission["prompt_id"])
+            if prompt is None:
+                print(f"[ignore] Sujet {submission['prompt_id']} introuvable ({submission['student']}).")
+                continue
+            digest = content_hash(args.modele, prompt, submission["text"])
+            hit = find_cached(conn, batch, submission, digest)
+            if hit and hit["statut"] == "deja_fait":
+                skipped += 1
+                continue
+            if hit:
+                save_result(conn, batch, submission, digest, args.modele, hit, from_cache=True)
+                cached += 1
+                continue
+            # Copies identiques (meme sujet, meme texte): une seule correction.
+            todo.setdefault(digest, []).append(submission)
+
+        print(
+            f"Lot '{batch}': {len(submissions)} copies, {skipped} deja traitees, "
+            f"{cached} depuis le cache, {len(todo)} a corriger."
+        )
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {
+                pool.submit(
+                    grade_one, api_key, args.modele, prompts[group[0]["prompt_id"]], group[0]["text"], batch
+                ): digest
+                for digest, group in todo.items()
+            }
+            for future in as_completed(futures):
+                digest = futures[future]
+                result = future.result()
+                done += 1
+                # Point de reprise: chaque copie est enregistree des qu'elle est corrigee.
+                for rang, submission in enumerate(todo[digest]):
+                    save_result(conn, batch, submission, digest, args.modele, result, from_cache=rang > 0)
+                    print(f"[{done}/{len(todo)}] {submission['student']} (sujet {submission['prompt_id']}): {result['statut']}")
+
+        out_path = args.out or Path(f"{batch}_notes.csv")
+        total = write_report(conn, batch, out_path)
+    finally:
+        conn.close()
+    print(f"Rapport CSV: {out_path} ({total} lignes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,50 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import sqlite3
+import sys
 from pathlib import Path
 from typing import Any
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+import db
+from dump_artifact import sha256_file
+
 
 PERSONNES = ["je", "tu", "il/elle", "nous", "vous", "ils/elles"]
+# Sections du pack dans l'ordre d'import: (section, tables alimentees, sections dont elle depend).
+# Une section est reecrite si son empreinte change ou si une section parente est reecrite
+# (lessons -> categories en ON DELETE CASCADE, exercises.lesson_id resolu depuis lessons).
+SECTIONS: tuple[tuple[str, tuple[str, ...], tuple[str, ...]], ...] = (
+    ("categories", ("categories",), ()),
+    ("lessons", ("lessons",), ("categories",)),
+    ("vocabulary", ("vocabulary",), ()),
+    ("verb_conjugations", ("verb_conjugations",), ()),
+    ("exercises", ("exercises",), ("lessons",)),
+    ("writing_prompts", ("writing_prompts",), ()),
+    ("reading_passages", ("reading_passages", "reading_questions"), ()),
+)
+# Cle naturelle de chaque table: une ligne reecrite qui garde sa cle garde son id, donc les
+# references utilisateurs (vocab_reviews, answer_events, item_stats) restent valides.
+NATURAL_KEYS: dict[str, tuple[str, ...]] = {
+    "categories": ("slug",),
+    "lessons": ("category_slug", "titre"),
+    "vocabulary": ("mot", "niveau"),
+    "verb_conjugations": ("infinitif", "temps", "personne"),
+    "exercises": ("type", "question"),
+    "writing_prompts": ("titre",),
+    "reading_passages": ("titre",),
+    # passage_id est lui-meme conserve via le titre du passage.
+    "reading_questions": ("passage_id", "question"),
+}
+
+# table -> cle naturelle -> ids existants (plusieurs si la cle est dupliquee), par id croissant.
+ExistingIds = dict[str, dict[tuple[Any, ...], list[int]]]
 
 
 def read_json(path: Path) -> dict[str, Any]:
@@ -24,39 +60,85 @@ def apply_schema(conn: sqlite3.Connection, schema_path: Path) -> None:
     conn.executescript(schema_sql)
 
 
-def clear_tables(conn: sqlite3.Connection) -> None:
+def existing_ids(conn: sqlite3.Connection, tables: list[str]) -> ExistingIds:
+    ids: ExistingIds = {}
+    for table in tables:
+        columns = ", ".join(NATURAL_KEYS[table])
+        by_key: dict[tuple[Any, ...], list[int]] = {}
+        for *key, row_id in conn.execute(f"SELECT {columns}, id FROM {table} ORDER BY id"):
+            by_key.setdefault(tuple(key), []).append(int(row_id))
+        ids[table] = by_key
+    return ids
+
+
+def reuse_id(ids: ExistingIds, table: str, *key: Any) -> int | None:
+    """Id de la ligne existante de meme cle naturelle; None pour une ligne nouvelle."""
+    candidates = ids.get(table, {}).get(key)
+    return candidates.pop(0) if candidates else None
+
+
+def clear_tables(conn: sqlite3.Connection, tables: list[str]) -> None:
     conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("DELETE FROM reading_questions")
-    conn.execute("DELETE FROM reading_passages")
-    conn.execute("DELETE FROM writing_prompts")
-    conn.execute("DELETE FROM exercises")
-    conn.execute("DELETE FROM verb_conjugations")
-    conn.execute("DELETE FROM vocabulary")
-    conn.execute("DELETE FROM lessons")
-    conn.execute("DELETE FROM categories")
+    # sqlite_sequence n'est pas remis a zero: une ligne nouvelle prend un id jamais attribue,
+    # l'id d'une ligne supprimee n'est pas reutilise par un autre contenu.
+    for table in reversed(tables):
+        conn.execute(f"DELETE FROM {table}")
+
+
+def section_sha256(value: Any) -> str:
+    digest = hashlib.sha256()
+    # JSON canonique encode par morceaux: l'empreinte ne depend ni de l'ordre des cles ni de la mise en forme.
+    encoder = json.JSONEncoder(sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    for chunk in encoder.iterencode(value):
+        digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def recorded_sections(conn: sqlite3.Connection) -> dict[str, str]:
+    meta = db.get_content_meta(conn)
+    # Empreintes fiables seulement si le contenu en place vient d'un pack (un dump les perime).
+    if meta is None or meta["source"] != "pack":
+        return {}
+    try:
+        return {section: sha for section, sha in conn.execute("SELECT section, sha256 FROM content_sections")}
+    except sqlite3.OperationalError:
+        return {}
+
+
+def pending_sections(hashes: dict[str, str], recorded: dict[str, str]) -> list[str]:
+    pending: list[str] = []
+    for section, _, parents in SECTIONS:
+        if recorded.get(section) != hashes[section] or any(parent in pending for parent in parents):
+            pending.append(section)
+    return pending
 
 
-def insert_categories(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+def insert_categories(conn: sqlite3.Connection, rows: list[dict[str, Any]], ids: ExistingIds) -> None:
     for row in rows:
         conn.execute(
             """
-            INSERT INTO categories (slug, nom, description)
-            VALUES (?, ?, ?)
+            INSERT INTO categories (id, slug, nom, description)
+            VALUES (?, ?, ?, ?)
             """,
-            (row["slug"], row["nom"], row["description"]),
+            (reuse_id(ids, "categories", row["slug"]), row["slug"], row["nom"], row["description"]),
         )
 
 
-def insert_lessons(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> dict[tuple[str, str], int]:
+def insert_lessons(
+    conn: sqlite3.Connection,
+    rows: list[dict[str, Any]],
+    ids: ExistingIds,
+) -> dict[tuple[str, str], int]:
     mapping: dict[tuple[str, str], int] = {}
     for row in rows:
         tags_json = json.dumps(row.get("tags", []), ensure_ascii=False)
         cur = conn.execute(
             """
-            INSERT INTO lessons (category_slug, titre, niveau, resume, contenu_markdown, tags_json)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO lessons (id, category_slug, titre, niveau, resume, contenu_markdown, tags_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
             (
+                reuse_id(ids, "lessons", row["category_slug"], row["titre"]),
                 row["category_slug"],
                 row["titre"],
                 row["niveau"],
@@ -70,14 +152,15 @@ def insert_lessons(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> dict
     return mapping
 
 
-def insert_vocabulary(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+def insert_vocabulary(conn: sqlite3.Connection, rows: list[dict[str, Any]], ids: ExistingIds) -> None:
     for row in rows:
         conn.execute(
             """
-            INSERT INTO vocabulary (mot, definition_fr, traduction_en, exemple_fr, niveau, theme)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO vocabulary (id, mot, definition_fr, traduction_en, exemple_fr, niveau, theme)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
             (
+                reuse_id(ids, "vocabulary", row["mot"], row["niveau"]),
                 row["mot"],
                 row["definition_fr"],
                 row["traduction_en"],
@@ -92,7 +175,7 @@ def _example_for_conjugation(infinitif: str, temps: str, personne: str, forme: s
     return f"{personne} {forme} ce verbe ({infinitif}) au {temps}."
 
 
-def insert_conjugations(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+def insert_conjugations(conn: sqlite3.Connection, rows: list[dict[str, Any]], ids: ExistingIds) -> None:
     for row in rows:
         infinitif = row["infinitif"]
         temps = row["temps"]
@@ -107,10 +190,18 @@ def insert_conjugations(conn: sqlite3.Connection, rows: list[dict[str, Any]]) ->
                 exemple = _example_for_conjugation(infinitif, temps, personne, forme)
                 conn.execute(
                     """
-                    INSERT INTO verb_conjugations (infinitif, temps, personne, forme, exemple_fr, niveau)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO verb_conjugations (id, infinitif, temps, personne, forme, exemple_fr, niveau)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (infinitif, temps, personne, forme, exemple, niveau),
+                    (
+                        reuse_id(ids, "verb_conjugations", infinitif, temps, personne),
+                        infinitif,
+                        temps,
+                        personne,
+                        forme,
+                        exemple,
+                        niveau,
+                    ),
                 )
             continue
 
@@ -123,10 +214,18 @@ def insert_conjugations(conn: sqlite3.Connection, rows: list[dict[str, Any]]) ->
                 )
                 conn.execute(
                     """
-                    INSERT INTO verb_conjugations (infinitif, temps, personne, forme, exemple_fr, niveau)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO verb_conjugations (id, infinitif, temps, personne, forme, exemple_fr, niveau)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (infinitif, temps, personne, forme, exemple, niveau),
+                    (
+                        reuse_id(ids, "verb_conjugations", infinitif, temps, personne),
+                        infinitif,
+                        temps,
+                        personne,
+                        forme,
+                        exemple,
+                        niveau,
+                    ),
                 )
             continue
 
@@ -137,6 +236,7 @@ def insert_exercises(
     conn: sqlite3.Connection,
     rows: list[dict[str, Any]],
     lesson_lookup: dict[tuple[str, str], int],
+    ids: ExistingIds,
 ) -> None:
     for row in rows:
         lesson_id = None
@@ -146,10 +246,13 @@ def insert_exercises(
         options_json = json.dumps(row["options"], ensure_ascii=False)
         conn.execute(
             """
-            INSERT INTO exercises (type, theme, niveau, question, options_json, answer_index, explication, lesson_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO exercises (
+                id, type, theme, niveau, question, options_json, answer_index, explication, lesson_id
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
+                reuse_id(ids, "exercises", row["type"], row["question"]),
                 row["type"],
                 row["theme"],
                 row["niveau"],
@@ -162,14 +265,15 @@ def insert_exercises(
         )
 
 
-def insert_writing_prompts(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+def insert_writing_prompts(conn: sqlite3.Connection, rows: list[dict[str, Any]], ids: ExistingIds) -> None:
     for row in rows:
         conn.execute(
             """
-            INSERT INTO writing_prompts (titre, tache_tcf, niveau, consigne, min_mots, max_mots)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO writing_prompts (id, titre, tache_tcf, niveau, consigne, min_mots, max_mots)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
             (
+                reuse_id(ids, "writing_prompts", row["titre"]),
                 row["titre"],
                 row["tache_tcf"],
                 row["niveau"],
@@ -180,14 +284,15 @@ def insert_writing_prompts(conn: sqlite3.Connection, rows: list[dict[str, Any]])
         )
 
 
-def insert_reading_passages(conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+def insert_reading_passages(conn: sqlite3.Connection, rows: list[dict[str, Any]], ids: ExistingIds) -> None:
     for passage in rows:
         cur = conn.execute(
             """
-            INSERT INTO reading_passages (titre, niveau, type_document, contexte, duree_recommandee_min, texte)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO reading_passages (id, titre, niveau, type_document, contexte, duree_recommandee_min, texte)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
             (
+                reuse_id(ids, "reading_passages", passage["titre"]),
                 passage["titre"],
                 passage["niveau"],
                 passage["type_document"],
@@ -204,12 +309,13 @@ def insert_reading_passages(conn: sqlite3.Connection, rows: list[dict[str, Any]]
             conn.execute(
                 """
                 INSERT INTO reading_questions (
-                    passage_id, ordre, niveau, difficulte, competence,
+                    id, passage_id, ordre, niveau, difficulte, competence,
                     question, options_json, answer_index, explication
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
+                    reuse_id(ids, "reading_questions", passage_id, question["question"]),
                     passage_id,
                     ordre,
                     question["niveau"],
@@ -233,26 +339,83 @@ def import_pack(
     schema_path: Path,
     reset_schema: bool,
     replace_data: bool,
-) -> None:
-    data = read_json(pack_path)
+    force: bool = False,
+) -> list[str]:
+    """Importe le pack section par section; renvoie les sections reecrites.
+
+    Chaque section est hachee et comparee a l'empreinte enregistree: un pack inchange
+    ne provoque aucune ecriture de contenu, une section modifiee ne reecrit que ses tables.
+    """
+    pack_sha256 = sha256_file(pack_path)
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
     conn = sqlite3.connect(db_path)
     try:
-        if reset_schema:
+        recorded = {} if force or replace_data else recorded_sections(conn)
+        meta = db.get_content_meta(conn) or {}
+        # Meme fichier deja importe en entier: ni lecture du JSON ni ecriture.
+        if recorded and meta.get("import_complete") and meta.get("content_sha256") == pack_sha256:
+            print(f"Pack inchange ({pack_sha256[:12]}): aucune section reimportee.")
+            return []
+        data = read_json(pack_path)
+        pack_version = str(data.get("metadata", {}).get("version") or "") or None
+        hashes = {section: section_sha256(data.get(section, [])) for section, _, _ in SECTIONS}
+        # Schema recree seulement si aucune empreinte n'est connue: sinon le DROP effacerait tout.
+        if reset_schema and not recorded:
             apply_schema(conn, schema_path)
-        elif replace_data:
-            clear_tables(conn)
+        db.apply_migrations(conn)
+        pending = pending_sections(hashes, recorded)
+        if not pending:
+            # Fichier modifie sans changement de contenu (mise en forme): seule la meta suit.
+            db.set_content_meta(conn, pack_sha256, "pack", pack_version, complete=True)
+            conn.commit()
+            print(f"Pack inchange ({pack_sha256[:12]}): aucune section reimportee.")
+            return []
+
+        # Marque l'import en cours: un import interrompu sera repris au prochain demarrage.
+        db.set_content_meta(conn, pack_sha256, "pack", pack_version, complete=False)
+        conn.commit()
+        tables = [table for section, section_tables, _ in SECTIONS if section in pending for table in section_tables]
+        ids = existing_ids(conn, tables)
+        clear_tables(conn, tables)
 
         lesson_lookup: dict[tuple[str, str], int] = {}
-
-        insert_categories(conn, data.get("categories", []))
-        lesson_lookup = insert_lessons(conn, data.get("lessons", []))
-        insert_vocabulary(conn, data.get("vocabulary", []))
-        insert_conjugations(conn, data.get("verb_conjugations", []))
-        insert_exercises(conn, data.get("exercises", []), lesson_lookup)
-        insert_writing_prompts(conn, data.get("writing_prompts", []))
-        insert_reading_passages(conn, data.get("reading_passages", []))
+        if "categories" in pending:
+            insert_categories(conn, data.get("categories", []), ids)
+        if "lessons" in pending:
+            lesson_lookup = insert_lessons(conn, data.get("lessons", []), ids)
+        elif "exercises" in pending:
+            lesson_lookup = {
+                (category_slug, titre): int(lesson_id)
+                for lesson_id, category_slug, titre in conn.execute(
+                    "SELECT id, category_slug, titre FROM lessons ORDER BY id"
+                )
+            }
+        if "vocabulary" in pending:
+            insert_vocabulary(conn, data.get("vocabulary", []), ids)
+        if "verb_conjugations" in pending:
+            insert_conjugations(conn, data.get("verb_conjugations", []), ids)
+        if "exercises" in pending:
+            insert_exercises(conn, data.get("exercises", []), lesson_lookup, ids)
+        if "writing_prompts" in pending:
+            insert_writing_prompts(conn, data.get("writing_prompts", []), ids)
+        if "reading_passages" in pending:
+            insert_reading_passages(conn, data.get("reading_passages", []), ids)
+
+        for section, section_tables, _ in SECTIONS:
+            if section in pending:
+                conn.execute(
+                    """
+                    INSERT INTO content_sections (section, sha256, row_count, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(section) DO UPDATE SET
+                        sha256 = excluded.sha256,
+                        row_count = excluded.row_count,
+                        updated_at = excluded.updated_at
+                    """,
+                    (section, hashes[section], sum(count_table(conn, table) for table in section_tables)),
+                )
+        db.set_content_meta(conn, pack_sha256, "pack", pack_version, complete=True)
 
         conn.commit()
     finally:
@@ -260,7 +423,7 @@ def import_pack(
 
     conn = sqlite3.connect(db_path)
     try:
-        print(f"Import termine depuis: {pack_path}")
+        print(f"Import termine depuis: {pack_path} (sections reimportees: {', '.join(pending)})")
         for table in [
             "categories",
             "lessons",
@@ -274,6 +437,7 @@ def import_pack(
             print(f"- {table}: {count_table(conn, table)}")
     finally:
         conn.close()
+    return pending
 
 
 def parse_args() -> argparse.Namespace:
@@ -300,13 +464,18 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--reset-schema",
         action="store_true",
-        help="Recree completement la base via schema.sql avant import.",
+        help="Recree la base via schema.sql avant import (sauf si les empreintes des sections sont deja connues).",
     )
     parser.add_argument(
         "--replace",
         action="store_true",
         help="Vide les tables existantes avant import (sans recreer le schema).",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reimporte toutes les sections, meme inchangees.",
+    )
     return parser.parse_args()
 
 
@@ -318,6 +487,7 @@ def main() -> None:
         schema_path=args.schema,
         reset_schema=args.reset_schema,
         replace_data=args.replace,
+        force=args.force,
     )
 
 
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from fake_openai_server import ajouter_options_profil, demarrer_en_arriere_plan, profil_depuis_args
+
+
+PHRASES_TYPE = [
+    "Je pense que l'apprentissage en ligne offre beaucoup de liberte aux etudiants.",
+    "Cependant, il demande une grande autonomie et une bonne organisation.",
+    "Par exemple, certains apprenants abandonnent faute de motivation.",
+    "De plus, les echanges avec le professeur sont parfois limites.",
+    "Donc il faudrait combiner les cours a distance avec des seances en classe.",
+]
+
+
+def percentile(valeurs: list[float], rang: float) -> float | None:
+    if not valeurs:
+        return None
+    tries = sorted(valeurs)
+    index = max(0, min(len(tries) - 1, int(round(rang / 100 * len(tries) + 0.5)) - 1))
+    return tries[index]
+
+
+def charger_cible(chemin: str) -> Callable[..., Any]:
+    module_nom, _, fonction_nom = chemin.partition(":")
+    if not fonction_nom:
+        raise ValueError("La cible doit etre au format module:fonction.")
+    module = importlib.import_module(module_nom)
+    return getattr(module, fonction_nom)
+
+
+def charger_sujets(pack_path: Path) -> list[dict[str, Any]]:
+    with pack_path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("writing_prompts", [])
+
+
+def fabriquer_texte(nb_mots: int, rng: random.Random) -> str:
+    mots: list[str] = []
+    while len(mots) < nb_mots:
+        mots.extend(rng.choice(PHRASES_TYPE).split())
+    return " ".join(mots[:nb_mots])
+
+
+def executer_appel(cible: Callable[..., Any], kwargs: dict[str, Any]) -> dict[str, Any]:
+    debut = time.perf_counter()
+    try:
+        resultat = cible(**kwargs)
+    except Exception as err:
+        return {"latence_s": time.perf_counter() - debut, "issue": f"erreur:{type(err).__name__}"}
+    duree = time.perf_counter() - debut
+    evaluation = resultat[0] if isinstance(resultat, tuple) else resultat
+    return {"latence_s": duree, "issue": "ok" if evaluation else "json_invalide"}
+
+
+def lancer_charge(
+    cible: Callable[..., Any],
+    sujets: list[dict[str, Any]],
+    utilisateurs: int,
+    requetes_par_utilisateur: int,
+    modele: str,
+    graine: int,
+) -> tuple[list[dict[str, Any]], float]:
+    rng = random.Random(graine)
+    appels: list[dict[str, Any]] = []
+    for _ in range(utilisateurs * requetes_par_utilisateur):
+        sujet = rng.choice(sujets)
+        nb_mots = rng.randint(int(sujet["min_mots"]), int(sujet["max_mots"]))
+        appels.append(
+            {
+                "api_key": os.getenv("OPENAI_API_KEY", "test-local"),
+                "modele": modele,
+                "tache": sujet["tache_tcf"],
+                "consigne": sujet["consigne"],
+                "texte": fabriquer_texte(nb_mots, rng),
+            }
+        )
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=utilisateurs) as pool:
+        resultats = list(pool.map(lambda kwargs: executer_appel(cible, kwargs), appels))
+    return resultats, time.perf_counter() - debut
+
+
+def resumer(resultats: list[dict[str, Any]], duree_s: float) -> dict[str, Any]:
+    latences = [r["latence_s"] * 1000 for r in resultats]
+    latences_ok = [r["latence_s"] * 1000 for r in resultats if r["issue"] == "ok"]
+    issues = Counter(r["issue"] for r in resultats)
+    return {
+        "requetes": len(resultats),
+        "duree_s": round(duree_s, 3),
+        "debit_req_s": round(len(resultats) / duree_s, 2) if duree_s > 0 else None,
+        "issues": dict(sorted(issues.items())),
+        "taux_succes": round(issues.get("ok", 0) / len(resultats), 4) if resultats else None,
+        "latence_ms": {
+            "p50": percentile(latences, 50),
+            "p95": percentile(latences, 95),
+            "p99": percentile(latences, 99),
+            "max": max(latences) if latences else None,
+        },
+        "latence_ok_ms": {
+            "p50": percentile(latences_ok, 50),
+            "p95": percentile(latences_ok, 95),
+            "p99": percentile(latences_ok, 99),
+        },
+    }
+
+
+def afficher_rapport(rapport: dict[str, Any]) -> None:
+    def fmt(valeur: float | None) -> str:
+        return "-" if valeur is None else f"{valeur:.0f} ms"
+
+    print(f"Requetes: {rapport['requetes']} en {rapport['duree_s']} s")
+    print(f"Debit: {rapport['debit_req_s']} req/s")
+    print(f"Taux de succes: {rapport['taux_succes']}")
+    if "requetes_serveur" in rapport:
+        print(f"Requetes recues par le serveur (avec nouvelles tentatives): {rapport['requetes_serveur']}")
+    for issue, total in rapport["issues"].items():
+        print(f"- {issue}: {total}")
+    lat = rapport["latence_ms"]
+    print(f"Latence (toutes): p50={fmt(lat['p50'])} p95={fmt(lat['p95'])} p99={fmt(lat['p99'])} max={fmt(lat['max'])}")
+    lat_ok = rapport["latence_ok_ms"]
+    print(f"Latence (succes): p50={fmt(lat_ok['p50'])} p95={fmt(lat_ok['p95'])} p99={fmt(lat_ok['p99'])}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Test de charge de la correction d'expression ecrite.")
+    parser.add_argument("--utilisateurs", type=int, default=10, help="Nombre d'utilisateurs concurrents.")
+    parser.add_argument("--requetes", type=int, default=5, help="Requetes par utilisateur.")
+    parser.add_argument(
+        "--cible",
+        default="correction:corriger_redaction_avec_openai",
+        help="Fonction testee (module:fonction), appelee avec api_key, modele, tache, consigne, texte.",
+    )
+    parser.add_argument("--modele", default=os.getenv("OPENAI_MODEL", "gpt-5-mini"))
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="API a viser. Par defaut, un serveur local est demarre avec le profil ci-dessous.",
+    )
+    parser.add_argument(
+        "--pack",
+        type=Path,
+        default=ROOT_DIR / "content" / "packs" / "tcf_pack_v3.json",
+        help="Pack JSON fournissant les sujets d'expression ecrite.",
+    )
+    parser.add_argument("--json-out", type=Path, default=None, help="Ecrit le rapport en JSON.")
+    ajouter_options_profil(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    serveur = None
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    else:
+        serveur = demarrer_en_arriere_plan(profil_depuis_args(args), graine=args.graine)
+        os.environ["OPENAI_BASE_URL"] = serveur.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "test-local")
+        print(f"Serveur local demarre: {serveur.base_url}")
+
+    try:
+        cible = charger_cible(args.cible)
+        sujets = charger_sujets(args.pack)
+        if not sujets:
+            raise ValueError(f"Aucun sujet d'expression ecrite dans {args.pack}")
+        resultats, duree = lancer_charge(
+            cible,
+            sujets,
+            utilisateurs=max(1, args.utilisateurs),
+            requetes_par_utilisateur=max(1, args.requetes),
+            modele=args.modele,
+            graine=args.graine if args.graine is not None else 0,
+        )
+    finally:
+        if serveur is not None:
+            serveur.shutdown()
+            serveur.server_close()
+
+    rapport = resumer(resultats, duree)
+    if serveur is not None:
+        # Ecart avec "requetes" = nouvelles tentatives du SDK apres 429/5xx.
+        rapport["requetes_serveur"] = serveur.compteur
+    rapport["config"] = {
+        "cible": args.cible,
+        "utilisateurs": args.utilisateurs,
+        "requetes_par_utilisateur": args.requetes,
+        "base_url": os.environ.get("OPENAI_BASE_URL"),
+    }
+    afficher_rapport(rapport)
+    if args.json_out:
+        args.json_out.parent.mkdir(parents=True, exist_ok=True)
+        args.json_out.write_text(json.dumps(rapport, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Rapport ecrit: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
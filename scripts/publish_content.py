@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from bootstrap_db import (
+    CONTENT_TABLES,
+    db,
+    remove_db,
+    resolve_paths,
+    resolve_snapshot_path,
+    restore,
+)
+from dump_artifact import sha256_file
+
+
+def grace_hours_from_env() -> float:
+    # Meme duree que les sessions: une session ouverte peut encore referencer une ancienne version.
+    try:
+        return float(os.getenv("SESSION_TTL_HOURS", "12"))
+    except ValueError:
+        return 12.0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Publie le contenu comme nouveau fichier SQLite versionne et bascule le pointeur CURRENT "
+            "(atomique, application en marche, donnees utilisateurs intactes)."
+        )
+    )
+    parser.add_argument(
+        "--from-db",
+        type=Path,
+        default=None,
+        help="Base source (ex: base locale editee). Par defaut: snapshot, dump ou pack comme au bootstrap.",
+    )
+    parser.add_argument("--dir", type=Path, default=db.CONTENT_DIR, help="Dossier des versions de contenu.")
+    parser.add_argument("--keep", type=int, default=3, help="Versions conservees (rollback, reruns en cours).")
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=grace_hours_from_env(),
+        help="Une version active il y a moins de ce delai n'est jamais supprimee (defaut: SESSION_TTL_HOURS).",
+    )
+    parser.add_argument("--activate", default=None, help="Rebascule sur une version deja publiee (rollback).")
+    return parser.parse_args()
+
+
+def build_content_file(staging: Path, from_db: Path | None) -> None:
+    if from_db is not None:
+        source = sqlite3.connect(f"file:{from_db}?mode=ro", uri=True)
+        target = sqlite3.connect(staging)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    else:
+        _, schema_path, pack_path, dump_path = resolve_paths()
+        restore(staging, schema_path, pack_path, dump_path, resolve_snapshot_path())
+
+    conn = sqlite3.connect(staging, isolation_level=None)
+    try:
+        # Fichier de contenu pur: une table utilisateur ici masquerait celle de app.db.
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            if table not in CONTENT_TABLES and not table.startswith("sqlite_"):
+                conn.execute(f"DROP TABLE {table}")
+        for table in CONTENT_TABLES:
+            if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None:
+                raise SystemExit(f"Table de contenu vide: {table}")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("VACUUM")
+        verdict = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if verdict != "ok":
+            raise SystemExit(f"integrity_check en echec: {verdict}")
+    finally:
+        conn.close()
+
+
+def current_version(directory: Path) -> str | None:
+    try:
+        return (directory / "CURRENT").read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate(directory: Path, name: str) -> str | None:
+    """Bascule CURRENT sur `name`; renvoie la version precedemment active."""
+    if not (directory / name).exists():
+        raise SystemExit(f"Version introuvable: {directory / name}")
+    previous = current_version(directory)
+    tmp_path = directory / "CURRENT.tmp"
+    tmp_path.write_text(name + "\n", encoding="utf-8")
+    os.replace(tmp_path, directory / "CURRENT")
+    if previous and previous != name and (directory / previous).exists():
+        # mtime = derniere fois ou la version etait active: point de depart du delai de grace de prune().
+        os.utime(directory / previous)
+    print(f"Contenu actif: {name}")
+    return previous
+
+
+def prune(directory: Path, keep: int, previous: str | None, grace_s: float) -> None:
+    """Supprime les versions au-dela des `keep` plus recentes.
+
+    Jamais la version active ni la precedente, ni une version active il y a moins de
+    `grace_s`: un rerun ou une session peut encore l'avoir figee (pin_content_version).
+    """
+    current = current_version(directory)
+    limit = time.time() - grace_s
+    versions = sorted(directory.glob("content-*.db"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in versions[keep:]:
+        if path.name in (current, previous) or path.stat().st_mtime > limit:
+            continue
+        path.unlink()
+        print(f"Ancienne version supprimee: {path.name}")
+
+
+def publish(directory: Path, from_db: Path | None, keep: int = 3, grace_hours: float | None = None) -> str:
+    """Construit le fichier de contenu, bascule CURRENT dessus et purge les anciennes versions."""
+    directory.mkdir(parents=True, exist_ok=True)
+    staging = directory / f".staging-{os.getpid()}.db"
+    remove_db(staging)
+    try:
+        build_content_file(staging, from_db)
+        name = f"content-{sha256_file(staging)[:16]}.db"
+        target = directory / name
+        if target.exists():
+            print(f"Contenu identique deja publie: {name}")
+        else:
+            os.replace(staging, target)
+    finally:
+        remove_db(staging)
+    previous = activate(directory, name)
+    os.utime(target)
+    hours = grace_hours_from_env() if grace_hours is None else grace_hours
+    prune(directory, max(1, keep), previous, max(0.0, hours) * 3600)
+    return name
+
+
+def main() -> None:
+    args = parse_args()
+    if args.activate:
+        args.dir.mkdir(parents=True, exist_ok=True)
+        activate(args.dir, args.activate)
+        return
+    publish(args.dir, args.from_db, args.keep, args.grace_hours)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+import db
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recalcule les agregats par utilisateur depuis user_activity et user_activity_monthly.")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(os.getenv("APP_DB_PATH", str(ROOT_DIR / "data" / "app.db"))),
+        help="Chemin vers la base SQLite.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.db.exists():
+        raise FileNotFoundError(f"Base introuvable: {args.db}")
+
+    conn = sqlite3.connect(args.db)
+    try:
+        total = db.rebuild_user_rollups(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Agregats reconstruits (user_module_stats, user_daily_stats): {total} ligne(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+if TYPE_CHECKING:
+    import db
+
+
+def load_events(conn: sqlite3.Connection, item_type: str) -> dict[str, np.ndarray]:
+    rows = conn.execute(
+        """
+        SELECT series_id, item_id, COALESCE(chosen_index, -1), is_correct
+        FROM answer_events
+        WHERE item_type = ?
+        """,
+        (item_type,),
+    ).fetchall()
+    if not rows:
+        return {}
+    series, items, chosen, correct = zip(*rows)
+    _, series_codes = np.unique(np.array(series, dtype=object), return_inverse=True)
+    return {
+        "series": series_codes.astype(np.int64),
+        "item": np.array(items, dtype=np.int64),
+        "chosen": np.array(chosen, dtype=np.int64),
+        "correct": np.array(correct, dtype=np.float64),
+    }
+
+
+def compute_stats(
+    item_type: str, events: dict[str, np.ndarray]
+) -> tuple[list[db.ItemStatsRow], list[tuple[str, int, int, int]]]:
+    """Memes sommes que db._update_item_stats, calculees en une passe vectorisee."""
+    x = events["correct"]
+    series = events["series"]
+    # Score du reste de la serie (hors item), comme en incremental.
+    series_n = np.bincount(series)
+    series_correct = np.bincount(series, weights=x)
+    n = series_n[series]
+    has_rest = n > 1
+    y = np.where(has_rest, (series_correct[series] - x) / np.maximum(n - 1, 1), 0.0)
+    w = has_rest.astype(np.float64)
+
+    item_ids, item_codes = np.unique(events["item"], return_inverse=True)
+    size = len(item_ids)
+
+    def by_item(values: np.ndarray) -> np.ndarray:
+        return np.bincount(item_codes, weights=values, minlength=size)
+
+    attempts = np.bincount(item_codes, minlength=size)
+    correct = by_item(x)
+    skipped = by_item((events["chosen"] < 0).astype(np.float64))
+    disc_n = by_item(w)
+    disc_x = by_item(w * x)
+    disc_y = by_item(w * y)
+    disc_y2 = by_item(w * y * y)
+    disc_xy = by_item(w * x * y)
+    stats = [
+        (
+            item_type,
+            int(item_ids[i]),
+            int(attempts[i]),
+            int(correct[i]),
+            int(skipped[i]),
+            int(disc_n[i]),
+            float(disc_x[i]),
+            float(disc_y[i]),
+            float(disc_y2[i]),
+            float(disc_xy[i]),
+        )
+        for i in range(size)
+    ]
+
+    answered = events["chosen"] >= 0
+    pairs, picks = np.unique(
+        np.stack([events["item"][answered], events["chosen"][answered]], axis=1), axis=0, return_counts=True
+    )
+    option_picks = [(item_type, int(item), int(option), int(count)) for (item, option), count in zip(pairs, picks)]
+    return stats, option_picks
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recalcule item_stats / item_option_stats depuis answer_events (backfill complet)."
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(os.getenv("APP_DB_PATH", str(ROOT_DIR / "data" / "app.db"))),
+        help="Chemin vers la base SQLite.",
+    )
+    parser.add_argument("--flagged", action="store_true", help="Affiche ensuite les items a revoir.")
+    parser.add_argument("--min-attempts", type=int, default=30)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.db.exists():
+        raise FileNotFoundError(f"Base introuvable: {args.db}")
+    # Avant l'import de db: DB_PATH, CONTENT_DIR et le statut en derivent a l'import.
+    os.environ["APP_DB_PATH"] = str(args.db)
+    import db
+
+    db.ensure_auth_tables()
+
+    start = time.perf_counter()
+    all_stats: list[db.ItemStatsRow] = []
+    all_picks: list[tuple[str, int, int, int]] = []
+    nb_events = 0
+    conn = sqlite3.connect(args.db)
+    try:
+        for item_type in db.ITEM_SOURCES:
+            events = load_events(conn, item_type)
+            if not events:
+                continue
+            nb_events += len(events["item"])
+            stats, picks = compute_stats(item_type, events)
+            all_stats.extend(stats)
+            all_picks.extend(picks)
+        with conn:
+            db.replace_item_stats(conn, all_stats, all_picks)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    print(f"{nb_events} reponses -> {len(all_stats)} items recalcules en {elapsed:.2f}s")
+
+    if args.flagged:
+        for item_type in db.ITEM_SOURCES:
+            for item in db.get_flagged_items(item_type, min_attempts=args.min_attempts):
+                p_value = item["p_value"]
+                discrimination = item["discrimination"]
+                print(
+                    f"[{item_type} {item['item_id']}] niveau {item['niveau_attribue']} "
+                    f"p={p_value:.2f} "
+                    f"d={'-' if discrimination is None else f'{discrimination:.2f}'} "
+                    f"n={item['tentatives']}: {', '.join(item['raisons'])}"
+                )
+
+
+if __name__ == "__main__":
+    main()
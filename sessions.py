@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import secrets
+import threading
+import time
+from typing import Any
+
+
+class CacheSessions:
+    """Jetons de session en memoire: {jeton: (utilisateur, expiration)}.
+
+    Une fois connecte, chaque rerun Streamlit resout l'utilisateur ici, sans
+    relire la table users. Un redemarrage du serveur invalide les sessions.
+    """
+
+    def __init__(self, duree_s: float = 12 * 3600, taille_max: int = 10_000) -> None:
+        self.duree_s = duree_s
+        self.taille_max = taille_max
+        self._sessions: dict[str, tuple[dict[str, Any], float]] = {}
+        self._verrou = threading.Lock()
+
+    def ouvrir(self, utilisateur: dict[str, Any]) -> str:
+        jeton = secrets.token_urlsafe(32)
+        maintenant = time.monotonic()
+        with self._verrou:
+            if len(self._sessions) >= self.taille_max:
+                self._purger(maintenant)
+            self._sessions[jeton] = (dict(utilisateur), maintenant + self.duree_s)
+        return jeton
+
+    def utilisateur(self, jeton: str) -> dict[str, Any] | None:
+        with self._verrou:
+            entree = self._sessions.get(jeton)
+            if entree is None:
+                return None
+            utilisateur, expiration = entree
+            if expiration <= time.monotonic():
+                del self._sessions[jeton]
+                return None
+            return utilisateur
+
+    def fermer(self, jeton: str) -> None:
+        with self._verrou:
+            self._sessions.pop(jeton, None)
+
+    def _purger(self, maintenant: float) -> None:
+        for jeton in [j for j, (_, expiration) in self._sessions.items() if expiration <= maintenant]:
+            del self._sessions[jeton]
+        # Toujours plein: on libere les sessions qui expirent le plus tot.
+        surplus = len(self._sessions) - self.taille_max + 1
+        if surplus > 0:
+            for jeton, _ in sorted(self._sessions.items(), key=lambda item: item[1][1])[:surplus]:
+                del self._sessions[jeton]
+
+
+def cache_depuis_env() -> CacheSessions:
+    try:
+        heures = float(os.getenv("SESSION_TTL_HOURS", "12"))
+    except ValueError:
+        heures = 12.0
+    return CacheSessions(duree_s=heures * 3600)